@@ -1,22 +1,49 @@
 # app.py
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, request, jsonify, make_response
 from functools import wraps
 import sys
 import os
+import re
+import json
+import time
+import base64
+import threading
+import importlib.util
+from dataclasses import dataclass, field
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import LLM modules - for Mistral integration
-try:
-    from llama_cpp import Llama
-    HAS_LLAMA_CPP = True
-except ImportError:
-    HAS_LLAMA_CPP = False
+from graph.snapshot import GraphSnapshotBuilder
+from graph.comparison import TierComparison, UnknownTier
+from graph.search import SearchIndex
+from graph.layout import LayoutCache, LayoutUnavailable
+from config import GRAPH_PAGE_SIZE, GRAPH_PAGE_MAX_SIZE, COMPARE_MAX_TIERS, SEARCH_LIMIT, SEARCH_MAX_LIMIT
+from graph.wire import MIMETYPES, UnsupportedFormat, encode_graph, negotiate_format
+from llm.scheduler import InferenceScheduler, SchedulerBusy, SchedulerTimeout, SchedulerNotReady
+from llm.answer_cache import SemanticAnswerCache
+from llm.intent_matcher import IntentMatcher
+from llm.prefix_cache import PrefixCachedModel, merge_stats
+from llm.answer_generator import PromptBuilder, build_prompt_prefix, LLM_MAX_TOKENS, LLM_STOP
+import metrics
+from metrics import ANSWER_SECONDS, LLM_STAGE_SECONDS, StatsCollector
+
+# LLM modules - for Mistral integration. llama_cpp itself is imported by the
+# background loader, so importing this module never waits on it
+HAS_LLAMA_CPP = importlib.util.find_spec("llama_cpp") is not None
+if not HAS_LLAMA_CPP:
     print("Warning: llama_cpp not found. LLM functionality will use mock responses.")
 
 app = Flask(__name__)
 
+# Sent on every response by both frontends (this module and app/asgi.py)
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,If-None-Match',
+    'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE,OPTIONS',
+    'Access-Control-Expose-Headers': 'ETag,Content-Encoding',
+}
+
 # Custom CORS handling
 def cors_enabled(f):
     @wraps(f)
@@ -28,9 +55,8 @@ def cors_enabled(f):
             response = make_response(f(*args, **kwargs))
             
         # Add CORS headers
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        for name, value in CORS_HEADERS.items():
+            response.headers.add(name, value)
         
         return response
     return decorated_function
@@ -92,177 +118,564 @@ SUBSCRIPTION_DATA = {
     }
 }
 
-# LLM setup
-MODEL_PATH = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
-llm = None
-
-if HAS_LLAMA_CPP and os.path.exists(MODEL_PATH):
-    try:
-        llm = Llama(
-            model_path=MODEL_PATH,
-            n_ctx=2048,  # Context window size
-            n_batch=512  # Batch size
-        )
-        print(f"Successfully loaded Mistral model from {MODEL_PATH}")
-    except Exception as e:
-        print(f"Error loading Mistral model: {e}")
-        llm = None
-else:
-    if not HAS_LLAMA_CPP:
-        print("llama_cpp not installed. Install with: pip install llama-cpp-python")
-    else:
-        print(f"Model file not found at {MODEL_PATH}")
-
-def get_subscriptions_graph():
-    """Create a graph representation for visualization from subscription data."""
-    nodes = []
-    links = []
-    tiers = ["Basic", "Standard", "Premium"]
+def build_graph_snapshot(data=None):
+    """Build an id-indexed, pre-serialized snapshot of the subscription graph."""
+    data = data or SUBSCRIPTION_DATA
+    builder = GraphSnapshotBuilder()
+    tiers = list(data["Features"])
     
     # Add tier nodes
     for tier in tiers:
-        nodes.append({
-            "id": tier,
-            "group": "Tier",
-            "label": tier,
-            "color": "#4299E1" if tier == "Basic" else "#38B2AC" if tier == "Standard" else "#805AD5"
-        })
+        builder.add_node(
+            tier,
+            group="Tier",
+            label=tier,
+            color="#4299E1" if tier == "Basic" else "#38B2AC" if tier == "Standard" else "#805AD5"
+        )
     
     # Add feature nodes and connections
-    for tier, features in SUBSCRIPTION_DATA["Features"].items():
+    for tier, features in data["Features"].items():
         for feature in features:
-            feature_id = f"Feature_{feature.replace(' ', '_')}"
-            
-            # Check if node already exists
-            if not any(node["id"] == feature_id for node in nodes):
-                nodes.append({
-                    "id": feature_id,
-                    "group": "Feature",
-                    "label": feature,
-                    "color": "#F6AD55"
-                })
-            
-            links.append({
-                "source": tier,
-                "target": feature_id,
-                "label": "HAS_FEATURE"
-            })
+            feature_id = builder.add_node(
+                f"Feature_{feature.replace(' ', '_')}",
+                group="Feature",
+                label=feature,
+                color="#F6AD55"
+            )
+            builder.add_link(tier, feature_id, "HAS_FEATURE")
     
     # Add limitation nodes and connections
-    for tier, limitations in SUBSCRIPTION_DATA["Limitations"].items():
+    for tier, limitations in data["Limitations"].items():
         for limitation in limitations:
-            limitation_id = f"Limitation_{limitation.replace(' ', '_')}"
-            
-            if not any(node["id"] == limitation_id for node in nodes):
-                nodes.append({
-                    "id": limitation_id,
-                    "group": "Limitation",
-                    "label": limitation,
-                    "color": "#FC8181"
-                })
-            
-            links.append({
-                "source": tier,
-                "target": limitation_id,
-                "label": "HAS_LIMITATION"
-            })
+            limitation_id = builder.add_node(
+                f"Limitation_{limitation.replace(' ', '_')}",
+                group="Limitation",
+                label=limitation,
+                color="#FC8181"
+            )
+            builder.add_link(tier, limitation_id, "HAS_LIMITATION")
     
     # Add support level nodes and connections
-    for tier, supports in SUBSCRIPTION_DATA["SupportLevels"].items():
+    for tier, supports in data["SupportLevels"].items():
         for support in supports:
-            support_id = f"Support_{support.replace(' ', '_')}"
-            
-            if not any(node["id"] == support_id for node in nodes):
-                nodes.append({
-                    "id": support_id,
-                    "group": "Support",
-                    "label": support,
-                    "color": "#68D391"
-                })
-            
-            links.append({
-                "source": tier,
-                "target": support_id,
-                "label": "PROVIDES"
-            })
+            support_id = builder.add_node(
+                f"Support_{support.replace(' ', '_')}",
+                group="Support",
+                label=support,
+                color="#68D391"
+            )
+            builder.add_link(tier, support_id, "PROVIDES")
     
     # Add upgrade relationships
-    for tier, upgrades in SUBSCRIPTION_DATA["Relationships"]["Upgrades"].items():
+    for tier, upgrades in data["Relationships"]["Upgrades"].items():
         for upgrade in upgrades:
-            links.append({
-                "source": tier,
-                "target": upgrade,
-                "label": "UPGRADES_TO"
-            })
+            builder.add_link(tier, upgrade, "UPGRADES_TO")
     
-    return {"nodes": nodes, "links": links}
+    return builder.build()
+
+# Upper bound on the neighborhood depth accepted by /api/graph
+MAX_GRAPH_DEPTH = 5
+
+# Graph snapshot, built once and swapped atomically when the data changes
+_graph_snapshot = None
+_graph_snapshot_lock = threading.Lock()
+
+def get_graph_snapshot():
+    """Return the current graph snapshot, building it on first use."""
+    global _graph_snapshot
+    if _graph_snapshot is None:
+        with _graph_snapshot_lock:
+            if _graph_snapshot is None:
+                _graph_snapshot = build_graph_snapshot()
+    return _graph_snapshot
+
+def get_catalog():
+    """SUBSCRIPTION_DATA and the snapshot built from it, read as a pair."""
+    get_graph_snapshot()
+    with _graph_snapshot_lock:
+        return SUBSCRIPTION_DATA, _graph_snapshot
+
+def refresh_graph_snapshot():
+    """Rebuild the snapshot after SUBSCRIPTION_DATA has changed."""
+    global _graph_snapshot
+    snapshot = build_graph_snapshot()
+    with _graph_snapshot_lock:
+        _graph_snapshot = snapshot
+    return snapshot
+
+def subscription_data_from_profiles(profiles):
+    """SUBSCRIPTION_DATA-shaped dict from QueryEngine.get_tier_profiles() results."""
+    return {
+        "Features": {name: p.features for name, p in profiles.items()},
+        "Limitations": {name: p.limitations for name, p in profiles.items()},
+        "SupportLevels": {name: p.support for name, p in profiles.items()},
+        "Relationships": {
+            "Upgrades": {name: p.upgrades for name, p in profiles.items()},
+            "SUPPORTS": {name: p.support for name, p in profiles.items()}
+        }
+    }
+
+def catalog_entity_terms(data):
+    """Every tier, feature, limitation and support name; cached answers must name the same ones."""
+    terms = set(data["Features"])
+    for facet in ("Features", "Limitations", "SupportLevels"):
+        for items in data[facet].values():
+            terms.update(items)
+    return terms
+
+def replace_subscription_data(data):
+    """Serve `data` from now on; answers and templates follow the new snapshot version."""
+    global SUBSCRIPTION_DATA, _graph_snapshot
+    snapshot = build_graph_snapshot(data)
+    answer_cache.set_entity_terms(catalog_entity_terms(data))
+    # Swap data and snapshot together so readers never see one without the other
+    with _graph_snapshot_lock:
+        SUBSCRIPTION_DATA = data
+        _graph_snapshot = snapshot
+    return snapshot
+
+def get_subscriptions_graph():
+    """Create a graph representation for visualization from subscription data."""
+    return get_graph_snapshot().to_dict()
 
-def get_data_for_tier(tier):
+def get_data_for_tier(tier, depth=1):
     """Get graph data filtered for a specific tier."""
-    full_graph = get_subscriptions_graph()
+    return get_data_for_tiers([tier], depth)
+
+def get_data_for_tiers(tiers, depth=1):
+    """Get the k-hop neighborhood of one or more tiers from the adjacency index."""
+    return get_graph_snapshot().neighborhood(tiers, depth)
+
+def parse_tier_filter(value):
+    """Normalize a tier filter given as a string, comma-separated string or list."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    return [t.strip() for item in value for t in str(item).split(',') if t.strip()]
+
+# Lines per chunk written by /api/graph/export
+GRAPH_EXPORT_CHUNK_LINES = 500
+
+class StaleCursor(Exception):
+    """A pagination cursor refers to a graph snapshot that has since been replaced."""
+
+def encode_cursor(version, offset):
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Return (version, offset); raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        version, offset = raw.rsplit(":", 1)
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    return version, offset
+
+def get_graph_page(kind, cursor=None, limit=GRAPH_PAGE_SIZE):
+    """One page of the snapshot's "nodes" or "links", continuing from `cursor`.
+
+    Cursors are tied to the snapshot version, so pages never mix two versions
+    of the graph; StaleCursor means the client has to start over.
+    """
+    snapshot = get_graph_snapshot()
+    offset = 0
+    if cursor:
+        version, offset = decode_cursor(cursor)
+        if version != snapshot.version:
+            raise StaleCursor(version)
+    items = snapshot.nodes if kind == "nodes" else snapshot.links
+    page = items[offset:offset + limit]
+    end = offset + len(page)
+    return {
+        kind: page,
+        "next_cursor": encode_cursor(snapshot.version, end) if end < len(items) else None,
+        "total": len(items),
+        "version": snapshot.version
+    }
+
+def iter_graph_ndjson(snapshot):
+    """Yield the snapshot as NDJSON: a meta line, then one line per node and per link."""
+    yield json.dumps({
+        "type": "meta",
+        "version": snapshot.version,
+        "nodes": len(snapshot.nodes),
+        "links": len(snapshot.links)
+    }) + "\n"
+    for kind, items in (("node", snapshot.nodes), ("link", snapshot.links)):
+        for start in range(0, len(items), GRAPH_EXPORT_CHUNK_LINES):
+            yield "".join(
+                json.dumps({"type": kind, **item}, separators=(",", ":")) + "\n"
+                for item in items[start:start + GRAPH_EXPORT_CHUNK_LINES]
+            )
+
+def parse_page_limit(value):
+    """Validate a page size; returns (limit, error message)."""
+    if value is None:
+        return GRAPH_PAGE_SIZE, None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return None, 'limit must be an integer'
+    if not 1 <= limit <= GRAPH_PAGE_MAX_SIZE:
+        return None, f'limit must be between 1 and {GRAPH_PAGE_MAX_SIZE}'
+    return limit, None
+
+# Node positions for /api/graph?layout=2d|3d, cached per snapshot version and view
+LAYOUT_DIMENSIONS = {'2d': 2, '3d': 3}
+layout_cache = LayoutCache()
+
+def parse_layout(value):
+    """Layout dimensions requested with ?layout=, or None for no layout; returns (dim, error message)."""
+    if value in (None, '', '0', 'false', 'none'):
+        return None, None
+    dim = LAYOUT_DIMENSIONS.get(str(value).lower())
+    if dim is None:
+        return None, f"layout must be one of: {', '.join(LAYOUT_DIMENSIONS)}"
+    return dim, None
+
+def validate_tiers(tiers, snapshot):
+    """Deduplicated, sorted tier filter; returns (tiers, error message) naming every non-tier in it."""
+    tiers = sorted(set(tiers))
+    unknown = [tier for tier in tiers if tier not in snapshot.tiers]
+    if unknown:
+        return None, f'Unknown tier(s): {", ".join(unknown)}'
+    return tiers, None
+
+def get_graph_with_layout(tiers, depth, dim, snapshot=None):
+    """Layout of the full graph or a tier neighborhood; nodes carry x, y (and z).
+
+    `tiers` must already be validated against `snapshot`, since they key the cache.
+    """
+    snapshot = snapshot or get_graph_snapshot()
+    if tiers:
+        graph = snapshot.neighborhood(tiers, depth)
+        view = (tuple(tiers), depth)
+    else:
+        graph = snapshot.to_dict()
+        view = None
+    return layout_cache.layout(snapshot.version, view, graph, dim)
+
+# Tier bitsets for /api/compare, rebuilt when the snapshot changes; item ids stay stable.
+# These per-version builds each take a lock so one request rebuilds after a swap
+# while the others wait for it, instead of all rebuilding at once.
+_tier_comparison = None
+_tier_comparison_lock = threading.Lock()
+
+def get_tier_comparison():
+    global _tier_comparison
+    comparison = _tier_comparison
+    if comparison is not None and comparison.version == get_graph_snapshot().version:
+        return comparison
+    with _tier_comparison_lock:
+        data, snapshot = get_catalog()
+        comparison = _tier_comparison
+        if comparison is None or comparison.version != snapshot.version:
+            comparison = TierComparison.from_subscription_data(data, snapshot.version, previous=comparison)
+            _tier_comparison = comparison
+    return comparison
+
+def compare_tiers(tiers, include_shared=False):
+    """Pairwise comparison of `tiers` (all tiers if empty); returns (result, error message)."""
+    comparison = get_tier_comparison()
+    tiers = list(dict.fromkeys(tiers)) or comparison.tiers
+    if len(tiers) < 2:
+        return None, 'tiers must name at least two tiers'
+    if len(tiers) > COMPARE_MAX_TIERS:
+        return None, f'at most {COMPARE_MAX_TIERS} tiers can be compared at once'
+    try:
+        return comparison.compare(tiers, include_shared), None
+    except UnknownTier as e:
+        return None, f'Unknown tier: {e.args[0]}'
+
+# Autocomplete index over node labels, rebuilt from the snapshot whenever it changes
+_search_index = None
+_search_index_lock = threading.Lock()
+
+def get_search_index():
+    global _search_index
+    index = _search_index
+    if index is not None and index.version == get_graph_snapshot().version:
+        return index
+    with _search_index_lock:
+        snapshot = get_graph_snapshot()
+        index = _search_index
+        if index is None or index.version != snapshot.version:
+            index = SearchIndex.from_snapshot(snapshot)
+            _search_index = index
+    return index
+
+def search_entities(query, limit):
+    """Ranked entity matches for /api/search; returns (result, error message)."""
+    if limit is None:
+        limit = SEARCH_LIMIT
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return None, 'limit must be an integer'
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        return None, f'limit must be between 1 and {SEARCH_MAX_LIMIT}'
+    index = get_search_index()
+    return {"query": query, "version": index.version, "results": index.search(query, limit)}, None
+
+# LLM setup
+MODEL_PATH = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+# Requests are queued to worker threads that each own a model instance
+scheduler = None
+
+# Worker models, each keeping the evaluated system-prompt prefix warm
+prefix_models = []
+
+def create_model(n_threads):
+    from llm.model import load_llm
     
-    # Get all links connected to the tier
-    tier_links = [link for link in full_graph["links"] if link["source"] == tier or link["target"] == tier]
+    model = PrefixCachedModel(
+        load_llm(
+            MODEL_PATH,
+            n_ctx=2048,  # Context window size
+            n_threads=n_threads,
+            n_batch=512,  # Batch size
+            use_mmap=True  # Page weights in on demand instead of reading 4 GB up front
+        ),
+        build_prompt_prefix
+    )
+    # Evaluate the prefix now rather than on the first request
+    model.prepare(build_prompt_prefix())
+    prefix_models.append(model)
+    return model
+
+def llm_enabled():
+    """True unless there is no model or every worker failed to load it."""
+    return scheduler is not None and scheduler.state != "failed"
+
+if HAS_LLAMA_CPP and os.path.exists(MODEL_PATH):
+    # Models load in background worker threads; graph endpoints serve meanwhile
+    scheduler = InferenceScheduler(create_model).start(wait=False)
+    print(f"Loading Mistral model from {MODEL_PATH} in the background ({scheduler.workers} worker(s))")
+else:
+    if not HAS_LLAMA_CPP:
+        print("llama_cpp not installed. Install with: pip install llama-cpp-python")
+    else:
+        print(f"Model file not found at {MODEL_PATH}")
+
+# Templated answers for structured questions, recompiled when the snapshot changes
+_intent_matcher = None
+_intent_matcher_lock = threading.Lock()
+
+def get_intent_matcher():
+    global _intent_matcher
+    matcher = _intent_matcher
+    if matcher is not None and matcher.version == get_graph_snapshot().version:
+        return matcher
+    with _intent_matcher_lock:
+        data, snapshot = get_catalog()
+        matcher = _intent_matcher
+        if matcher is None or matcher.version != snapshot.version:
+            comparison = get_tier_comparison()
+            if comparison.version != snapshot.version:
+                # The data was swapped again meanwhile; build both from one version
+                comparison = TierComparison.from_subscription_data(data, snapshot.version, previous=comparison)
+            matcher = IntentMatcher.from_subscription_data(
+                data, snapshot.version, previous=matcher, comparison=comparison
+            )
+            _intent_matcher = matcher
+    return matcher
+
+_prompt_builder = None
+_prompt_builder_lock = threading.Lock()
+
+def get_prompt_builder():
+    """Fact index for grounding LLM prompts, rebuilt when the graph snapshot changes."""
+    global _prompt_builder
+    builder = _prompt_builder
+    if builder is not None and builder.version == get_graph_snapshot().version:
+        return builder
+    with _prompt_builder_lock:
+        data, snapshot = get_catalog()
+        builder = _prompt_builder
+        if builder is None or builder.version != snapshot.version:
+            comparison = get_tier_comparison()
+            if comparison.version != snapshot.version:
+                comparison = TierComparison.from_subscription_data(data, snapshot.version, previous=comparison)
+            builder = PromptBuilder.from_subscription_data(data, version=snapshot.version, comparison=comparison)
+            _prompt_builder = builder
+    return builder
+
+# Generated answers keyed by question; reset whenever the graph snapshot changes
+answer_cache = SemanticAnswerCache(entity_terms=catalog_entity_terms(SUBSCRIPTION_DATA))
+
+# Cache and queue stats, read only when /api/metrics is scraped
+StatsCollector("simulia_scheduler", "Inference scheduler stats",
+               lambda: scheduler.stats() if scheduler is not None else None)
+StatsCollector("simulia_fast_path", "Templated answer stats", lambda: get_intent_matcher().stats())
+StatsCollector("simulia_answer_cache", "Semantic answer cache stats", lambda: answer_cache.stats())
+StatsCollector("simulia_prefix_cache", "System-prompt KV cache stats", lambda: merge_stats(prefix_models))
+StatsCollector("simulia_layout_cache", "Graph layout cache stats", lambda: layout_cache.stats())
+
+def get_answer_for_query(query):
+    """Get answer from LLM based on query - will use Mistral model if available, otherwise mock responses."""
+    start = time.perf_counter()
+    answer, job, version = start_answer_for_query(query)
+    if job is not None:
+        answer = finish_answer_for_query(query, job, version)
+    # "direct" covers templated, cached and mock answers
+    ANSWER_SECONDS.observe(time.perf_counter() - start, source="llm" if job is not None else "direct")
+    return answer
+
+def start_answer_for_query(query):
+    """Answer without waiting if possible, else queue an LLM job.
     
-    # Get all nodes connected to the tier
-    connected_node_ids = {tier}
+    Returns (answer, job, version); exactly one of answer and job is set. Never
+    blocks: a full queue raises SchedulerBusy right away.
+    """
+    # Structured questions are answered straight from the graph data
+    answer = get_intent_matcher().answer(query)
+    if answer is not None:
+        return answer, None, None
     
-    for link in tier_links:
-        source = link["source"]
-        target = link["target"]
-        
-        if isinstance(source, dict):
-            source = source["id"]
-        if isinstance(target, dict):
-            target = target["id"]
-            
-        connected_node_ids.add(source)
-        connected_node_ids.add(target)
+    if not llm_enabled():
+        # Use mock responses if LLM is not available
+        return get_mock_answer(query), None, None
     
-    filtered_nodes = [node for node in full_graph["nodes"] if node["id"] in connected_node_ids]
+    version = get_graph_snapshot().version
+    cached = answer_cache.lookup(query, version)
+    if cached is not None:
+        return cached, None, None
+    with LLM_STAGE_SECONDS.time(stage="prompt_build"):
+        prompt = get_prompt_builder().build_prompt(query)
+    job = scheduler.submit(
+        prompt,
+        max_tokens=LLM_MAX_TOKENS,
+        stop=LLM_STOP,
+        echo=False
+    )
+    return None, job, version
+
+def finish_answer_for_query(query, job, version):
+    """Wait for a queued LLM job and return (and cache) its cleaned-up answer."""
+    try:
+        response = scheduler.result(job)
+        
+        # Extract and clean up the generated text
+        answer = response['choices'][0]['text'].strip()
+        answer_cache.store(query, answer, version)
+        return answer
+    except SchedulerTimeout:
+        # Overload is reported to the client rather than hidden behind a mock answer
+        raise
+    except Exception as e:
+        print(f"Error generating LLM response: {e}")
+        # Fallback to mock responses
+        return get_mock_answer(query)
+
+def stream_answer_for_query(query):
+    """Return an AnswerStream over the answer in chunks as the LLM produces them.
+
+    The request is queued immediately, so SchedulerBusy is raised here rather
+    than mid-stream. Closing the stream (e.g. when the client disconnects)
+    cancels generation.
+    """
+    answer = get_intent_matcher().answer(query)
+    if answer is not None:
+        return AnswerStream(_stream_text(answer))
     
-    return {"nodes": filtered_nodes, "links": tier_links}
+    if llm_enabled():
+        version = get_graph_snapshot().version
+        cached = answer_cache.lookup(query, version)
+        if cached is not None:
+            return AnswerStream(_stream_text(cached))
+        with LLM_STAGE_SECONDS.time(stage="prompt_build"):
+            prompt = get_prompt_builder().build_prompt(query)
+        tokens = scheduler.stream(
+            prompt,
+            max_tokens=LLM_MAX_TOKENS,
+            stop=LLM_STOP,
+            echo=False
+        )
+        return AnswerStream(_stream_llm_answer(tokens, query, version), tokens)
+    return AnswerStream(_stream_text(get_mock_answer(query)))
 
-def get_answer_for_query(query):
-    """Get answer from LLM based on query - will use Mistral model if available, otherwise mock responses."""
-    if llm is not None:
+class AnswerStream:
+    """Iterator over answer chunks whose close() also cancels queued or running generation.
+    
+    close() may be called from another thread while one is blocked in next()
+    (the ASGI frontend waits for tokens in a thread pool and closes from the
+    event loop when the client disconnects). It cancels the LLM job right
+    away; the chunk generator itself is closed by whichever side finishes
+    last, never while it is executing.
+    """
+    def __init__(self, chunks, tokens=None):
+        self._chunks = chunks
+        self._tokens = tokens
+        self._lock = threading.Lock()
+        self._busy = False
+        self._closed = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        with self._lock:
+            if self._closed:
+                raise StopIteration
+            self._busy = True
         try:
-            # System context with subscription information
-            system_prompt = """You are an assistant for SIMULIA subscription services.
-            You help users understand the differences between Basic, Standard, and Premium tiers.
-            Basic tier includes: Single-Physics Simulation, Basic Geometry Handling
-            Standard tier includes: Multi-Physics Simulation, Parametric Sweeps, Advanced Meshing Toolkit, plus all Basic features
-            Premium tier includes: High-Performance Computing Integration, Co-Simulation with External Tools, Full Geometry Optimization Suite, plus all Standard features
-            Basic limitations: Max 500k Degrees of Freedom, No HPC Cluster Access
-            Standard limitations: Max 2 Million Degrees of Freedom, Limited HPC Nodes (Up to 2)
-            Premium has no limitations.
-            Basic support: Email Support (Next-Business-Day Response)
-            Standard support: Email Support (Business Hours), Live Chat (Business Hours)
-            Premium support: Phone Support (24/7), Live Chat (24/7), Dedicated Engineer
-            Users can upgrade from any tier to any higher tier.
-            Always provide clear, concise, and accurate information."""
-            
-            # Format prompt for Mistral
-            prompt = f"<s>[INST] {system_prompt}\n\nUser: {query} [/INST]"
-            
-            # Generate response
-            response = llm(
-                prompt,
-                max_tokens=512,
-                stop=["</s>", "[INST]"],
-                echo=False
-            )
-            
-            # Extract and clean up the generated text
-            answer = response['choices'][0]['text'].strip()
-            return answer
-        except Exception as e:
-            print(f"Error generating LLM response: {e}")
-            # Fallback to mock responses
-            return get_mock_answer(query)
-    else:
-        # Use mock responses if LLM is not available
-        return get_mock_answer(query)
+            return next(self._chunks)
+        finally:
+            with self._lock:
+                self._busy = False
+                close_now = self._closed
+            if close_now:
+                self._chunks.close()
+    
+    @property
+    def blocking(self):
+        """True if producing the next chunk may wait on the LLM."""
+        return self._tokens is not None
+    
+    def close(self):
+        # Cancel first, so the worker stops even if next() is running elsewhere
+        if self._tokens is not None:
+            self._tokens.close()
+        with self._lock:
+            self._closed = True
+            busy = self._busy
+        if not busy:
+            self._chunks.close()
+
+def _stream_llm_answer(tokens, query, version):
+    parts = []
+    try:
+        for text in tokens:
+            if text:
+                parts.append(text)
+                yield text
+        # Only complete answers are cached, never ones cut short by a disconnect
+        if not tokens.cancelled:
+            answer_cache.store(query, ''.join(parts).strip(), version)
+        return
+    except SchedulerTimeout:
+        raise
+    except Exception as e:
+        print(f"Error streaming LLM response: {e}")
+        if parts:
+            raise
+    
+    # Fallback when generation failed before the first token
+    yield from _stream_text(get_mock_answer(query))
+
+def _stream_text(text):
+    """Replay an already complete answer word by word."""
+    for word in re.split(r'(\s+)', text):
+        if word:
+            yield word
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 def get_mock_answer(query):
     """Provide mock answers based on query content."""
@@ -283,27 +696,271 @@ def get_mock_answer(query):
     else:
         return "I'm here to help with questions about SIMULIA subscription tiers, features, limitations, and support options. You can ask me specific questions about any of our tiers: Basic, Standard, or Premium."
 
+# Request handling shared by the Flask routes below and the Quart routes in
+# app/asgi.py: each route parses its input and builds a Reply with these
+# helpers, and only turns the Reply into its framework's response
+
+@dataclass
+class Reply:
+    """A response either frontend can send: a JSON payload, or a raw body with its mimetype."""
+    payload: object = None
+    status: int = 200
+    body: object = None
+    mimetype: str = None
+    headers: dict = field(default_factory=dict)
+    etag: str = None
+
+def error_reply(message, status=400):
+    return Reply({'error': message}, status)
+
+def overloaded_reply(error):
+    """Map scheduler backpressure to 429 (queue full) or 503 (loading, deadline exceeded)."""
+    if isinstance(error, SchedulerBusy):
+        reply = error_reply('Too many requests, please retry shortly', 429)
+    elif isinstance(error, SchedulerNotReady):
+        reply = error_reply('The language model is still loading, please retry shortly', 503)
+    else:
+        reply = error_reply('Inference is overloaded, please retry later', 503)
+    reply.headers['Retry-After'] = '1'
+    return reply
+
+@dataclass
+class GraphRequest:
+    tiers: list
+    depth: int
+    dim: int
+    fmt: str
+    accept_encoding: str
+
+def parse_graph_request(method, args, data, headers):
+    """GraphRequest from /api/graph query args or a POST body; returns (request, error Reply)."""
+    if method == 'POST':
+        data = data or {}
+        tiers = parse_tier_filter(data.get('tiers') or data.get('tier'))
+        depth = data.get('depth', 1)
+        format_param = data.get('format')
+        layout_param = data.get('layout')
+    else:
+        tiers = parse_tier_filter(args.getlist('tier') + args.getlist('tiers'))
+        depth = args.get('depth', 1)
+        format_param = args.get('format')
+        layout_param = args.get('layout')
+    
+    try:
+        depth = int(depth)
+    except (TypeError, ValueError):
+        return None, error_reply('depth must be an integer')
+    if not 1 <= depth <= MAX_GRAPH_DEPTH:
+        return None, error_reply(f'depth must be between 1 and {MAX_GRAPH_DEPTH}')
+    dim, error = parse_layout(layout_param)
+    if error:
+        return None, error_reply(error)
+    
+    # Plain JSON unless the client opts into the compact or msgpack encoding
+    try:
+        fmt = negotiate_format(format_param, headers.get('Accept'))
+    except UnsupportedFormat as e:
+        return None, error_reply(str(e), 406)
+    return GraphRequest(tiers, depth, dim, fmt, headers.get('Accept-Encoding')), None
+
+def graph_reply(graph_request, if_none_match=None):
+    """The /api/graph reply; computing a layout may take a while on a cache miss."""
+    tiers, depth, dim = graph_request.tiers, graph_request.depth, graph_request.dim
+    fmt, accept_encoding = graph_request.fmt, graph_request.accept_encoding
+    
+    snapshot = get_graph_snapshot()
+    tiers, error = validate_tiers(tiers, snapshot)
+    if error:
+        return error_reply(error)
+    
+    # Get graph data based on tier; with a layout, nodes carry precomputed positions
+    if dim is not None:
+        # Cached per version and view, encoded once and revalidated like the full graph
+        try:
+            layout = get_graph_with_layout(tiers, depth, dim, snapshot)
+        except LayoutUnavailable as e:
+            return error_reply(str(e), 501)
+        body, encoding, etag = layout.negotiate(fmt, accept_encoding)
+    elif tiers:
+        graph = snapshot.neighborhood(tiers, depth)
+        if fmt == 'json' and not accept_encoding:
+            return Reply(graph)
+        body, encoding = encode_graph(graph, fmt, accept_encoding)
+        etag = None
+    else:
+        # Full graph: serve the pre-encoded snapshot, or 304 if the client is current
+        body, encoding, etag = snapshot.negotiate(fmt, accept_encoding)
+    
+    reply = Reply(body=body, mimetype=MIMETYPES[fmt], headers={'Vary': 'Accept, Accept-Encoding'})
+    if encoding != 'identity':
+        reply.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        reply.etag = etag
+        reply.headers['Cache-Control'] = 'no-cache'
+        if if_none_match is not None and if_none_match.contains_weak(etag):
+            reply.status, reply.body = 304, b''
+            reply.headers.pop('Content-Encoding', None)
+    return reply
+
+def page_reply(kind, args):
+    """Cursor-paginated nodes or links for /api/graph/nodes|links."""
+    limit, error = parse_page_limit(args.get('limit'))
+    if error:
+        return error_reply(error)
+    try:
+        return Reply(get_graph_page(kind, args.get('cursor'), limit))
+    except ValueError as e:
+        return error_reply(str(e))
+    except StaleCursor:
+        return error_reply('The graph changed since this cursor was issued; start again without a cursor', 410)
+
+def export_reply():
+    """The whole current snapshot as streamed NDJSON."""
+    return Reply(body=iter_graph_ndjson(get_graph_snapshot()), mimetype='application/x-ndjson',
+                 headers={'Cache-Control': 'no-cache'})
+
+def compare_reply(args):
+    result, error = compare_tiers(
+        parse_tier_filter(args.getlist('tiers') + args.getlist('tier')),
+        args.get('shared', '').lower() in ('1', 'true', 'yes'),
+    )
+    return error_reply(error) if error else Reply(result)
+
+def search_reply(args):
+    result, error = search_entities(args.get('q', ''), args.get('limit'))
+    return error_reply(error) if error else Reply(result)
+
+def parse_query_request(method, args, data):
+    """The question from a JSON body or, for GET, ?query=; returns (query, error Reply)."""
+    if method == 'POST':
+        query = (data or {}).get('query', '')
+    else:
+        query = args.get('query', '')
+    if not query:
+        return None, error_reply('Query is required')
+    return query, None
+
+# Don't let browsers or reverse proxies cache or buffer an answer stream
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+class StreamProgress:
+    """SSE framing and timing for one streamed answer."""
+    def __init__(self, start):
+        self.start = start
+        self.first_token_at = None
+        self.chunks = 0
+        self.status = 'cancelled'
+        self.total_ms = None
+        self.ttft_ms = None
+    
+    def token(self, text):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+        return sse_event('token', {'text': text})
+    
+    def failed(self, error):
+        self.status = 'failed'
+        return sse_event('error', {'error': str(error)})
+    
+    def finish(self):
+        """Log the outcome; runs on normal completion and when the client disconnects mid-stream."""
+        self.total_ms = (time.perf_counter() - self.start) * 1000
+        self.ttft_ms = (self.first_token_at - self.start) * 1000 if self.first_token_at else None
+        print(f"Streamed answer {self.status}: ttft_ms={self.ttft_ms}, total_ms={self.total_ms:.0f}, chunks={self.chunks}")
+    
+    def done(self):
+        return sse_event('done', {'ttft_ms': self.ttft_ms, 'total_ms': self.total_ms, 'chunks': self.chunks})
+
+def api_status_payload():
+    return {"status": "API is working", "llm_available": scheduler is not None and scheduler.available}
+
+def health_payload():
+    return {"status": "ok", "graph_version": get_graph_snapshot().version}
+
+def ready_reply():
+    if scheduler is None:
+        llm_state = "mock"
+    else:
+        llm_state = scheduler.state
+    status = 503 if llm_state == "loading" else 200
+    return Reply({
+        "ready": status == 200,
+        "graph": "ready",
+        "llm": llm_state,
+        "workers_loaded": scheduler.stats()["workers_loaded"] if scheduler is not None else 0,
+        "load_seconds": scheduler.load_seconds if scheduler is not None else None
+    }, status)
+
+def stats_payload():
+    return {
+        "scheduler": scheduler.stats() if scheduler is not None else None,
+        "fast_path": get_intent_matcher().stats(),
+        "answer_cache": answer_cache.stats(),
+        "prefix_cache": merge_stats(prefix_models),
+        "layout_cache": layout_cache.stats()
+    }
+
+def metrics_reply():
+    return Reply(body=metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def make_flask_response(reply):
+    """Turn a Reply into a Flask response."""
+    if reply.body is None:
+        response = jsonify(reply.payload)
+    else:
+        response = Response(reply.body, mimetype=reply.mimetype)
+    response.status_code = reply.status
+    for name, value in reply.headers.items():
+        response.headers[name] = value
+    if reply.etag is not None:
+        response.set_etag(reply.etag)
+    return response
+
 @app.route('/api/graph', methods=['GET', 'POST', 'OPTIONS'])
 @cors_enabled
 def get_graph_data():
     """Endpoint to retrieve knowledge graph data."""
     if request.method == 'OPTIONS':
         return ''
-        
-    # Get tier parameter from request
-    if request.method == 'POST':
-        data = request.json
-        tier = data.get('tier', None)
-    else:
-        tier = request.args.get('tier', None)
-    
-    # Get graph data based on tier
-    if tier:
-        graph_data = get_data_for_tier(tier)
-    else:
-        graph_data = get_subscriptions_graph()
-    
-    return jsonify(graph_data)
+    graph_request, error = parse_graph_request(
+        request.method, request.args, request.json if request.method == 'POST' else None, request.headers
+    )
+    if error:
+        return make_flask_response(error)
+    return make_flask_response(graph_reply(graph_request, request.if_none_match))
+
+@app.route('/api/graph/export', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def export_graph():
+    """Stream the whole graph as NDJSON without building one response body."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(export_reply())
+
+@app.route('/api/graph/<any(nodes, links):kind>', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def get_graph_page_endpoint(kind):
+    """Cursor-paginated nodes or links: follow next_cursor until it is null."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(page_reply(kind, request.args))
+
+@app.route('/api/compare', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def compare_endpoint():
+    """Gains and losses for every pair of ?tiers=A,B,... (default: all tiers); ?shared=1 lists shared items too."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(compare_reply(request.args))
+
+@app.route('/api/search', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def search_endpoint():
+    """Typo-tolerant autocomplete over tier, feature, limitation and support names: ?q=...&limit="""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(search_reply(request.args))
 
 @app.route('/api/query', methods=['POST', 'OPTIONS'])
 @cors_enabled
@@ -311,25 +968,100 @@ def query_llm():
     """Endpoint to query the LLM for answers."""
     if request.method == 'OPTIONS':
         return ''
-        
-    data = request.json
-    query = data.get('query', '')
-    
-    if not query:
-        return jsonify({'error': 'Query is required'}), 400
+    query, error = parse_query_request(request.method, request.args, request.json)
+    if error:
+        return make_flask_response(error)
     
     # Get answer from LLM
-    answer = get_answer_for_query(query)
+    try:
+        answer = get_answer_for_query(query)
+    except (SchedulerBusy, SchedulerTimeout, SchedulerNotReady) as e:
+        return make_flask_response(overloaded_reply(e))
     
     return jsonify({'answer': answer})
 
+@app.route('/api/query/stream', methods=['GET', 'POST', 'OPTIONS'])
+@cors_enabled
+def query_llm_stream():
+    """Endpoint streaming the LLM answer token by token as Server-Sent Events."""
+    if request.method == 'OPTIONS':
+        return ''
+    
+    # EventSource clients can only GET, so accept the query either way
+    query, error = parse_query_request(
+        request.method, request.args, request.json if request.method == 'POST' else None
+    )
+    if error:
+        return make_flask_response(error)
+    
+    start = time.perf_counter()
+    try:
+        answer_stream = stream_answer_for_query(query)
+    except (SchedulerBusy, SchedulerNotReady) as e:
+        return make_flask_response(overloaded_reply(e))
+    
+    def generate():
+        progress = StreamProgress(start)
+        try:
+            for text in answer_stream:
+                yield progress.token(text)
+            progress.status = 'completed'
+        except Exception as e:
+            yield progress.failed(e)
+        finally:
+            answer_stream.close()
+            progress.finish()
+        yield progress.done()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    # Also cancels generation if the client leaves before the first chunk is sent
+    response.call_on_close(answer_stream.close)
+    response.headers.update(SSE_HEADERS)
+    return response
+
 @app.route('/api/test', methods=['GET', 'OPTIONS'])
 @cors_enabled
 def test_endpoint():
     """Test endpoint to verify API is working."""
     if request.method == 'OPTIONS':
         return ''
-    return jsonify({"status": "API is working", "llm_available": llm is not None})
+    return jsonify(api_status_payload())
+
+@app.route('/api/health', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def health_endpoint():
+    """Liveness: the process is up and graph endpoints are serving."""
+    if request.method == 'OPTIONS':
+        return ''
+    return jsonify(health_payload())
+
+@app.route('/api/ready', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def ready_endpoint():
+    """Readiness of the LLM: 503 while the model is still loading in the background.
+    
+    Graph endpoints don't depend on it, so route graph traffic on /api/health
+    and only hold back chat traffic until this returns 200.
+    """
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(ready_reply())
+
+@app.route('/api/stats', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def stats_endpoint():
+    """Runtime statistics for capacity planning."""
+    if request.method == 'OPTIONS':
+        return ''
+    return jsonify(stats_payload())
+
+@app.route('/api/metrics', methods=['GET', 'OPTIONS'])
+@cors_enabled
+def metrics_endpoint():
+    """Latency histograms, token counts and cache/queue stats in Prometheus text format."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_flask_response(metrics_reply())
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5050, debug=False)
@@ -0,0 +1,313 @@
+# app/asgi.py
+"""
+asyncio serving mode for the API, with the same routes and CORS behavior as
+app/api.py. Both frontends parse requests and build replies with the same
+helpers from app/api.py, so a route here is only the async wrapper.
+
+Graph endpoints run on the event loop straight from the in-memory snapshot,
+so thousands of them can be in flight per process. LLM requests are admitted
+to the inference scheduler without blocking (a full queue is a 429 right
+away) and only the wait for an admitted job is handed to a thread pool sized
+to the scheduler's capacity. With ASYNC_GRAPH_SYNC the served graph is
+mirrored from Neo4j with the async driver whenever its published version
+changes; it is off by default, like the Flask app, which has no such sync.
+
+Run with:
+
+    hypercorn app.asgi:app --bind 127.0.0.1:5050
+"""
+from quart import Quart, Response, request, jsonify, make_response
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    ASYNC_GRAPH_SYNC,
+    GRAPH_VERSION_CHECK_INTERVAL,
+    INFERENCE_WORKERS,
+    INFERENCE_QUEUE_SIZE,
+)
+from graph.query_engine import AsyncQueryEngine
+from llm.scheduler import SchedulerBusy, SchedulerTimeout, SchedulerNotReady
+# Request parsing and replies are shared with the Flask app; routes here only
+# decide what runs on the event loop and what is handed to a thread
+from app.api import (
+    CORS_HEADERS,
+    SSE_HEADERS,
+    StreamProgress,
+    api_status_payload,
+    compare_reply,
+    export_reply,
+    finish_answer_for_query,
+    graph_reply,
+    health_payload,
+    metrics_reply,
+    overloaded_reply,
+    page_reply,
+    parse_graph_request,
+    parse_query_request,
+    ready_reply,
+    replace_subscription_data,
+    search_reply,
+    start_answer_for_query,
+    stats_payload,
+    stream_answer_for_query,
+    subscription_data_from_profiles,
+)
+
+app = Quart(__name__)
+
+# Threads only ever wait on jobs the scheduler already admitted, so this never
+# needs to be larger than what the scheduler can hold
+llm_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS + INFERENCE_QUEUE_SIZE, thread_name_prefix="llm-wait"
+)
+
+# Custom CORS handling
+def cors_enabled(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        # Create response object
+        if request.method == 'OPTIONS':
+            response = await make_response()
+        else:
+            response = await make_response(await f(*args, **kwargs))
+
+        # Add CORS headers
+        for name, value in CORS_HEADERS.items():
+            response.headers.add(name, value)
+
+        return response
+    return decorated_function
+
+def make_quart_response(reply):
+    """Turn an app.api Reply into a Quart response."""
+    if reply.body is None:
+        response = jsonify(reply.payload)
+    else:
+        response = Response(reply.body, mimetype=reply.mimetype)
+    response.status_code = reply.status
+    for name, value in reply.headers.items():
+        response.headers[name] = value
+    if reply.etag is not None:
+        response.set_etag(reply.etag)
+    return response
+
+async def sync_graph_from_neo4j(engine):
+    """Mirror the graph from Neo4j each time its published version changes.
+
+    Until the first successful read (or if Neo4j is down) the built-in sample
+    data keeps being served.
+    """
+    synced_version = None
+    while True:
+        try:
+            version = await engine.get_graph_version()
+            if version is not None and version != synced_version:
+                profiles = await engine.get_tier_profiles(await engine.get_tier_names())
+                data = subscription_data_from_profiles(profiles)
+                # Building the snapshot is CPU work; keep it off the event loop
+                snapshot = await asyncio.get_running_loop().run_in_executor(
+                    None, replace_subscription_data, data
+                )
+                synced_version = version
+                print(f"Serving graph version {version} from Neo4j (snapshot {snapshot.version})")
+        except Exception as e:
+            print(f"Graph sync from Neo4j failed: {e}")
+        await asyncio.sleep(GRAPH_VERSION_CHECK_INTERVAL)
+
+@app.before_serving
+async def start_graph_sync():
+    app.graph_engine = None
+    app.graph_sync_task = None
+    if ASYNC_GRAPH_SYNC:
+        app.graph_engine = AsyncQueryEngine()
+        app.graph_sync_task = asyncio.create_task(sync_graph_from_neo4j(app.graph_engine))
+
+@app.after_serving
+async def stop_graph_sync():
+    if app.graph_sync_task is not None:
+        app.graph_sync_task.cancel()
+    if app.graph_engine is not None:
+        await app.graph_engine.close()
+
+@app.route('/api/graph', methods=['GET', 'POST', 'OPTIONS'])
+@cors_enabled
+async def get_graph_data():
+    """Endpoint to retrieve knowledge graph data."""
+    if request.method == 'OPTIONS':
+        return ''
+    data = await request.get_json() if request.method == 'POST' else None
+    graph_request, error = parse_graph_request(request.method, request.args, data, request.headers)
+    if error:
+        return make_quart_response(error)
+    if graph_request.dim is not None:
+        # A layout cache miss runs the force simulation; keep it off the event loop
+        reply = await asyncio.get_running_loop().run_in_executor(
+            None, graph_reply, graph_request, request.if_none_match
+        )
+    else:
+        reply = graph_reply(graph_request, request.if_none_match)
+    return make_quart_response(reply)
+
+@app.route('/api/graph/export', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def export_graph():
+    """Stream the whole graph as NDJSON without building one response body."""
+    if request.method == 'OPTIONS':
+        return ''
+    reply = export_reply()
+    lines = reply.body
+
+    async def generate():
+        for chunk in lines:
+            yield chunk
+
+    reply.body = generate()
+    response = make_quart_response(reply)
+    response.timeout = None
+    return response
+
+@app.route('/api/graph/<any(nodes, links):kind>', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def get_graph_page_endpoint(kind):
+    """Cursor-paginated nodes or links: follow next_cursor until it is null."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_quart_response(page_reply(kind, request.args))
+
+@app.route('/api/compare', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def compare_endpoint():
+    """Gains and losses for every pair of ?tiers=A,B,... (default: all tiers); ?shared=1 lists shared items too."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_quart_response(compare_reply(request.args))
+
+@app.route('/api/search', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def search_endpoint():
+    """Typo-tolerant autocomplete over tier, feature, limitation and support names: ?q=...&limit="""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_quart_response(search_reply(request.args))
+
+@app.route('/api/query', methods=['POST', 'OPTIONS'])
+@cors_enabled
+async def query_llm():
+    """Endpoint to query the LLM for answers."""
+    if request.method == 'OPTIONS':
+        return ''
+    query, error = parse_query_request(request.method, request.args, await request.get_json())
+    if error:
+        return make_quart_response(error)
+
+    # Get answer from LLM; prompt building, the cache lookup and admission run
+    # in the default pool, and only an admitted job is waited for in llm_executor
+    loop = asyncio.get_running_loop()
+    try:
+        answer, job, version = await loop.run_in_executor(None, start_answer_for_query, query)
+        if job is not None:
+            answer = await loop.run_in_executor(llm_executor, finish_answer_for_query, query, job, version)
+    except (SchedulerBusy, SchedulerTimeout, SchedulerNotReady) as e:
+        return make_quart_response(overloaded_reply(e))
+
+    return jsonify({'answer': answer})
+
+@app.route('/api/query/stream', methods=['GET', 'POST', 'OPTIONS'])
+@cors_enabled
+async def query_llm_stream():
+    """Endpoint streaming the LLM answer token by token as Server-Sent Events."""
+    if request.method == 'OPTIONS':
+        return ''
+
+    # EventSource clients can only GET, so accept the query either way
+    data = await request.get_json() if request.method == 'POST' else None
+    query, error = parse_query_request(request.method, request.args, data)
+    if error:
+        return make_quart_response(error)
+
+    start = time.perf_counter()
+    try:
+        # Builds the prompt and looks up the answer cache; keep it off the event loop
+        answer_stream = await asyncio.get_running_loop().run_in_executor(None, stream_answer_for_query, query)
+    except (SchedulerBusy, SchedulerNotReady) as e:
+        return make_quart_response(overloaded_reply(e))
+
+    async def generate():
+        loop = asyncio.get_running_loop()
+        progress = StreamProgress(start)
+        try:
+            while True:
+                # Waiting for the next LLM token blocks, so do it in the pool
+                if answer_stream.blocking:
+                    text = await loop.run_in_executor(llm_executor, next, answer_stream, None)
+                else:
+                    text = next(answer_stream, None)
+                if text is None:
+                    break
+                yield progress.token(text)
+            progress.status = 'completed'
+        except Exception as e:
+            yield progress.failed(e)
+        finally:
+            # Also runs when the client disconnects and the server cancels us;
+            # safe while the pool thread is still inside next()
+            answer_stream.close()
+            progress.finish()
+        yield progress.done()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    # Answers can take longer than the default response timeout
+    response.timeout = None
+    response.headers.update(SSE_HEADERS)
+    return response
+
+@app.route('/api/test', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def test_endpoint():
+    """Test endpoint to verify API is working."""
+    if request.method == 'OPTIONS':
+        return ''
+    return jsonify(api_status_payload())
+
+@app.route('/api/health', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def health_endpoint():
+    """Liveness: the process is up and graph endpoints are serving."""
+    if request.method == 'OPTIONS':
+        return ''
+    return jsonify(health_payload())
+
+@app.route('/api/ready', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def ready_endpoint():
+    """Readiness of the LLM: 503 while the model is still loading in the background."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_quart_response(ready_reply())
+
+@app.route('/api/stats', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def stats_endpoint():
+    """Runtime statistics for capacity planning."""
+    if request.method == 'OPTIONS':
+        return ''
+    return jsonify(stats_payload())
+
+@app.route('/api/metrics', methods=['GET', 'OPTIONS'])
+@cors_enabled
+async def metrics_endpoint():
+    """Latency histograms, token counts and cache/queue stats in Prometheus text format."""
+    if request.method == 'OPTIONS':
+        return ''
+    return make_quart_response(metrics_reply())
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=5050, debug=False)
@@ -6,15 +6,12 @@ def test_query_engine():
     
     tier_name = "Premium"  # This should be the tier name you're interested in
     
-    features = engine.get_tier_features(tier_name)
-    limitations = engine.get_tier_limitations(tier_name)
-    support = engine.get_tier_support(tier_name)
-    upgradable_tiers = engine.get_upgradable_tiers(tier_name)
+    profile = engine.get_tier_profile(tier_name)
     
-    print(f"Features for {tier_name}: {features}")
-    print(f"Limitations for {tier_name}: {limitations}")
-    print(f"Support for {tier_name}: {support}")
-    print(f"Upgradable tiers for {tier_name}: {upgradable_tiers}")
+    print(f"Features for {tier_name}: {profile.features}")
+    print(f"Limitations for {tier_name}: {profile.limitations}")
+    print(f"Support for {tier_name}: {profile.support}")
+    print(f"Upgradable tiers for {tier_name}: {profile.upgrades}")
     
     engine.close()
 
@@ -1,6 +1,7 @@
 # streamlit_frontend/chat_ui.py
 
 import sys, os
+import uuid
 import streamlit as st
 
 # Make project root importable
@@ -8,12 +9,32 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from graph.query_engine import QueryEngine
+from graph.cache import CachedQueryEngine
 from llm.model import load_llm
-from llm.answer_generator import generate_answer
+from llm.prefix_cache import PrefixCachedModel, SharedModel
+from llm.answer_generator import PromptBuilder, build_prompt_prefix, generate_answer
+from llm.conversation_memory import ConversationMemory
 
-# Load LLM once
-llm = load_llm()
+@st.cache_resource
+def get_model():
+    # Load LLM once per server process, not per rerun; the wrapper keeps the
+    # system prompt evaluated and records token metrics
+    return SharedModel(PrefixCachedModel(load_llm(), build_prompt_prefix))
+
+@st.cache_resource
+def get_query_engine():
+    # One cached engine per server process, shared by every chat session
+    return CachedQueryEngine()
+
+@st.cache_resource(max_entries=2)
+def get_prompt_builder(graph_version):
+    # Rebuilt only when the graph version changes; facts come from every tier
+    engine = get_query_engine()
+    profiles = engine.get_tier_profiles(engine.get_tier_names())
+    return PromptBuilder.from_tier_profiles(profiles, count_tokens=count_tokens, version=graph_version)
+
+def count_tokens(text):
+    return len(get_model().llm.tokenize(text.encode("utf-8"), add_bos=False))
 
 st.set_page_config(page_title="Simulia Chat", layout="wide")
 st.title("🗣️ Simulia Subscription Support Chat")
@@ -25,10 +46,37 @@ with st.sidebar:
     default_info = st.selectbox(
         "Default Info Type", ["features", "limitations", "support", "upgrades"]
     )
+    stats = get_query_engine().stats()
+    st.caption(
+        f"Graph cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%}), {stats['size']}/{stats['max_size']} entries"
+    )
 
 # Initialize chat history
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "history" not in st.session_state:
     st.session_state.history = []  # list of {"role":"user"|"assistant","message":str}
+if "memory" not in st.session_state:
+    # What the model sees of the conversation: bounded, older turns summarized
+    st.session_state.memory = ConversationMemory(count_tokens=count_tokens)
+
+with st.sidebar:
+    memory_stats = st.session_state.memory.stats()
+    st.caption(
+        f"Conversation memory: {memory_stats['tokens']}/{memory_stats['token_budget']} tokens, "
+        f"{memory_stats['verbatim_turns']} recent turns, {memory_stats['summarized_turns']} summarized"
+    )
+    kv_stats = get_model().stats()
+    st.caption(
+        f"Saved model states: {kv_stats['sessions']} sessions, "
+        f"{kv_stats['bytes'] // 2**20}/{kv_stats['budget'] // 2**20} MB"
+    )
+    if st.button("Clear conversation"):
+        st.session_state.history = []
+        st.session_state.memory.clear()
+        get_model().forget(st.session_state.session_id)
+        st.rerun()
 
 # Render chat history
 for msg in st.session_state.history:
@@ -46,30 +94,21 @@ if submit and user_input:
     # 1) Append the user message
     st.session_state.history.append({"role": "user", "message": user_input})
 
-    # 2) Query the knowledge graph
-    engine = QueryEngine()
-    try:
-        if default_info == "features":
-            retrieved = engine.get_tier_features(default_tier)
-        elif default_info == "limitations":
-            retrieved = engine.get_tier_limitations(default_tier)
-        elif default_info == "support":
-            retrieved = engine.get_tier_support(default_tier)
-        elif default_info == "upgrades":
-            retrieved = engine.get_upgradable_tiers(default_tier)
-        else:
-            retrieved = []
-    finally:
-        engine.close()
+    # 2) Retrieve the facts relevant to the question from the knowledge graph;
+    #    the sidebar selection only breaks ties when the question names no tier
+    engine = get_query_engine()
+    prompt_builder = get_prompt_builder(engine.graph_version)
 
     # 3) Generate the assistant’s reply
-    answer = generate_answer(
-        llm=llm,
-        question=user_input,
-        retrieved_info=retrieved,
-        entity=default_tier,
-        info_type=default_info
-    )
+    with get_model().lend(st.session_state.session_id) as llm:
+        answer = generate_answer(
+            llm=llm,
+            question=user_input,
+            entity=default_tier,
+            info_type=default_info,
+            prompt_builder=prompt_builder,
+            memory=st.session_state.memory
+        )
 
     # 4) Append the assistant message
     st.session_state.history.append({"role": "assistant", "message": answer})
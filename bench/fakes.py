@@ -0,0 +1,131 @@
+# bench/fakes.py
+"""
+In-process stand-ins for Neo4j and the LLM, so the API and QueryEngine can be
+benchmarked without a database server or model file.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from graph.closure import catalog_tiers, compute_closures, cumulative_items, upgrade_gains
+from graph.query_engine import (
+    TIER_PROFILES_QUERY, TIER_NAMES_QUERY, GRAPH_VERSION_QUERY,
+    FEATURES_AFTER_UPGRADE_QUERY, UPGRADE_GAINS_QUERY,
+)
+from graph.synthetic_catalog import generate_catalog
+
+def catalog_data(num_nodes, seed=0):
+    """A synthetic catalog of about `num_nodes` nodes in the api.SUBSCRIPTION_DATA shape."""
+    entities, relationships = generate_catalog(num_nodes, seed)
+    return {
+        "Features": entities["Features"],
+        "Limitations": entities["Limitations"],
+        "SupportLevels": entities["SupportLevels"],
+        "Relationships": {
+            "Upgrades": relationships["Upgrades"],
+            "SUPPORTS": entities["SupportLevels"],
+        },
+    }
+
+class FakeGraphConnector:
+    """Answers QueryEngine's Cypher from a catalog dict instead of a Neo4j server.
+
+    Queries are recognized by their text, so only the queries QueryEngine
+    actually sends are supported. `query_latency` seconds are slept per query
+    to stand in for the network round trip.
+    """
+
+    def __init__(self, data, query_latency=0.0, version="bench"):
+        self.data = data
+        self.query_latency = query_latency
+        self.version = version
+        self.queries = 0
+        self._lock = threading.Lock()
+        # The closure KnowledgeGraphBuilder would have stored on the tier nodes
+        self.tiers = catalog_tiers(data, data["Relationships"])
+        self.closures = compute_closures(self.tiers)
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def run_query(self, query, params=None):
+        params = params or {}
+        with self._lock:
+            self.queries += 1
+        if self.query_latency:
+            time.sleep(self.query_latency)
+
+        if query == TIER_PROFILES_QUERY:
+            return [self._profile(t) for t in params["tiers"] if t in self.data["Features"]]
+        if query == TIER_NAMES_QUERY:
+            return [{"tier": t} for t in sorted(self.data["Features"])]
+        if query == GRAPH_VERSION_QUERY:
+            return [{"version": self.version}]
+        if query == FEATURES_AFTER_UPGRADE_QUERY:
+            if params["to"] not in self.closures.get(params["from"], {}).get("upgrade_closure", []):
+                return []
+            return [{"features": cumulative_items(self.tiers, self.closures, params["to"], "features")}]
+        if query == UPGRADE_GAINS_QUERY:
+            if params["to"] not in self.closures.get(params["from"], {}).get("upgrade_closure", []):
+                return []
+            return [vars(upgrade_gains(self.tiers, self.closures, params["from"], params["to"]))]
+
+        tier = params.get("tier")
+        if "t.limitations AS limitations" in query:
+            if tier not in self.data["Limitations"]:
+                return []
+            return [{"limitations": self.data["Limitations"][tier]}]
+        if "[:INCLUDES]" in query:
+            return [{"feature": f} for f in self.data["Features"].get(tier, [])]
+        if "[:SUPPORTS]" in query:
+            return [{"support": s} for s in self.data["SupportLevels"].get(tier, [])]
+        if "[:CAN_UPGRADE_TO]" in query:
+            return [{"upgrade": u} for u in self.data["Relationships"]["Upgrades"].get(tier, [])]
+        raise ValueError(f"FakeGraphConnector doesn't understand query: {query.strip()[:80]}")
+
+    def _profile(self, tier):
+        return {
+            "tier": tier,
+            "features": list(self.data["Features"].get(tier, [])),
+            "limitations": list(self.data["Limitations"].get(tier, [])),
+            "support": list(self.data["SupportLevels"].get(tier, [])),
+            "upgrades": list(self.data["Relationships"]["Upgrades"].get(tier, [])),
+        }
+
+    def health_check(self):
+        return True
+
+    def close(self):
+        pass
+
+class StubLLM:
+    """Deterministic llama_cpp.Llama stand-in that takes `token_latency` seconds per token.
+
+    The answer depends only on the prompt, so runs are reproducible.
+    """
+
+    WORDS = ["the", "tier", "includes", "support", "and", "features", "for", "simulation", "upgrade", "with"]
+
+    def __init__(self, token_latency=0.02, tokens=32):
+        self.token_latency = token_latency
+        self.tokens = tokens
+
+    def _words(self, prompt, max_tokens):
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        count = min(self.tokens, max_tokens or self.tokens)
+        return [self.WORDS[(seed + i * 7) % len(self.WORDS)] for i in range(count)]
+
+    def __call__(self, prompt, max_tokens=16, stop=None, echo=False, stream=False, **kwargs):
+        words = self._words(prompt, max_tokens)
+        if stream:
+            return self._stream(words)
+        time.sleep(self.token_latency * len(words))
+        return {"choices": [{"text": " ".join(words), "finish_reason": "length"}]}
+
+    def _stream(self, words):
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency)
+            yield {"choices": [{"text": word if i == 0 else " " + word, "finish_reason": None}]}
@@ -0,0 +1,271 @@
+# bench/run.py
+"""
+End-to-end benchmark of the API and QueryEngine against in-process fakes
+(see bench/fakes.py), so it runs anywhere and results are comparable.
+
+    python -m bench.run --sizes 1000 100000 --concurrency 1 16 64
+    python -m bench.run --save-baseline main
+    python -m bench.run --compare main
+
+Scenarios:
+    graph        GET /api/graph (full snapshot)
+    graph_tier   GET /api/graph?tier=<random tier>
+    search       GET /api/search?q=<prefix of a node label>
+    query        POST /api/query with open-ended questions that reach the stub LLM
+    engine       QueryEngine lookups over the fake connector
+    engine_cached  the same through CachedQueryEngine
+    engine_memory  the same through the in-process InMemoryBackend
+
+Each run reports p50/p95/p99 latency and throughput per scenario, catalog
+size and concurrency. Baselines are JSON files in bench/baselines/.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import INFERENCE_QUEUE_SIZE
+from bench.fakes import FakeGraphConnector, StubLLM, catalog_data
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+SCENARIOS = ["graph", "graph_tier", "search", "query", "engine", "engine_cached", "engine_memory"]
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(p / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def run_load(request, total, concurrency, warmup=5):
+    """Call request(i) `total` times from `concurrency` threads.
+
+    `request` returns an HTTP-like status code (200 for engine calls). Returns
+    latency percentiles in milliseconds, throughput and error counts.
+    """
+    for i in range(min(warmup, total)):
+        request(i)
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            status = request(i)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            status = 599
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(n for status, n in statuses.items() if status < 400)
+    return {
+        "requests": total,
+        "ok": ok,
+        "rejected": statuses.get(429, 0) + statuses.get(503, 0),
+        "errors": total - ok - statuses.get(429, 0) - statuses.get(503, 0),
+        "throughput_rps": ok / wall if wall else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+        "max_ms": 1000 * latencies[-1],
+    }
+
+class ApiHarness:
+    """The Flask API with the fake catalog and a scheduler over stub LLMs."""
+
+    def __init__(self, args):
+        from app import api
+        from llm.answer_cache import SemanticAnswerCache
+        from llm.scheduler import InferenceScheduler
+
+        self.api = api
+        # Every benchmark question must reach the LLM, so no answer is ever reused
+        api.answer_cache = SemanticAnswerCache(path=None, max_size=0)
+        if api.scheduler is not None:
+            api.scheduler.shutdown()
+        api.scheduler = InferenceScheduler(
+            lambda n_threads: StubLLM(args.token_latency, args.tokens),
+            workers=args.llm_workers,
+            max_queue=args.llm_queue,
+        ).start()
+        self._local = threading.local()
+
+    def load_catalog(self, data):
+        self.api.replace_subscription_data(data)
+        self.tiers = list(data["Features"])
+        # Typed-so-far prefixes of real labels, as an autocomplete box sends them
+        rng = random.Random(0)
+        labels = [node["label"] for node in self.api.get_graph_snapshot().nodes]
+        self.search_queries = [label[:rng.randint(1, len(label))] for label in rng.sample(labels, min(1000, len(labels)))]
+        # Build the index here rather than inside the first timed request
+        self.api.get_search_index()
+
+    def client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.api.app.test_client()
+        return client
+
+    def graph(self, i):
+        return self.client().get("/api/graph").status_code
+
+    def graph_tier(self, i):
+        tier = self.tiers[i % len(self.tiers)]
+        return self.client().get("/api/graph", query_string={"tier": tier}).status_code
+
+    def search(self, i):
+        q = self.search_queries[i % len(self.search_queries)]
+        return self.client().get("/api/search", query_string={"q": q}).status_code
+
+    def query(self, i):
+        tier = self.tiers[i % len(self.tiers)]
+        question = f"Why would a team of {i} engineers pick {tier}?"
+        return self.client().post("/api/query", json={"query": question}).status_code
+
+    def close(self):
+        self.api.scheduler.shutdown()
+
+def engine_requests(engine, tiers, rng_seed=0):
+    """Round-robin over QueryEngine lookups, as one request callable."""
+    rng = random.Random(rng_seed)
+    picks = [rng.randrange(len(tiers)) for _ in range(1024)]
+
+    def request(i):
+        tier = tiers[picks[i % len(picks)]]
+        kind = i % 6
+        if kind == 0:
+            engine.get_tier_features(tier)
+        elif kind == 1:
+            engine.get_tier_limitations(tier)
+        elif kind == 2:
+            engine.get_tier_support(tier)
+        elif kind == 3:
+            engine.get_upgradable_tiers(tier)
+        elif kind == 4:
+            engine.get_tier_profiles(tiers[:10])
+        else:
+            engine.get_features_after_upgrade(tier, tiers[-1])
+        return 200
+    return request
+
+def run_benchmarks(args):
+    from graph.query_engine import QueryEngine
+    from graph.cache import CachedQueryEngine
+    from graph.memory_backend import InMemoryBackend
+
+    harness = None
+    if any(s in args.scenarios for s in ("graph", "graph_tier", "search", "query")):
+        harness = ApiHarness(args)
+
+    results = {}
+    try:
+        for size in args.sizes:
+            data = catalog_data(size, args.seed)
+            tiers = list(data["Features"])
+            if harness is not None:
+                harness.load_catalog(data)
+            for scenario in args.scenarios:
+                if scenario == "engine_memory":
+                    engine = QueryEngine(backend=InMemoryBackend(data, data["Relationships"]))
+                    request = engine_requests(engine, tiers, args.seed)
+                elif scenario in ("engine", "engine_cached"):
+                    engine = QueryEngine(connector=FakeGraphConnector(data, args.query_latency))
+                    if scenario == "engine_cached":
+                        engine = CachedQueryEngine(engine)
+                    request = engine_requests(engine, tiers, args.seed)
+                else:
+                    request = getattr(harness, scenario)
+                for concurrency in args.concurrency:
+                    total = args.query_requests if scenario == "query" else args.requests
+                    result = run_load(request, total, concurrency)
+                    key = f"{scenario}/size={size}/concurrency={concurrency}"
+                    results[key] = result
+                    print_result(key, result)
+    finally:
+        if harness is not None:
+            harness.close()
+    return results
+
+def print_result(key, r):
+    print(
+        f"{key:<45} p50={r['p50_ms']:8.2f}ms p95={r['p95_ms']:8.2f}ms p99={r['p99_ms']:8.2f}ms "
+        f"{r['throughput_rps']:9.1f} req/s  ok={r['ok']} rejected={r['rejected']} errors={r['errors']}"
+    )
+
+def save_baseline(name, args, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    params = {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare")}
+    with open(path, "w") as f:
+        json.dump({"created_at": time.time(), "params": params, "results": results}, f, indent=2)
+    print(f"Saved baseline to {path}")
+
+def compare_baseline(name, results, tolerance):
+    """Print changes against a saved baseline; returns the keys that regressed."""
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    print(f"\nCompared with baseline {path} (tolerance {tolerance:.0%}):")
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            print(f"{key:<45} no baseline")
+            continue
+        p95_change = result["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rps_change = result["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        if regressed:
+            regressions.append(key)
+        print(
+            f"{key:<45} p95 {p95_change:+7.1%}  throughput {rps_change:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API and QueryEngine with local fakes")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000],
+                        help="catalog sizes in nodes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per graph/engine run")
+    parser.add_argument("--query-requests", type=int, default=100, help="requests per /api/query run")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="stub LLM seconds per token")
+    parser.add_argument("--tokens", type=int, default=32, help="stub LLM tokens per answer")
+    parser.add_argument("--llm-workers", type=int, default=1)
+    parser.add_argument("--llm-queue", type=int, default=INFERENCE_QUEUE_SIZE)
+    parser.add_argument("--query-latency", type=float, default=0.0, help="fake Neo4j seconds per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative p95/throughput change counted as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, args, results)
+    if args.compare:
+        if compare_baseline(args.compare, results, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
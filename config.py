@@ -2,3 +2,73 @@
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "neo4j123"  # 👈 Match the password used in Neo4j Desktop
+
+# Shared driver connection pool
+NEO4J_MAX_POOL_SIZE = 50
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = 30  # seconds to wait for a free connection
+NEO4J_LIVENESS_CHECK_TIMEOUT = 60  # seconds idle before a pooled connection is pinged
+
+# Rows per transaction when bulk loading the graph
+BULK_BATCH_SIZE = 10000
+
+# Snapshot of the last synced graph state, used by `build_graph --sync`
+GRAPH_MANIFEST_PATH = "data/graph_manifest.json"
+
+# QueryEngine result cache
+QUERY_CACHE_MAX_SIZE = 1024
+QUERY_CACHE_TTL = 300  # seconds
+GRAPH_VERSION_CHECK_INTERVAL = 30  # seconds between GraphMeta version polls
+
+# LLM inference scheduler
+INFERENCE_WORKERS = 1  # model instances; each gets cpu_count // INFERENCE_WORKERS threads
+INFERENCE_QUEUE_SIZE = 16  # queued requests beyond this are rejected with 429
+INFERENCE_TIMEOUT = 60  # seconds a request may wait in the queue before a 503
+INFERENCE_SHUTDOWN_TIMEOUT = 10  # seconds shutdown() waits for workers to exit
+
+# Semantic answer cache for repeated customer questions
+ANSWER_CACHE_PATH = "data/answer_cache.json"
+ANSWER_CACHE_THRESHOLD = 0.8  # cosine similarity needed to reuse a paraphrase's answer
+ANSWER_CACHE_MAX_SIZE = 512
+ANSWER_CACHE_TTL = 7 * 24 * 3600  # seconds
+ANSWER_CACHE_SAVE_INTERVAL = 5.0  # seconds between background writes of new answers
+
+# Retrieval-grounded prompts: catalog facts per question are packed into this many tokens
+PROMPT_FACT_TOKEN_BUDGET = 400
+
+# ASGI serving mode (app/asgi.py): mirror the served graph from Neo4j with the async driver.
+# Off by default so it serves the same built-in data, graph and ETags as the Flask app
+ASYNC_GRAPH_SYNC = False
+
+# Latency/token metrics exported at /api/metrics; False turns every timer into a no-op
+METRICS_ENABLED = True
+
+# Streaming/paginated graph export
+GRAPH_FETCH_SIZE = 1000  # records pulled from Neo4j per round trip when streaming
+GRAPH_PAGE_SIZE = 1000  # default nodes/links per page of /api/graph/nodes and /links
+GRAPH_PAGE_MAX_SIZE = 10000
+
+# QueryEngine backend: "neo4j", or "memory" to serve lookups in-process from the JSON below
+GRAPH_BACKEND = "neo4j"
+GRAPH_ENTITIES_PATH = "data/entities.json"
+GRAPH_RELATIONSHIPS_PATH = "data/relationships.json"
+
+# /api/compare: tiers per request (pairs grow quadratically)
+COMPARE_MAX_TIERS = 64
+
+# /api/search autocomplete
+SEARCH_LIMIT = 10  # results when ?limit= is omitted
+SEARCH_MAX_LIMIT = 50
+
+# Server-side graph layout (/api/graph?layout=2d|3d); needs numpy
+GRAPH_LAYOUT_ITERATIONS = 50
+GRAPH_LAYOUT_INCREMENTAL_ITERATIONS = 10  # when seeded from the previous version's layout
+GRAPH_LAYOUT_EXACT_MAX_NODES = 3000  # larger graphs use sampled repulsion
+GRAPH_LAYOUT_CACHE_SIZE = 32  # layouts kept per (version, tier filter, depth, dimensions)
+
+# Per-session chat memory (Streamlit): history tokens in each prompt, of which summaries of older turns
+CONVERSATION_TOKEN_BUDGET = 600
+CONVERSATION_SUMMARY_TOKEN_BUDGET = 150
+CONVERSATION_TURN_SUMMARY_TOKENS = 40
+# llama_cpp KV states kept for chat sessions waiting on the shared model, all sessions together.
+# A 7B model's full 2048-token context is about 256MB, so this holds a few long conversations
+CONVERSATION_KV_STATE_BUDGET_BYTES = 1024 * 1024 * 1024
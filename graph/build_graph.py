@@ -1,26 +1,190 @@
 # graph/build_graph.py
 
-import sys, os, json
+import sys, os, json, time
 from graph.neo4j_connector import Neo4jConnector
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from graph.version import compute_graph_version, publish_graph_version
+from graph.closure import CLOSURE_QUERY, catalog_tiers, closure_rows
+from graph.sync import desired_state, read_graph_state, load_manifest, save_manifest, diff_states, diff_statements
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, BULK_BATCH_SIZE, GRAPH_MANIFEST_PATH
 
 # Ensure project root is importable
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
+# Uniqueness constraints double as the indexes MERGE needs to stay O(log n) per row
+CONSTRAINTS = [
+    "CREATE CONSTRAINT tier_name IF NOT EXISTS FOR (t:SubscriptionTier) REQUIRE t.name IS UNIQUE",
+    "CREATE CONSTRAINT feature_name IF NOT EXISTS FOR (f:Feature) REQUIRE f.name IS UNIQUE",
+    "CREATE CONSTRAINT support_name IF NOT EXISTS FOR (s:SupportChannel) REQUIRE s.name IS UNIQUE",
+]
+
+BULK_QUERIES = {
+    "tiers": """
+        UNWIND $rows AS row
+        MERGE (t:SubscriptionTier {name: row.name})
+        SET t.limitations = row.limitations
+    """,
+    "features": """
+        UNWIND $rows AS row
+        MATCH (t:SubscriptionTier {name: row.tier})
+        MERGE (f:Feature {name: row.name})
+        MERGE (t)-[:INCLUDES]->(f)
+    """,
+    "support": """
+        UNWIND $rows AS row
+        MATCH (t:SubscriptionTier {name: row.tier})
+        MERGE (s:SupportChannel {name: row.name})
+        MERGE (t)-[:SUPPORTS]->(s)
+    """,
+    "upgrades": """
+        UNWIND $rows AS row
+        MATCH (a:SubscriptionTier {name: row.src})
+        MATCH (b:SubscriptionTier {name: row.dst})
+        MERGE (a)-[:CAN_UPGRADE_TO]->(b)
+    """,
+    # Upgrade closure and cumulative sets, once every edge they derive from exists
+    "closure": CLOSURE_QUERY,
+}
+
+# Readers poll this node to learn that the graph has changed
+PUBLISH_VERSION_QUERY = """
+    MERGE (m:GraphMeta {key: 'graph'})
+    SET m.version = $version, m.updated_at = timestamp()
+"""
+
+def build_bulk_rows(entities, relationships):
+    """Flatten the entity/relationship JSON into parameter lists for BULK_QUERIES."""
+    rows = {"tiers": [], "features": [], "support": [], "upgrades": []}
+    for tier, features in entities["Features"].items():
+        rows["tiers"].append(
+            {"name": tier, "limitations": entities["Limitations"].get(tier, [])}
+        )
+        rows["features"].extend({"tier": tier, "name": feat} for feat in features)
+        rows["support"].extend(
+            {"tier": tier, "name": item}
+            for item in entities["SupportLevels"].get(tier, [])
+        )
+    for src, dests in relationships.get("Upgrades", {}).items():
+        rows["upgrades"].extend({"src": src, "dst": dst} for dst in dests)
+    rows["closure"] = closure_rows(catalog_tiers(entities, relationships))
+    return rows
+
 class KnowledgeGraphBuilder:
-    def __init__(self, uri, user, password):
-        self.connector = Neo4jConnector(uri, user, password)
+    def __init__(self, uri, user, password, connector=None):
+        self.connector = connector or Neo4jConnector(uri, user, password)
 
-    def build_graph(self, entities_path, relationships_path):
-        # Clear existing data
-        self.connector.run_query("MATCH (n) DETACH DELETE n")
+    def build_graph(self, entities_path, relationships_path, bulk=True, batch_size=BULK_BATCH_SIZE,
+                    manifest_path=None):
+        entities, relationships = self._load_json(entities_path, relationships_path)
+
+        if bulk:
+            self.bulk_load(entities, relationships, batch_size)
+        else:
+            with self.connector.session():
+                self._load_row_by_row(entities, relationships)
+
+        desired = desired_state(entities, relationships)
+        version = compute_graph_version(desired)
+        self.connector.run_query(PUBLISH_VERSION_QUERY, {"version": version})
+        publish_graph_version(version)
+
+        if manifest_path:
+            save_manifest(manifest_path, desired)
+        print(f"✅ Graph successfully built and pushed to Neo4j (version {version}).")
+
+    def sync_graph(self, entities_path, relationships_path, manifest_path=None):
+        """Apply only the differences between the JSON and the graph, in one transaction.
+
+        The current state comes from `manifest_path` when that file exists, otherwise
+        it is read from Neo4j. Readers never see a partially rebuilt graph.
+        Returns the applied GraphDiff.
+        """
+        entities, relationships = self._load_json(entities_path, relationships_path)
+        desired = desired_state(entities, relationships)
+
+        with self.connector.session():
+            current = load_manifest(manifest_path)
+            source = "manifest"
+            if current is None:
+                current = read_graph_state(self.connector)
+                source = "graph"
+
+            diff = diff_states(current, desired)
+            version = compute_graph_version(desired)
+            closure = (CLOSURE_QUERY, {"rows": closure_rows(catalog_tiers(entities, relationships))})
+            if not diff.is_empty():
+                # The version bump commits atomically with the changes it describes
+                self.connector.run_transaction(
+                    diff_statements(diff) + [closure, (PUBLISH_VERSION_QUERY, {"version": version})]
+                )
+                publish_graph_version(version)
+            else:
+                # Unchanged data, but backfills graphs built before the closure existed
+                self.connector.run_query(*closure)
+
+        if manifest_path:
+            save_manifest(manifest_path, desired)
+        print(f"✅ Graph synced against {source}: {diff.summary()}")
+        return diff
 
+    def _load_json(self, entities_path, relationships_path):
         # Load JSON
         with open(entities_path) as ef, open(relationships_path) as rf:
             entities     = json.load(ef)
             relationships = json.load(rf)
+        return entities, relationships
+
+    def clear_graph(self, batch_size=BULK_BATCH_SIZE):
+        # Delete in batches so large graphs don't need one huge transaction
+        while True:
+            deleted = self.connector.run_query(
+                "MATCH (n) WITH n LIMIT $limit DETACH DELETE n RETURN count(n) AS deleted",
+                {"limit": batch_size}
+            )
+            if not deleted or deleted[0]["deleted"] == 0:
+                break
+
+    def bulk_load(self, entities, relationships, batch_size=BULK_BATCH_SIZE):
+        """Replace the graph using batched UNWIND writes, one transaction per batch.
+
+        Returns a report dict of rows, seconds and rows/sec per stage and in total.
+        """
+        report = {}
+        total_start = time.perf_counter()
+
+        with self.connector.session():
+            for constraint in CONSTRAINTS:
+                self.connector.run_query(constraint)
+            self.clear_graph(batch_size)
+
+            rows = build_bulk_rows(entities, relationships)
+            # Order matters: tiers must exist before edges MATCH them
+            for stage in ("tiers", "features", "support", "upgrades", "closure"):
+                start = time.perf_counter()
+                count = self.connector.run_write_batches(BULK_QUERIES[stage], rows[stage], batch_size)
+                elapsed = time.perf_counter() - start
+                report[stage] = {
+                    "rows": count,
+                    "seconds": elapsed,
+                    "rows_per_sec": count / elapsed if elapsed > 0 else 0.0,
+                }
+
+        total_rows = sum(stage["rows"] for stage in report.values())
+        total_elapsed = time.perf_counter() - total_start
+        report["total"] = {
+            "rows": total_rows,
+            "seconds": total_elapsed,
+            "rows_per_sec": total_rows / total_elapsed if total_elapsed > 0 else 0.0,
+        }
+
+        for stage, stats in report.items():
+            print(f"  {stage:<9} {stats['rows']:>9} rows  {stats['seconds']:8.2f}s  {stats['rows_per_sec']:>10.0f} rows/s")
+        return report
+
+    def _load_row_by_row(self, entities, relationships):
+        # Clear existing data
+        self.connector.run_query("MATCH (n) DETACH DELETE n")
 
         # Create tiers, features, and support channels
         for tier, features in entities["Features"].items():
@@ -66,12 +230,17 @@ class KnowledgeGraphBuilder:
                     {"src": src, "dst": dst}
                 )
 
-        print("✅ Graph successfully built and pushed to Neo4j.")
+        self.connector.run_query(
+            CLOSURE_QUERY, {"rows": closure_rows(catalog_tiers(entities, relationships))}
+        )
 
     def close(self):
         self.connector.close()
 
 if __name__ == "__main__":
     builder = KnowledgeGraphBuilder(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
-    builder.build_graph("data/entities.json", "data/relationships.json")
+    if "--sync" in sys.argv:
+        builder.sync_graph("data/entities.json", "data/relationships.json", GRAPH_MANIFEST_PATH)
+    else:
+        builder.build_graph("data/entities.json", "data/relationships.json", manifest_path=GRAPH_MANIFEST_PATH)
     builder.close()
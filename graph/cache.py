@@ -0,0 +1,169 @@
+# graph/cache.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from graph.query_engine import QueryEngine
+from graph.version import subscribe
+from config import QUERY_CACHE_MAX_SIZE, QUERY_CACHE_TTL, GRAPH_VERSION_CHECK_INTERVAL
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a per-entry TTL, tagged with the graph version it holds."""
+
+    def __init__(self, max_size=QUERY_CACHE_MAX_SIZE, ttl=QUERY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, else (False, None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, version=None):
+        """Store a value read under `version`; dropped if the graph changed meanwhile."""
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        """Drop every entry; entries cached from now on belong to `version`."""
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def _normalize_arg(arg):
+    """(cache key part, argument to pass on) for one lookup argument.
+
+    Lists and other iterables are materialized, so a generator is consumed
+    once and keyed by its items rather than its identity; sets are sorted so
+    equal sets share an entry.
+    """
+    if arg is None or isinstance(arg, (str, bytes, tuple, dict)):
+        return arg, arg
+    if isinstance(arg, (set, frozenset)):
+        try:
+            items = sorted(arg)
+        except TypeError:
+            items = list(arg)
+        return tuple(items), items
+    if isinstance(arg, list) or hasattr(arg, "__iter__"):
+        items = list(arg)
+        return tuple(items), items
+    return arg, arg
+
+
+class CachedQueryEngine:
+    """Read-through cache in front of QueryEngine's lookup methods.
+
+    Non-cached attributes are delegated to the wrapped engine unchanged.
+    """
+
+    CACHED_METHODS = (
+        "get_tier_features",
+        "get_tier_limitations",
+        "get_tier_support",
+        "get_upgradable_tiers",
+        "get_features_after_upgrade",
+        "get_upgrade_gains",
+        "get_tier_profiles",
+        "get_tier_profile",
+        "get_tier_names",
+    )
+
+    def __init__(self, engine=None, cache=None, version_check_interval=GRAPH_VERSION_CHECK_INTERVAL):
+        self.engine = engine or QueryEngine()
+        self.cache = cache or QueryCache()
+        self.version_check_interval = version_check_interval
+        self._next_version_check = 0.0
+        # Same-process rebuilds invalidate immediately; others are caught by polling
+        subscribe(self.cache.invalidate)
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+        self._next_version_check = now + self.version_check_interval
+        try:
+            version = self.engine.get_graph_version()
+        except Exception as e:
+            print(f"Graph version check failed: {e}")
+            return
+        if version != self.cache.version:
+            self.cache.invalidate(version)
+
+    def _cached_call(self, name, *args):
+        self._check_version()
+        normalized = [_normalize_arg(a) for a in args]
+        args = [arg for _, arg in normalized]
+        key = (name,) + tuple(part for part, _ in normalized)
+        try:
+            hash(key)
+        except TypeError:
+            # Arguments that can't be keyed (e.g. dicts) read straight through
+            return getattr(self.engine, name)(*args)
+        hit, value = self.cache.get(key)
+        if not hit:
+            version = self.cache.version
+            value = getattr(self.engine, name)(*args)
+            self.cache.set(key, value, version)
+        # Hand out copies so callers can't mutate the cached lists
+        return copy.deepcopy(value)
+
+    def __getattr__(self, name):
+        attr = getattr(self.engine, name)
+        if name in self.CACHED_METHODS:
+            return lambda *args: self._cached_call(name, *args)
+        return attr
+
+    @property
+    def graph_version(self):
+        """Graph version the cached results belong to (polled like any cached call)."""
+        self._check_version()
+        return self.cache.version
+
+    def stats(self):
+        return self.cache.stats()
+
+    def close(self):
+        self.engine.close()
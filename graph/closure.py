@@ -0,0 +1,146 @@
+# graph/closure.py
+"""
+Transitive upgrade closure over tiers, computed at load time.
+
+Higher tiers include everything of the tiers that can upgrade to them, so a
+tier's cumulative features and support channels are those owned by the
+tiers it includes. KnowledgeGraphBuilder stores only tier names on each
+SubscriptionTier node, turning upgrade and "what do I gain" lookups into
+property reads instead of a CAN_UPGRADE_TO*1.. expansion:
+
+    t.upgrade_closure   tiers reachable by one or more upgrades
+    t.included_tiers    the tier itself, then the tiers below it, nearest first
+
+Items are never copied onto tiers: that grows with tiers x items (44.7M list
+entries for a 300k-node synthetic catalog), while these lists grow with
+tiers x tiers only. Gains are the items owned by tiers the target includes
+and the source doesn't, minus items the source also owns elsewhere.
+
+Limitations are not inherited (a higher tier lifts them), so they stay per tier.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+
+# Also drops the item lists earlier versions stored on tier nodes
+CLOSURE_QUERY = """
+UNWIND $rows AS row
+MATCH (t:SubscriptionTier {name: row.name})
+SET t.upgrade_closure = row.upgrade_closure,
+    t.included_tiers = row.included_tiers
+REMOVE t.all_features, t.all_support
+"""
+
+
+@dataclass
+class UpgradeGains:
+    """What moving from one tier to a higher one adds and removes."""
+    features: list = field(default_factory=list)
+    support: list = field(default_factory=list)
+    lifted_limitations: list = field(default_factory=list)
+
+
+def catalog_tiers(entities, relationships):
+    """Tier name -> {"features", "limitations", "support", "upgrades"} as the graph stores them.
+
+    Duplicates collapse like MERGE does and upgrades only link tiers that
+    exist, matching what KnowledgeGraphBuilder writes.
+    """
+    tiers = {}
+    for tier, features in entities["Features"].items():
+        tiers[tier] = {
+            "features": list(dict.fromkeys(features)),
+            "limitations": list(entities["Limitations"].get(tier, [])),
+            "support": list(dict.fromkeys(entities["SupportLevels"].get(tier, []))),
+            "upgrades": [],
+        }
+    for src, dests in relationships.get("Upgrades", {}).items():
+        if src not in tiers:
+            continue
+        upgrades = tiers[src]["upgrades"]
+        for dst in dests:
+            if dst in tiers and dst not in upgrades:
+                upgrades.append(dst)
+    return tiers
+
+
+def reachable(adjacency, tier):
+    """Tiers reachable from `tier` by a path of length >= 1, in breadth-first order."""
+    seen, order = set(), []
+    queue = deque(adjacency.get(tier, []))
+    while queue:
+        nxt = queue.popleft()
+        if nxt not in seen:
+            seen.add(nxt)
+            order.append(nxt)
+            queue.extend(adjacency.get(nxt, []))
+    return order
+
+
+def compute_closures(tiers):
+    """Tier name -> {"upgrade_closure", "included_tiers"} for catalog_tiers() output."""
+    upgrades = {tier: info["upgrades"] for tier, info in tiers.items()}
+    lower = {}
+    for src, dests in upgrades.items():
+        for dst in dests:
+            lower.setdefault(dst, []).append(src)
+
+    return {
+        tier: {
+            "upgrade_closure": reachable(upgrades, tier),
+            "included_tiers": [tier] + [t for t in reachable(lower, tier) if t != tier],
+        }
+        for tier in tiers
+    }
+
+
+def closure_rows(tiers):
+    """CLOSURE_QUERY rows for every tier."""
+    return [{"name": tier, **closure} for tier, closure in compute_closures(tiers).items()]
+
+
+def cumulative_items(tiers, closures, tier, facet):
+    """A tier's own `facet` items ("features" or "support"), then inherited ones, nearest tier first."""
+    items = {}
+    for included in closures[tier]["included_tiers"]:
+        items.update(dict.fromkeys(tiers[included][facet]))
+    return list(items)
+
+
+def item_owners(tiers, facet):
+    """Item -> tiers listing it directly; most items have exactly one owner."""
+    owners = {}
+    for tier, info in tiers.items():
+        for item in info[facet]:
+            owners.setdefault(item, []).append(tier)
+    return owners
+
+
+def upgrade_gains(tiers, closures, from_tier, to_tier, owners=None):
+    """UpgradeGains from `from_tier` to `to_tier`; empty unless to_tier is reachable.
+
+    `owners` is {"features": item_owners(...), "support": ...}, built here if
+    not given; with it the cost is the number of items gained, not held.
+    """
+    if from_tier not in closures or to_tier not in closures[from_tier]["upgrade_closure"]:
+        return UpgradeGains()
+    if owners is None:
+        owners = {facet: item_owners(tiers, facet) for facet in ("features", "support")}
+    # from_tier reaches to_tier, so everything it includes to_tier includes too
+    have = set(closures[from_tier]["included_tiers"])
+    gained = [t for t in closures[to_tier]["included_tiers"] if t not in have]
+
+    def new_items(facet):
+        items = {}
+        for tier in gained:
+            for item in tiers[tier][facet]:
+                if not any(owner in have for owner in owners[facet][item]):
+                    items[item] = None
+        return list(items)
+
+    kept = set(tiers[to_tier]["limitations"])
+    return UpgradeGains(
+        features=new_items("features"),
+        support=new_items("support"),
+        lifted_limitations=[l for l in tiers[from_tier]["limitations"] if l not in kept],
+    )
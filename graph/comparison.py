@@ -0,0 +1,157 @@
+# graph/comparison.py
+"""
+Tier comparison over bitsets.
+
+Every feature, limitation and support channel gets a stable integer id, and
+each tier is stored as one bitset (a Python int) per facet. Gains, losses
+and shared items between two tiers are then single AND/AND-NOT operations
+that run word-at-a-time in C, however many items a tier has, and only the
+bits that are set get decoded back to names.
+"""
+
+import threading
+from itertools import combinations
+
+from graph.closure import catalog_tiers, compute_closures, cumulative_items
+
+FACETS = ("features", "limitations", "support")
+
+
+class UnknownTier(KeyError):
+    """A requested tier isn't in the comparison."""
+
+
+def _encode(ids):
+    """Bitset with the given bit positions set, built in one pass."""
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _count(bits):
+    # int.bit_count() needs Python 3.10
+    return bin(bits).count("1")
+
+
+def _decode(bits, names):
+    """Names of the set bits, in id order. Linear in the bitset's length."""
+    digits = format(bits, "b")[::-1]
+    out = []
+    i = digits.find("1")
+    while i != -1:
+        out.append(names[i])
+        i = digits.find("1", i + 1)
+    return out
+
+
+class TierComparison:
+    """Per-tier facet bitsets for one version of the subscription data."""
+
+    def __init__(self, version=None, previous=None):
+        self.version = version
+        # Ids are never reused, so a bit means the same item across versions
+        if previous is not None:
+            with previous._lock:
+                self.ids = {facet: dict(ids) for facet, ids in previous.ids.items()}
+                self.names = {facet: list(names) for facet, names in previous.names.items()}
+        else:
+            self.ids = {facet: {} for facet in FACETS}
+            self.names = {facet: [] for facet in FACETS}
+        self.bits = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_subscription_data(cls, data, version=None, previous=None):
+        """Build from SUBSCRIPTION_DATA; `previous` keeps its item ids stable.
+
+        Features and support are the cumulative sets (a tier includes what
+        the tiers below it have), limitations are each tier's own.
+        """
+        comparison = cls(version, previous)
+        tiers = catalog_tiers(data, data["Relationships"])
+        closures = compute_closures(tiers)
+        for tier in tiers:
+            comparison.add_tier(
+                tier,
+                features=cumulative_items(tiers, closures, tier, "features"),
+                limitations=tiers[tier]["limitations"],
+                support=cumulative_items(tiers, closures, tier, "support"),
+            )
+        return comparison
+
+    def item_id(self, facet, item):
+        with self._lock:
+            ids = self.ids[facet]
+            if item not in ids:
+                ids[item] = len(self.names[facet])
+                self.names[facet].append(item)
+            return ids[item]
+
+    def add_tier(self, tier, **facets):
+        self.bits[tier] = {
+            facet: _encode([self.item_id(facet, item) for item in facets.get(facet, [])])
+            for facet in FACETS
+        }
+
+    @property
+    def tiers(self):
+        return list(self.bits)
+
+    def items(self, tier, facet):
+        """A tier's items of one facet (cumulative for features and support), in id order."""
+        if tier not in self.bits:
+            raise UnknownTier(tier)
+        return _decode(self.bits[tier][facet], self.names[facet])
+
+    def has(self, tier, facet, item):
+        i = self.ids[facet].get(item)
+        return i is not None and tier in self.bits and bool(self.bits[tier][facet] >> i & 1)
+
+    def holders(self, facet, item):
+        """Tiers that have `item`, in tier order."""
+        i = self.ids[facet].get(item)
+        if i is None:
+            return []
+        return [tier for tier, bits in self.bits.items() if bits[facet] >> i & 1]
+
+    def diff(self, from_tier, to_tier, include_shared=True):
+        """Items gained and lost per facet when moving from from_tier to to_tier.
+
+        "counts" holds the gained, lost and shared totals; the shared names
+        themselves are listed only with include_shared, since tiers that
+        inherit from each other share most of their items.
+        """
+        for tier in (from_tier, to_tier):
+            if tier not in self.bits:
+                raise UnknownTier(tier)
+        a, b = self.bits[from_tier], self.bits[to_tier]
+        result = {"from": from_tier, "to": to_tier, "gains": {}, "losses": {},
+                  "counts": {"gains": {}, "losses": {}, "shared": {}}}
+        if include_shared:
+            result["shared"] = {}
+        for facet in FACETS:
+            names = self.names[facet]
+            gains, losses, shared = b[facet] & ~a[facet], a[facet] & ~b[facet], a[facet] & b[facet]
+            result["gains"][facet] = _decode(gains, names)
+            result["losses"][facet] = _decode(losses, names)
+            result["counts"]["gains"][facet] = _count(gains)
+            result["counts"]["losses"][facet] = _count(losses)
+            result["counts"]["shared"][facet] = _count(shared)
+            if include_shared:
+                result["shared"][facet] = _decode(shared, names)
+        return result
+
+    def compare(self, tiers=None, include_shared=False):
+        """diff() for every unordered pair of `tiers` (default: all), in request order."""
+        tiers = list(dict.fromkeys(tiers or self.bits))
+        unknown = [t for t in tiers if t not in self.bits]
+        if unknown:
+            raise UnknownTier(", ".join(unknown))
+        return {
+            "version": self.version,
+            "tiers": tiers,
+            "pairs": [self.diff(a, b, include_shared) for a, b in combinations(tiers, 2)],
+        }
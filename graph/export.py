@@ -0,0 +1,89 @@
+# graph/export.py
+"""
+Read the whole graph out of Neo4j without holding it in memory.
+
+Nodes and links are streamed with a bounded fetch size, or read page by page
+with keyset cursors (the last internal id seen), so memory stays flat
+regardless of graph size. Export to NDJSON with:
+
+    python -m graph.export graph.ndjson
+"""
+
+import argparse
+import json
+import sys
+
+from config import GRAPH_FETCH_SIZE, GRAPH_PAGE_SIZE
+
+NODES_QUERY = """
+MATCH (n)
+WHERE id(n) > $after AND NOT n:GraphMeta
+RETURN id(n) AS id, labels(n)[0] AS type, n.name AS name
+ORDER BY id(n)
+"""
+
+LINKS_QUERY = """
+MATCH (n)-[r]->(m)
+WHERE id(r) > $after
+RETURN id(r) AS id, id(n) AS source, id(m) AS target, type(r) AS relation
+ORDER BY id(r)
+"""
+
+def stream_nodes(connector, fetch_size=GRAPH_FETCH_SIZE):
+    return connector.stream_query(NODES_QUERY, {"after": -1}, fetch_size)
+
+def stream_links(connector, fetch_size=GRAPH_FETCH_SIZE):
+    return connector.stream_query(LINKS_QUERY, {"after": -1}, fetch_size)
+
+def read_page(connector, kind, after=-1, limit=GRAPH_PAGE_SIZE):
+    """One page of "nodes" or "links" after the id `after`; returns (records, next_after).
+
+    next_after is None on the last page. Each page is an id range seek, so
+    late pages cost the same as early ones.
+    """
+    query = NODES_QUERY if kind == "nodes" else LINKS_QUERY
+    records = connector.run_query(f"{query}LIMIT $limit", {"after": after, "limit": limit})
+    next_after = records[-1]["id"] if len(records) == limit else None
+    return records, next_after
+
+def iter_pages(connector, kind, limit=GRAPH_PAGE_SIZE):
+    """Yield every page of nodes or links, one run_query per page."""
+    after = -1
+    while after is not None:
+        records, after = read_page(connector, kind, after, limit)
+        if records:
+            yield records
+
+def export_ndjson(connector, out, fetch_size=GRAPH_FETCH_SIZE):
+    """Write every node, then every link, as one JSON object per line; returns the counts."""
+    counts = {"node": 0, "link": 0}
+    for kind, records in (("node", stream_nodes(connector, fetch_size)),
+                          ("link", stream_links(connector, fetch_size))):
+        for record in records:
+            out.write(json.dumps({"type": kind, **record}, separators=(",", ":")))
+            out.write("\n")
+            counts[kind] += 1
+    return counts
+
+def main():
+    from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    from graph.neo4j_connector import Neo4jConnector
+
+    parser = argparse.ArgumentParser(description="Export the Neo4j graph as NDJSON")
+    parser.add_argument("output", help="output file, or - for stdout")
+    parser.add_argument("--fetch-size", type=int, default=GRAPH_FETCH_SIZE)
+    args = parser.parse_args()
+
+    connector = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        if args.output == "-":
+            counts = export_ndjson(connector, sys.stdout, args.fetch_size)
+        else:
+            with open(args.output, "w") as out:
+                counts = export_ndjson(connector, out, args.fetch_size)
+    finally:
+        connector.close()
+    print(f"Exported {counts['node']} nodes and {counts['link']} links", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
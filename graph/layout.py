@@ -0,0 +1,257 @@
+# graph/layout.py
+"""
+Server-side force-directed layout, so clients can draw the graph without
+running physics.
+
+force_layout() is Fruchterman-Reingold with every step vectorized in NumPy:
+pairwise repulsion in row blocks (or, on large graphs, against a random
+sample of nodes each iteration), spring attraction along links, and a weak
+pull to the origin that keeps disconnected parts on screen.
+
+LayoutCache keeps positions per graph version and view (tier filter, depth,
+dimensions), together with the laid-out graph as a GraphSnapshot so its
+serialized bytes and ETag are computed once. When the graph changes, the
+previous layout of the same view seeds the new one: known nodes keep their
+place, new nodes start next to their neighbors, and only a short
+low-temperature pass runs.
+"""
+
+import importlib.util
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from graph.snapshot import GraphSnapshot
+from config import (
+    GRAPH_LAYOUT_CACHE_SIZE,
+    GRAPH_LAYOUT_ITERATIONS,
+    GRAPH_LAYOUT_INCREMENTAL_ITERATIONS,
+    GRAPH_LAYOUT_EXACT_MAX_NODES,
+)
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+if HAS_NUMPY:
+    import numpy as np
+
+# Node pairs per repulsion block; bounds the (rows, n) temporaries
+BLOCK_PAIRS = 1 << 20
+# Nodes sampled per iteration for approximate repulsion on large graphs
+REPULSION_SAMPLE = 256
+GRAVITY = 0.02
+# Above this share of new nodes a changed graph is laid out from scratch
+INCREMENTAL_MAX_NEW = 0.2
+# Largest first step of an incremental pass, in ideal edge lengths
+INCREMENTAL_TEMPERATURE = 0.25
+
+
+class LayoutUnavailable(RuntimeError):
+    """Layouts need NumPy, which isn't installed."""
+
+
+def _repulsion(pos, k2, rng, exact):
+    n = len(pos)
+    disp = np.empty_like(pos)
+    if exact:
+        others, scale = pos, 1.0
+    else:
+        others = pos[rng.choice(n, REPULSION_SAMPLE, replace=False)]
+        scale = n / REPULSION_SAMPLE
+    # |a - b|^2 = |a|^2 + |b|^2 - 2ab, so each block is one matrix product
+    sq = np.einsum("ij,ij->i", pos, pos)
+    others_sq = np.einsum("ij,ij->i", others, others)
+    rows = max(1, BLOCK_PAIRS // len(others))
+    for start in range(0, n, rows):
+        block = pos[start:start + rows]
+        dist2 = sq[start:start + rows, None] + others_sq[None, :] - 2.0 * (block @ others.T)
+        # Floor keeps coincident nodes finite
+        np.maximum(dist2, 1e-2 * k2, out=dist2)
+        weight = k2 / dist2
+        if exact:
+            # No node repels itself
+            idx = np.arange(len(block))
+            weight[idx, start + idx] = 0.0
+        disp[start:start + rows] = (block * weight.sum(axis=1)[:, None] - weight @ others) * scale
+    return disp
+
+
+def _spread(n, index, values):
+    """Per-node sums of per-edge vectors."""
+    return np.stack([np.bincount(index, values[:, d], minlength=n) for d in range(values.shape[1])],
+                    axis=1).astype(values.dtype)
+
+
+def force_layout(n, edges, dim=2, iterations=GRAPH_LAYOUT_ITERATIONS, initial=None,
+                 temperature=None, seed=0):
+    """Positions of shape (n, dim) for n nodes joined by (source, target) index pairs.
+
+    `initial` seeds the positions (e.g. a previous layout); `temperature`
+    caps the first step, so a seeded layout can be refined without being
+    shaken apart.
+    """
+    if not HAS_NUMPY:
+        raise LayoutUnavailable("graph layout needs numpy")
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, dim), dtype=np.float32)
+    k = 1.0
+    side = max(1.0, n ** (1.0 / dim)) * k
+    # float32 halves the memory traffic of the dense repulsion blocks
+    if initial is not None:
+        pos = np.array(initial, dtype=np.float32)
+    else:
+        pos = rng.uniform(-side / 2, side / 2, (n, dim)).astype(np.float32)
+    if n == 1:
+        return pos
+
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    src, dst = edges[:, 0], edges[:, 1]
+    exact = n <= GRAPH_LAYOUT_EXACT_MAX_NODES
+    t = side / 10 if temperature is None else temperature
+    cooling = t / (iterations + 1)
+
+    for _ in range(iterations):
+        disp = _repulsion(pos, k * k, rng, exact)
+        if len(edges):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            force = delta * (dist / k)[:, None]
+            disp -= _spread(n, src, force)
+            disp += _spread(n, dst, force)
+        disp -= pos * np.float32(GRAVITY * np.sqrt(n))
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))
+        np.maximum(length, 1e-9, out=length)
+        pos += disp * (np.minimum(length, t) / length)[:, None]
+        t -= cooling
+    return pos
+
+
+def _jitter(node_id, dim):
+    """Small deterministic offset so nodes seeded at the same spot separate."""
+    h = zlib.crc32(str(node_id).encode("utf-8"))
+    return [((h >> (8 * i)) & 0xFF) / 255.0 - 0.5 for i in range(dim)]
+
+
+def layout_graph(graph, dim=2, previous=None):
+    """Node id -> [x, y(, z)] for a {"nodes": [...], "links": [...]} graph.
+
+    With `previous` (an earlier result for a similar graph) the layout is
+    updated incrementally if few nodes are new.
+    """
+    ids = [node["id"] for node in graph["nodes"]]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    edges = [(index[link["source"]], index[link["target"]]) for link in graph["links"]
+             if link["source"] in index and link["target"] in index]
+
+    known = [node_id in previous for node_id in ids] if previous else []
+    new = len(ids) - sum(known)
+    if not previous or not ids or new > INCREMENTAL_MAX_NEW * len(ids):
+        pos = force_layout(len(ids), edges, dim)
+    else:
+        neighbors = {}
+        for a, b in edges:
+            neighbors.setdefault(a, []).append(b)
+            neighbors.setdefault(b, []).append(a)
+        initial = [list(previous[node_id]) if is_known else None for node_id, is_known in zip(ids, known)]
+        for i, node_id in enumerate(ids):
+            if initial[i] is None:
+                # Start new nodes beside their already-placed neighbors
+                placed = [initial[j] for j in neighbors.get(i, []) if initial[j] is not None]
+                center = [sum(c) / len(placed) for c in zip(*placed)] if placed else [0.0] * dim
+                initial[i] = [c + j for c, j in zip(center, _jitter(node_id, dim))]
+        pos = force_layout(len(ids), edges, dim, GRAPH_LAYOUT_INCREMENTAL_ITERATIONS, initial,
+                           temperature=INCREMENTAL_TEMPERATURE)
+    return {node_id: [round(float(c), 3) for c in p] for node_id, p in zip(ids, pos)}
+
+
+def with_positions(graph, positions):
+    """A copy of `graph` with x, y (and z) on every node."""
+    return {
+        "nodes": [{**node, **dict(zip("xyz", positions[node["id"]]))} for node in graph["nodes"]],
+        "links": graph["links"],
+    }
+
+
+class Layout:
+    """One cached layout: node positions and the laid-out graph as a snapshot."""
+
+    def __init__(self, graph, positions, dim):
+        self.positions = positions
+        self.dim = dim
+        self.snapshot = GraphSnapshot(**with_positions(graph, positions))
+
+    def negotiate(self, fmt, accept_encoding_header):
+        """(body, encoding, etag) like GraphSnapshot.negotiate; the ETag names the layout."""
+        body, encoding, etag = self.snapshot.negotiate(fmt, accept_encoding_header)
+        return body, encoding, f"layout{self.dim}d-{etag}"
+
+
+class LayoutCache:
+    """LRU of layouts keyed by (graph version, view, dim).
+
+    The latest layout of each (view, dim) is kept separately, in an LRU of
+    the same size, to seed the next version's layout incrementally.
+    Concurrent misses for one key wait for a single computation.
+    """
+
+    def __init__(self, max_entries=GRAPH_LAYOUT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._latest = OrderedDict()
+        # key -> Future of the layout being computed for it
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    def layout(self, version, view, graph, dim=2):
+        key = (version, view, dim)
+        with self._lock:
+            layout = self._entries.get(key)
+            if layout is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return layout
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                latest = self._latest.get((view, dim))
+            else:
+                self.waits += 1
+        if not owner:
+            # Another request is computing this layout; share its result or error
+            return pending.result()
+        previous = latest[1].positions if latest is not None and latest[0] != version else None
+        # Computed outside the lock, so other keys are served meanwhile
+        try:
+            layout = Layout(graph, layout_graph(graph, dim, previous), dim)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._entries[key] = layout
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._latest[(view, dim)] = (version, layout)
+            self._latest.move_to_end((view, dim))
+            while len(self._latest) > self.max_entries:
+                self._latest.popitem(last=False)
+        pending.set_result(layout)
+        return layout
+
+    def positions(self, version, view, graph, dim=2):
+        return self.layout(version, view, graph, dim).positions
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "views": len(self._latest), "hits": self.hits,
+                    "misses": self.misses, "waits": self.waits, "evictions": self.evictions}
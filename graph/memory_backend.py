@@ -0,0 +1,91 @@
+# graph/memory_backend.py
+"""
+In-process graph backend: the tier graph held in indexed Python structures.
+
+It is built from the same entities/relationships JSON as the Neo4j graph,
+with the same semantics as KnowledgeGraphBuilder's MERGE-based load
+(duplicates collapse, upgrades only link tiers that exist) and the same
+precomputed upgrade closure (graph/closure.py), so it answers
+every QueryEngine lookup exactly like Neo4jBackend, in microseconds and
+without a network round trip. Select it with GRAPH_BACKEND = "memory".
+"""
+
+import json
+from contextlib import nullcontext
+
+from graph.closure import catalog_tiers, compute_closures, cumulative_items, item_owners, upgrade_gains
+from graph.query_engine import TierProfile
+from graph.sync import desired_state
+from graph.version import compute_graph_version
+
+
+class InMemoryBackend:
+    def __init__(self, entities, relationships):
+        self.tiers = catalog_tiers(entities, relationships)
+        self.tier_names = sorted(self.tiers)
+        # Same content hash KnowledgeGraphBuilder publishes for this data
+        self.version = compute_graph_version(desired_state(entities, relationships))
+
+        # Tier closure, the same values the builder stores in Neo4j; items stay with their owner
+        self.closures = compute_closures(self.tiers)
+        self.owners = {facet: item_owners(self.tiers, facet) for facet in ("features", "support")}
+        self._reachable = {
+            tier: frozenset(closure["upgrade_closure"]) for tier, closure in self.closures.items()
+        }
+
+    @classmethod
+    def from_json(cls, entities_path, relationships_path):
+        with open(entities_path) as f:
+            entities = json.load(f)
+        with open(relationships_path) as f:
+            relationships = json.load(f)
+        return cls(entities, relationships)
+
+    def session(self):
+        # Nothing to hold open; lets `with engine.session():` work unchanged
+        return nullcontext(self)
+
+    def get_tier_features(self, tier):
+        return list(self.tiers[tier]["features"]) if tier in self.tiers else []
+
+    def get_tier_limitations(self, tier):
+        return list(self.tiers[tier]["limitations"]) if tier in self.tiers else []
+
+    def get_tier_support(self, tier):
+        return list(self.tiers[tier]["support"]) if tier in self.tiers else []
+
+    def get_upgradable_tiers(self, tier):
+        return list(self.tiers[tier]["upgrades"]) if tier in self.tiers else []
+
+    def reachable_tiers(self, tier):
+        """Every tier reachable from `tier` by a CAN_UPGRADE_TO path of length >= 1."""
+        return self._reachable.get(tier, frozenset())
+
+    def get_features_after_upgrade(self, from_tier, to_tier):
+        if to_tier not in self.reachable_tiers(from_tier):
+            return []
+        return cumulative_items(self.tiers, self.closures, to_tier, "features")
+
+    def get_upgrade_gains(self, from_tier, to_tier):
+        return upgrade_gains(self.tiers, self.closures, from_tier, to_tier, self.owners)
+
+    def get_tier_profiles(self, tiers):
+        return {
+            tier: TierProfile(
+                name=tier,
+                features=self.get_tier_features(tier),
+                limitations=self.get_tier_limitations(tier),
+                support=self.get_tier_support(tier),
+                upgrades=self.get_upgradable_tiers(tier),
+            )
+            for tier in tiers
+        }
+
+    def get_tier_names(self):
+        return list(self.tier_names)
+
+    def get_graph_version(self):
+        return self.version
+
+    def close(self):
+        pass
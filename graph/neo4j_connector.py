@@ -1,16 +1,174 @@
 # graph/neo4j_connector.py
-from neo4j import GraphDatabase
+import atexit
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from metrics import NEO4J_QUERY_SECONDS
+from config import (
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    NEO4J_LIVENESS_CHECK_TIMEOUT,
+    GRAPH_FETCH_SIZE,
+)
+
+# One driver (and therefore one connection pool) per set of credentials per process
+_shared_drivers = {}
+_shared_drivers_lock = threading.Lock()
+
+
+def _driver_options():
+    return {
+        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+        "connection_acquisition_timeout": NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        # Ping pooled connections that sat idle longer than this before reuse
+        "liveness_check_timeout": NEO4J_LIVENESS_CHECK_TIMEOUT,
+    }
+
+
+def _create_driver(uri, user, password):
+    return GraphDatabase.driver(uri, auth=(user, password), **_driver_options())
+
+
+def get_shared_driver(uri, user, password):
+    """Return the process-wide pooled driver for these credentials, creating it once.
+
+    The password is part of the key (hashed, so it isn't kept in another place),
+    so a wrong password never borrows a pool that was authenticated with the
+    right one, and a rotated password gets a fresh pool.
+    """
+    key = (uri, user, hashlib.sha256(password.encode("utf-8")).hexdigest())
+    with _shared_drivers_lock:
+        driver = _shared_drivers.get(key)
+        if driver is None:
+            driver = _create_driver(uri, user, password)
+            _shared_drivers[key] = driver
+        return driver
+
+
+def close_shared_drivers():
+    """Close every pooled driver; registered to run at interpreter exit."""
+    with _shared_drivers_lock:
+        drivers = list(_shared_drivers.values())
+        _shared_drivers.clear()
+    for driver in drivers:
+        driver.close()
+
+
+atexit.register(close_shared_drivers)
+
 
 class Neo4jConnector:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, shared=True):
+        # Shared connectors borrow the pooled driver; private ones own theirs
+        self._owns_driver = not shared
+        if shared:
+            self.driver = get_shared_driver(uri, user, password)
+        else:
+            self.driver = _create_driver(uri, user, password)
+        self._local = threading.local()
+
+    @contextmanager
+    def session(self):
+        """Reuse one session for every run_query call made inside the block."""
+        current = getattr(self._local, "session", None)
+        if current is not None:
+            yield current
+            return
+        with self.driver.session() as session:
+            self._local.session = session
+            try:
+                yield session
+            finally:
+                self._local.session = None
 
+    @NEO4J_QUERY_SECONDS.timed()
     def run_query(self, query, params=None):
+        session = getattr(self._local, "session", None)
+        if session is not None:
+            return [record.data() for record in session.run(query, params or {})]
         with self.driver.session() as session:
             result = session.run(query, params or {})
             # consume all records into a list
             records = list(result)
             return [record.data() for record in records]
 
+    def stream_query(self, query, params=None, fetch_size=GRAPH_FETCH_SIZE):
+        """Yield records as dicts, pulling `fetch_size` at a time from the server.
+
+        Unlike run_query nothing is materialized, so memory stays flat however
+        many records the query returns. The session stays open until the
+        generator is exhausted or closed.
+        """
+        with self.driver.session(fetch_size=fetch_size) as session:
+            for record in session.run(query, params or {}):
+                yield record.data()
+
+    def run_write_batches(self, query, rows, batch_size):
+        """Run an UNWIND $rows write query over `rows`, one transaction per batch.
+
+        Returns the number of rows written.
+        """
+        def write(tx, batch):
+            tx.run(query, {"rows": batch}).consume()
+
+        with self.session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.execute_write(write, rows[start:start + batch_size])
+        return len(rows)
+
+    def run_transaction(self, statements):
+        """Run a list of (query, params) pairs atomically in one write transaction."""
+        def write(tx):
+            for query, params in statements:
+                tx.run(query, params or {}).consume()
+
+        with self.session() as session:
+            session.execute_write(write)
+
+    def health_check(self):
+        """Return True if the server is reachable with the configured credentials."""
+        try:
+            self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            print(f"Neo4j health check failed: {e}")
+            return False
+
     def close(self):
-        self.driver.close()
+        # The shared driver outlives individual connectors and closes at exit
+        if self._owns_driver:
+            self.driver.close()
+
+
+class AsyncNeo4jConnector:
+    """asyncio version of Neo4jConnector for the ASGI app.
+
+    An async driver is bound to the event loop it is used on, so each
+    connector owns its driver instead of sharing the process-wide one; create
+    it once the server's loop is running and close it on shutdown.
+    """
+
+    def __init__(self, uri, user, password):
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **_driver_options())
+
+    async def run_query(self, query, params=None):
+        start = time.perf_counter()
+        async with self.driver.session() as session:
+            result = await session.run(query, params or {})
+            records = [record.data() async for record in result]
+        NEO4J_QUERY_SECONDS.observe(time.perf_counter() - start)
+        return records
+
+    async def health_check(self):
+        try:
+            await self.driver.verify_connectivity()
+            return True
+        except Exception as e:
+            print(f"Neo4j health check failed: {e}")
+            return False
+
+    async def close(self):
+        await self.driver.close()
@@ -1,11 +1,98 @@
 # graph/query_engine.py
 
-from graph.neo4j_connector import Neo4jConnector
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from dataclasses import dataclass, field
 
-class QueryEngine:
-    def __init__(self):
-        self.conn = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+from graph.closure import UpgradeGains
+from graph.neo4j_connector import Neo4jConnector, AsyncNeo4jConnector
+from metrics import QUERY_ENGINE_SECONDS
+from config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+    GRAPH_BACKEND, GRAPH_ENTITIES_PATH, GRAPH_RELATIONSHIPS_PATH,
+)
+
+# Queries shared by the sync and async engines
+TIER_PROFILES_QUERY = """
+UNWIND $tiers AS tier
+MATCH (t:SubscriptionTier {name: tier})
+RETURN t.name AS tier,
+       [(t)-[:INCLUDES]->(f:Feature) | f.name] AS features,
+       t.limitations AS limitations,
+       [(t)-[:SUPPORTS]->(s:SupportChannel) | s.name] AS support,
+       [(t)-[:CAN_UPGRADE_TO]->(u:SubscriptionTier) | u.name] AS upgrades
+"""
+
+TIER_NAMES_QUERY = """
+MATCH (t:SubscriptionTier)
+RETURN t.name AS tier
+ORDER BY t.name
+"""
+
+# Upgrade lookups read the tier closure KnowledgeGraphBuilder stores on each tier
+# (graph/closure.py) and follow INCLUDES/SUPPORTS only from the tiers involved
+FEATURES_AFTER_UPGRADE_QUERY = """
+MATCH (a:SubscriptionTier {name: $from}), (b:SubscriptionTier {name: $to})
+WHERE b.name IN a.upgrade_closure
+UNWIND b.included_tiers AS name
+MATCH (:SubscriptionTier {name: name})-[:INCLUDES]->(f:Feature)
+RETURN collect(DISTINCT f.name) AS features
+"""
+
+# Items owned by tiers b includes and a doesn't, unless another owner is one a includes
+UPGRADE_GAINS_QUERY = """
+MATCH (a:SubscriptionTier {name: $from}), (b:SubscriptionTier {name: $to})
+WHERE b.name IN a.upgrade_closure
+WITH a, b, [t IN b.included_tiers WHERE NOT t IN a.included_tiers] AS gained
+CALL {
+    WITH a, gained
+    UNWIND gained AS name
+    MATCH (t:SubscriptionTier {name: name})-[:INCLUDES]->(f:Feature)
+    WHERE NOT EXISTS { MATCH (f)<-[:INCLUDES]-(o:SubscriptionTier) WHERE o <> t AND o.name IN a.included_tiers }
+    RETURN collect(DISTINCT f.name) AS features
+}
+CALL {
+    WITH a, gained
+    UNWIND gained AS name
+    MATCH (t:SubscriptionTier {name: name})-[:SUPPORTS]->(s:SupportChannel)
+    WHERE NOT EXISTS { MATCH (s)<-[:SUPPORTS]-(o:SubscriptionTier) WHERE o <> t AND o.name IN a.included_tiers }
+    RETURN collect(DISTINCT s.name) AS support
+}
+RETURN features, support,
+       [l IN coalesce(a.limitations, []) WHERE NOT l IN coalesce(b.limitations, [])] AS lifted_limitations
+"""
+
+GRAPH_VERSION_QUERY = "MATCH (m:GraphMeta {key: 'graph'}) RETURN m.version AS version"
+
+@dataclass
+class TierProfile:
+    """All facets of one subscription tier."""
+    name: str
+    features: list = field(default_factory=list)
+    limitations: list = field(default_factory=list)
+    support: list = field(default_factory=list)
+    upgrades: list = field(default_factory=list)
+
+def profiles_from_records(tiers, records):
+    """Turn TIER_PROFILES_QUERY records into tier name -> TierProfile, in request order."""
+    found = {
+        r["tier"]: TierProfile(
+            name=r["tier"],
+            features=r["features"],
+            limitations=r["limitations"] or [],
+            support=r["support"],
+            upgrades=r["upgrades"],
+        )
+        for r in records
+    }
+    return {tier: found.get(tier) or TierProfile(name=tier) for tier in tiers}
+
+class Neo4jBackend:
+    """QueryEngine backend that answers every lookup with Cypher over a Neo4jConnector."""
+    def __init__(self, connector=None):
+        # Borrow the process-wide pooled driver unless a connector is supplied
+        self.conn = connector or Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+    def session(self):
+        return self.conn.session()
 
     def get_tier_features(self, tier):
         records = self.conn.run_query(
@@ -48,15 +135,121 @@ class QueryEngine:
         return [r["upgrade"] for r in records]
 
     def get_features_after_upgrade(self, from_tier, to_tier):
-        records = self.conn.run_query(
-            """
-            MATCH (a:SubscriptionTier {name:$from})-[:CAN_UPGRADE_TO*1..]->(b:SubscriptionTier {name:$to})
-            MATCH (b)-[:INCLUDES]->(f:Feature)
-            RETURN DISTINCT f.name AS feature
-            """,
-            {"from": from_tier, "to": to_tier}
-        )
-        return [r["feature"] for r in records]
+        records = self.conn.run_query(FEATURES_AFTER_UPGRADE_QUERY, {"from": from_tier, "to": to_tier})
+        return records[0]["features"] if records else []
+
+    def get_upgrade_gains(self, from_tier, to_tier):
+        records = self.conn.run_query(UPGRADE_GAINS_QUERY, {"from": from_tier, "to": to_tier})
+        return UpgradeGains(**records[0]) if records else UpgradeGains()
+
+    def get_tier_profiles(self, tiers):
+        tiers = list(tiers)
+        records = self.conn.run_query(TIER_PROFILES_QUERY, {"tiers": tiers})
+        return profiles_from_records(tiers, records)
+
+    def get_tier_names(self):
+        records = self.conn.run_query(TIER_NAMES_QUERY)
+        return [r["tier"] for r in records]
+
+    def get_graph_version(self):
+        records = self.conn.run_query(GRAPH_VERSION_QUERY)
+        return records[0]["version"] if records else None
 
     def close(self):
         self.conn.close()
+
+def create_backend(connector=None):
+    """Backend named by GRAPH_BACKEND; a supplied connector always means Neo4j."""
+    if connector is None and GRAPH_BACKEND == "memory":
+        from graph.memory_backend import InMemoryBackend
+        return InMemoryBackend.from_json(GRAPH_ENTITIES_PATH, GRAPH_RELATIONSHIPS_PATH)
+    if GRAPH_BACKEND not in ("neo4j", "memory"):
+        raise ValueError(f"Unknown GRAPH_BACKEND: {GRAPH_BACKEND}")
+    return Neo4jBackend(connector)
+
+class QueryEngine:
+    def __init__(self, connector=None, backend=None):
+        self.backend = backend or create_backend(connector)
+        # Neo4j-backed engines still expose their connector
+        self.conn = getattr(self.backend, "conn", None)
+
+    def session(self):
+        """Run several lookups over one pooled session: `with engine.session(): ...`"""
+        return self.backend.session()
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_tier_features(self, tier):
+        return self.backend.get_tier_features(tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_tier_limitations(self, tier):
+        return self.backend.get_tier_limitations(tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_tier_support(self, tier):
+        return self.backend.get_tier_support(tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_upgradable_tiers(self, tier):
+        return self.backend.get_upgradable_tiers(tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_features_after_upgrade(self, from_tier, to_tier):
+        """Every feature of to_tier, including those it inherits from lower tiers.
+
+        Empty unless to_tier is reachable from from_tier by one or more upgrades.
+        """
+        return self.backend.get_features_after_upgrade(from_tier, to_tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_upgrade_gains(self, from_tier, to_tier):
+        """UpgradeGains: features and support to_tier adds, and limitations it lifts."""
+        return self.backend.get_upgrade_gains(from_tier, to_tier)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_tier_profiles(self, tiers):
+        """Fetch features, limitations, support and upgrades for many tiers in one query.
+
+        Returns a dict of tier name -> TierProfile in the order requested. Unknown
+        tiers get an empty profile, like the single-facet getters return [].
+        """
+        return self.backend.get_tier_profiles(tiers)
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_tier_names(self):
+        return self.backend.get_tier_names()
+
+    def get_tier_profile(self, tier):
+        return self.get_tier_profiles([tier])[tier]
+
+    @QUERY_ENGINE_SECONDS.timed("method")
+    def get_graph_version(self):
+        """Version published by the last KnowledgeGraphBuilder run, or None."""
+        return self.backend.get_graph_version()
+
+    def close(self):
+        self.backend.close()
+
+class AsyncQueryEngine:
+    """asyncio counterpart of QueryEngine for the ASGI app, over an AsyncNeo4jConnector.
+
+    Only the lookups the async server needs to mirror the graph are provided.
+    """
+    def __init__(self, connector=None):
+        self.conn = connector or AsyncNeo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+    async def get_tier_names(self):
+        records = await self.conn.run_query(TIER_NAMES_QUERY)
+        return [r["tier"] for r in records]
+
+    async def get_tier_profiles(self, tiers):
+        tiers = list(tiers)
+        records = await self.conn.run_query(TIER_PROFILES_QUERY, {"tiers": tiers})
+        return profiles_from_records(tiers, records)
+
+    async def get_graph_version(self):
+        records = await self.conn.run_query(GRAPH_VERSION_QUERY)
+        return records[0]["version"] if records else None
+
+    async def close(self):
+        await self.conn.close()
@@ -0,0 +1,196 @@
+# graph/search.py
+"""
+Autocomplete search over graph entity names (tiers, features, limitations,
+support channels).
+
+Labels are split into lowercase word tokens and indexed three ways:
+
+    vocabulary   sorted distinct tokens; a prefix is a bisect range
+    postings     token -> entity ids, kept in static rank order
+    trigrams     padded 3-grams -> tokens, for typo-tolerant fallbacks
+
+Entity ids are assigned in static rank order (tiers first, then shorter
+labels), which only breaks ties: every entity that matches is scored before
+anything is cut. A multi-word query scores the postings of its rarest term,
+since a match must contain every term. Very short prefixes, whose
+expansions would cover most of the vocabulary, are answered from top lists
+precomputed with the same scoring.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Lower sorts first when scores tie
+GROUP_RANK = {"Tier": 0, "Feature": 1, "Support": 2, "Limitation": 3}
+
+# Prefixes up to this length use the precomputed top lists
+SHORT_PREFIX = 2
+# Best-scoring entities kept per short prefix; at least SEARCH_MAX_LIMIT
+MAX_CANDIDATES = 200
+# Vocabulary tokens a single prefix may expand to; the shortest, best-weighted ones are kept
+MAX_PREFIX_EXPANSIONS = 512
+# Trigram similarity needed for a typo match
+FUZZY_MIN_SIMILARITY = 0.5
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+LABEL_PREFIX_BONUS = 0.5
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Prefix/trigram index over one version of the graph's node labels."""
+
+    def __init__(self, nodes, version=None):
+        self.version = version
+        nodes = [n for n in nodes if n.get("label")]
+        nodes.sort(key=lambda n: (GROUP_RANK.get(n.get("group"), len(GROUP_RANK)), len(n["label"]), n["label"]))
+        self.entities = [{"id": n["id"], "label": n["label"], "group": n.get("group")} for n in nodes]
+        self._labels = [" ".join(tokenize(n["label"])) for n in nodes]
+
+        token_ids = {}
+        self._postings = []
+        self._entity_tokens = []
+        # Token id -> entities whose label starts with it, for LABEL_PREFIX_BONUS
+        self._leading = {}
+        for e, label in enumerate(self._labels):
+            ids = []
+            for token in dict.fromkeys(label.split()):
+                t = token_ids.setdefault(token, len(token_ids))
+                if t == len(self._postings):
+                    self._postings.append([])
+                # Entities are visited in rank order, so postings stay sorted
+                self._postings[t].append(e)
+                ids.append(t)
+            self._entity_tokens.append(tuple(ids))
+            if ids:
+                self._leading.setdefault(ids[0], []).append(e)
+
+        self._tokens = list(token_ids)
+        self._token_ids = token_ids
+        self._vocab = sorted(token_ids)
+
+        self._trigrams = {}
+        for token, t in token_ids.items():
+            for gram in trigrams(token):
+                self._trigrams.setdefault(gram, []).append(t)
+
+        # Best-scoring entities for every 1..SHORT_PREFIX character prefix typed on its own
+        prefixes = {token[:n] for token in token_ids for n in range(1, min(SHORT_PREFIX, len(token)) + 1)}
+        self._top_by_prefix = {
+            prefix: self._score([self._expand(prefix, True, limit=None)], prefix, MAX_CANDIDATES)
+            for prefix in prefixes
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(snapshot.nodes, snapshot.version)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def _expand(self, term, prefix, limit=MAX_PREFIX_EXPANSIONS):
+        """Vocabulary token id -> match weight for one query term."""
+        weights = {}
+        t = self._token_ids.get(term)
+        if t is not None:
+            weights[t] = EXACT_WEIGHT
+        if prefix:
+            tokens = self._vocab[bisect_left(self._vocab, term):bisect_left(self._vocab, term + "\uffff")]
+            if limit is not None and len(tokens) > limit:
+                # Shorter tokens weigh more, so they are the ones worth keeping
+                tokens = heapq.nsmallest(limit, tokens, key=len)
+            for token in tokens:
+                if token != term:
+                    weights[self._token_ids[token]] = PREFIX_WEIGHT * (0.5 + 0.5 * len(term) / len(token))
+        if not weights and len(term) >= 3:
+            weights = self._fuzzy(term, prefix)
+        return weights
+
+    def _fuzzy(self, term, prefix):
+        grams = trigrams(term)
+        if prefix:
+            # The word is unfinished, so its closing "x$" gram can't match yet
+            grams = {g for g in grams if not g.endswith("$")}
+        shared = {}
+        for gram in grams:
+            for t in self._trigrams.get(gram, ()):
+                shared[t] = shared.get(t, 0) + 1
+        weights = {}
+        for t, count in shared.items():
+            token = self._tokens[t]
+            if prefix:
+                # Containment: how much of the typed part appears in the token
+                similarity = count / len(grams)
+            else:
+                similarity = 2 * count / (len(grams) + len(trigrams(token)))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                weights[t] = FUZZY_WEIGHT * similarity
+        return weights
+
+    def _term_weights(self, weights):
+        """Entity id -> best match weight of one term, for every entity it matches."""
+        best = {}
+        # Lowest weight first, so each entity ends up with its best matching token
+        for t, weight in sorted(weights.items(), key=lambda item: item[1]):
+            best.update(dict.fromkeys(self._postings[t], weight))
+        return best
+
+    def _score(self, expansions, normalized, limit):
+        """Best `limit` (-score, id) pairs over every entity that matches all terms."""
+        sizes = [sum(len(self._postings[t]) for t in w) for w in expansions]
+        order = sorted(range(len(expansions)), key=sizes.__getitem__)
+        # Rarest term first, so the candidates only shrink from there
+        scores = self._term_weights(expansions[order[0]])
+        for i in order[1:]:
+            weights = expansions[i]
+            if sizes[i] <= len(scores):
+                other = self._term_weights(weights)
+                scores = {e: score + other[e] for e, score in scores.items() if e in other}
+            else:
+                # Few candidates left: look their tokens up instead
+                scores = {
+                    e: score + best for e, score in scores.items()
+                    if (best := max((weights.get(t, 0.0) for t in self._entity_tokens[e]), default=0.0))
+                }
+        # A label can only start with the query if its first token matches the first term
+        for t in expansions[0]:
+            for e in self._leading.get(t, ()):
+                if e in scores and self._labels[e].startswith(normalized):
+                    scores[e] += LABEL_PREFIX_BONUS
+        return heapq.nsmallest(limit, ((-score, e) for e, score in scores.items()))
+
+    def search(self, query, limit=10):
+        """Best `limit` entities for `query`; the last word may be incomplete."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        prefix = not query[-1:].isspace()
+        expansions = [self._expand(term, prefix and i == len(terms) - 1) for i, term in enumerate(terms)]
+        if not all(expansions):
+            return []
+
+        normalized = " ".join(terms)
+        if len(terms) == 1 and prefix and len(terms[0]) <= SHORT_PREFIX and terms[0] in self._top_by_prefix:
+            # Scored at build time over the prefix's full expansion
+            scored = self._top_by_prefix[terms[0]][:limit]
+        else:
+            scored = self._score(expansions, normalized, limit)
+
+        return [
+            {**self.entities[e], "score": round(-neg, 3)}
+            for neg, e in scored
+        ]
+
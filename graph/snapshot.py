@@ -0,0 +1,110 @@
+# graph/snapshot.py
+
+import hashlib
+import json
+
+from graph.wire import compress, encode, negotiate_encoding
+
+
+class GraphSnapshot:
+    """Immutable, id-indexed view of the knowledge graph built once per data version."""
+
+    def __init__(self, nodes, links):
+        self.nodes = nodes
+        self.links = links
+        self.node_index = {node["id"]: i for i, node in enumerate(nodes)}
+        # Ids a ?tier= filter may name; features or support ids are not tiers
+        self.tiers = frozenset(node["id"] for node in nodes if node.get("group") == "Tier")
+
+        # Adjacency index: node id -> indices of every link touching it
+        self.adjacency = {}
+        for i, link in enumerate(links):
+            self.adjacency.setdefault(link["source"], []).append(i)
+            if link["target"] != link["source"]:
+                self.adjacency.setdefault(link["target"], []).append(i)
+
+        # Serialize once; every request for the full graph reuses these bytes
+        self.payload = json.dumps(
+            {"nodes": nodes, "links": links}, separators=(",", ":")
+        ).encode("utf-8")
+        self.version = hashlib.sha256(self.payload).hexdigest()[:16]
+        # (format, encoding) -> bytes, filled on first request for each
+        self._representations = {("json", "identity"): self.payload}
+
+    @property
+    def etag(self):
+        return self.version
+
+    def representation(self, fmt="json", encoding="identity"):
+        """The full graph in a graph.wire format and content encoding, encoded once."""
+        key = (fmt, encoding)
+        body = self._representations.get(key)
+        if body is None:
+            body = compress(self.representation(fmt), encoding, cached=True) if encoding != "identity" \
+                else encode(self.to_dict(), fmt)
+            # Racing requests may both encode; either result is identical
+            self._representations[key] = body
+        return body
+
+    def negotiate(self, fmt, accept_encoding_header):
+        """Return (body, encoding, etag) of the full graph for one response."""
+        encoding = negotiate_encoding(accept_encoding_header, len(self.representation(fmt)))
+        etag = self.etag if (fmt, encoding) == ("json", "identity") else f"{self.etag}-{fmt}-{encoding}"
+        return self.representation(fmt, encoding), encoding, etag
+
+    def get_node(self, node_id):
+        i = self.node_index.get(node_id)
+        return self.nodes[i] if i is not None else None
+
+    def neighborhood(self, seeds, depth=1):
+        """Return the subgraph within `depth` hops of the seed nodes.
+
+        Links are followed in both directions. Only the adjacency lists of the
+        visited nodes are read, so the cost scales with the size of the result.
+        """
+        visited = set(seeds)
+        frontier = list(visited)
+        link_ids = set()
+
+        for _ in range(depth):
+            next_frontier = []
+            for node_id in frontier:
+                for i in self.adjacency.get(node_id, ()):
+                    link_ids.add(i)
+                    link = self.links[i]
+                    other = link["target"] if link["source"] == node_id else link["source"]
+                    if other not in visited:
+                        visited.add(other)
+                        next_frontier.append(other)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+
+        # Keep the snapshot's ordering so filtered views are stable across requests
+        node_ids = sorted(self.node_index[n] for n in visited if n in self.node_index)
+        return {
+            "nodes": [self.nodes[i] for i in node_ids],
+            "links": [self.links[i] for i in sorted(link_ids)],
+        }
+
+    def to_dict(self):
+        return {"nodes": self.nodes, "links": self.links}
+
+
+class GraphSnapshotBuilder:
+    """Accumulates nodes and links with O(1) id-based de-duplication."""
+
+    def __init__(self):
+        self._nodes = {}
+        self._links = []
+
+    def add_node(self, node_id, **attrs):
+        if node_id not in self._nodes:
+            self._nodes[node_id] = {"id": node_id, **attrs}
+        return node_id
+
+    def add_link(self, source, target, label):
+        self._links.append({"source": source, "target": target, "label": label})
+
+    def build(self):
+        return GraphSnapshot(list(self._nodes.values()), self._links)
@@ -0,0 +1,194 @@
+# graph/sync.py
+"""
+Diff the entities/relationships JSON against the live graph (or a stored
+manifest of the last sync) and describe the minimal set of writes.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+
+# Relationship type -> (source label, target label)
+EDGE_LABELS = {
+    "INCLUDES": ("SubscriptionTier", "Feature"),
+    "SUPPORTS": ("SubscriptionTier", "SupportChannel"),
+    "CAN_UPGRADE_TO": ("SubscriptionTier", "SubscriptionTier"),
+}
+NODE_LABELS = ("SubscriptionTier", "Feature", "SupportChannel")
+
+
+def empty_state():
+    return {
+        "nodes": {label: {} for label in NODE_LABELS},
+        "edges": {rel: set() for rel in EDGE_LABELS},
+    }
+
+
+def desired_state(entities, relationships):
+    """Build the target graph state: nodes keyed by name with their properties, edges as pairs."""
+    state = empty_state()
+    nodes, edges = state["nodes"], state["edges"]
+    for tier, features in entities["Features"].items():
+        nodes["SubscriptionTier"][tier] = {"limitations": entities["Limitations"].get(tier, [])}
+        for feat in features:
+            nodes["Feature"][feat] = {}
+            edges["INCLUDES"].add((tier, feat))
+        for item in entities["SupportLevels"].get(tier, []):
+            nodes["SupportChannel"][item] = {}
+            edges["SUPPORTS"].add((tier, item))
+    for src, dests in relationships.get("Upgrades", {}).items():
+        for dst in dests:
+            # MATCH-based upgrade edges only exist between tiers that were created
+            if src in nodes["SubscriptionTier"] and dst in nodes["SubscriptionTier"]:
+                edges["CAN_UPGRADE_TO"].add((src, dst))
+    return state
+
+
+def read_graph_state(connector):
+    """Read the current tiers, features, support channels and their edges from Neo4j."""
+    state = empty_state()
+    for r in connector.run_query(
+        "MATCH (t:SubscriptionTier) RETURN t.name AS name, t.limitations AS limitations"
+    ):
+        state["nodes"]["SubscriptionTier"][r["name"]] = {"limitations": r["limitations"] or []}
+    for label in ("Feature", "SupportChannel"):
+        for r in connector.run_query(f"MATCH (n:{label}) RETURN n.name AS name"):
+            state["nodes"][label][r["name"]] = {}
+    for rel, (src_label, dst_label) in EDGE_LABELS.items():
+        for r in connector.run_query(
+            f"MATCH (a:{src_label})-[:{rel}]->(b:{dst_label}) RETURN a.name AS src, b.name AS dst"
+        ):
+            state["edges"][rel].add((r["src"], r["dst"]))
+    return state
+
+
+def load_manifest(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    state = empty_state()
+    state["nodes"].update(data["nodes"])
+    for rel, pairs in data["edges"].items():
+        state["edges"][rel] = {tuple(pair) for pair in pairs}
+    return state
+
+
+def save_manifest(path, state):
+    data = {
+        "nodes": state["nodes"],
+        "edges": {rel: sorted(pairs) for rel, pairs in state["edges"].items()},
+    }
+    # Write-then-rename so a crash never leaves a half-written manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class GraphDiff:
+    added_nodes: dict = field(default_factory=dict)    # label -> {name: props}
+    removed_nodes: dict = field(default_factory=dict)  # label -> [name]
+    changed_nodes: dict = field(default_factory=dict)  # label -> {name: props}
+    added_edges: dict = field(default_factory=dict)    # rel -> [(src, dst)]
+    removed_edges: dict = field(default_factory=dict)  # rel -> [(src, dst)]
+
+    def is_empty(self):
+        return not any(
+            any(v for v in part.values())
+            for part in (self.added_nodes, self.removed_nodes, self.changed_nodes,
+                         self.added_edges, self.removed_edges)
+        )
+
+    def summary(self):
+        if self.is_empty():
+            return "no changes"
+        parts = []
+        for label in NODE_LABELS:
+            added = len(self.added_nodes.get(label, {}))
+            removed = len(self.removed_nodes.get(label, []))
+            changed = len(self.changed_nodes.get(label, {}))
+            if added or removed or changed:
+                parts.append(f"{label} +{added}/-{removed}/~{changed}")
+        for rel in EDGE_LABELS:
+            added = len(self.added_edges.get(rel, []))
+            removed = len(self.removed_edges.get(rel, []))
+            if added or removed:
+                parts.append(f"{rel} +{added}/-{removed}")
+        return ", ".join(parts)
+
+
+def diff_states(current, desired):
+    diff = GraphDiff()
+    for label in NODE_LABELS:
+        cur, new = current["nodes"][label], desired["nodes"][label]
+        diff.added_nodes[label] = {name: props for name, props in new.items() if name not in cur}
+        diff.removed_nodes[label] = sorted(name for name in cur if name not in new)
+        diff.changed_nodes[label] = {
+            name: props for name, props in new.items() if name in cur and cur[name] != props
+        }
+    for rel in EDGE_LABELS:
+        cur, new = current["edges"][rel], desired["edges"][rel]
+        diff.added_edges[rel] = sorted(new - cur)
+        diff.removed_edges[rel] = sorted(cur - new)
+    return diff
+
+
+def diff_statements(diff):
+    """Translate a GraphDiff into (query, params) pairs to run in one transaction."""
+    statements = []
+
+    # Drop stale edges and nodes first so re-added names start clean
+    for rel, pairs in diff.removed_edges.items():
+        if pairs:
+            src_label, dst_label = EDGE_LABELS[rel]
+            statements.append((
+                f"""
+                UNWIND $rows AS row
+                MATCH (a:{src_label} {{name: row.src}})-[r:{rel}]->(b:{dst_label} {{name: row.dst}})
+                DELETE r
+                """,
+                {"rows": [{"src": s, "dst": d} for s, d in pairs]},
+            ))
+    for label, names in diff.removed_nodes.items():
+        if names:
+            statements.append((
+                f"UNWIND $rows AS name MATCH (n:{label} {{name: name}}) DETACH DELETE n",
+                {"rows": names},
+            ))
+
+    tiers = {
+        **diff.added_nodes.get("SubscriptionTier", {}),
+        **diff.changed_nodes.get("SubscriptionTier", {}),
+    }
+    if tiers:
+        statements.append((
+            """
+            UNWIND $rows AS row
+            MERGE (t:SubscriptionTier {name: row.name})
+            SET t.limitations = row.limitations
+            """,
+            {"rows": [{"name": name, "limitations": props["limitations"]} for name, props in tiers.items()]},
+        ))
+    for label in ("Feature", "SupportChannel"):
+        names = list(diff.added_nodes.get(label, {}))
+        if names:
+            statements.append((
+                f"UNWIND $rows AS name MERGE (n:{label} {{name: name}})",
+                {"rows": names},
+            ))
+
+    for rel, pairs in diff.added_edges.items():
+        if pairs:
+            src_label, dst_label = EDGE_LABELS[rel]
+            statements.append((
+                f"""
+                UNWIND $rows AS row
+                MATCH (a:{src_label} {{name: row.src}})
+                MATCH (b:{dst_label} {{name: row.dst}})
+                MERGE (a)-[:{rel}]->(b)
+                """,
+                {"rows": [{"src": s, "dst": d} for s, d in pairs]},
+            ))
+    return statements
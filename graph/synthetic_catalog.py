@@ -0,0 +1,78 @@
+# graph/synthetic_catalog.py
+"""
+Generate synthetic product catalogs in the data/*.json shape and benchmark
+the bulk loader against them:
+
+    python -m graph.synthetic_catalog --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+
+def generate_catalog(num_nodes, seed=0):
+    """Return (entities, relationships) dicts describing roughly `num_nodes` nodes."""
+    rng = random.Random(seed)
+
+    num_tiers = max(3, min(1000, num_nodes // 1000))
+    num_support = max(3, num_nodes // 100)
+    num_features = max(1, num_nodes - num_tiers - num_support)
+
+    tiers = [f"Tier {i:04d}" for i in range(num_tiers)]
+    features = {tier: [] for tier in tiers}
+    support = {tier: [] for tier in tiers}
+
+    for i in range(num_features):
+        features[rng.choice(tiers)].append(f"Feature {i:07d}")
+    for i in range(num_support):
+        support[tiers[i % num_tiers]].append(f"Support Channel {i:06d}")
+
+    entities = {
+        "SubscriptionTiers": tiers,
+        "Features": features,
+        "Limitations": {
+            tier: [f"{tier} Limit {j}" for j in range(rng.randint(0, 3))] for tier in tiers
+        },
+        "SupportLevels": support,
+    }
+    # Each tier can upgrade to the next few tiers, like Basic -> Standard/Premium
+    relationships = {
+        "Upgrades": {
+            tier: tiers[i + 1:i + 3] for i, tier in enumerate(tiers)
+        },
+    }
+    return entities, relationships
+
+def write_catalog(num_nodes, out_dir, seed=0):
+    """Write a synthetic catalog as entities.json / relationships.json into out_dir."""
+    entities, relationships = generate_catalog(num_nodes, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    entities_path = os.path.join(out_dir, "entities.json")
+    relationships_path = os.path.join(out_dir, "relationships.json")
+    with open(entities_path, "w") as ef, open(relationships_path, "w") as rf:
+        json.dump(entities, ef)
+        json.dump(relationships, rf)
+    return entities_path, relationships_path
+
+def main():
+    from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, BULK_BATCH_SIZE
+    from graph.build_graph import KnowledgeGraphBuilder
+
+    parser = argparse.ArgumentParser(description="Benchmark the bulk graph loader")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    builder = KnowledgeGraphBuilder(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        for size in args.sizes:
+            entities, relationships = generate_catalog(size, args.seed)
+            print(f"\n=== {size} nodes, batch size {args.batch_size} ===")
+            builder.bulk_load(entities, relationships, args.batch_size)
+    finally:
+        builder.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# graph/version.py
+"""
+Graph data version: a content hash published whenever the graph is rebuilt.
+
+In-process listeners (e.g. caches) are notified directly; other processes see
+the new version on the (:GraphMeta) node written by KnowledgeGraphBuilder.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+
+_lock = threading.Lock()
+_current_version = None
+_listeners = []
+
+
+def compute_graph_version(state):
+    """Hash a JSON-serializable description of the graph into a short version string."""
+    payload = json.dumps(state, sort_keys=True, default=sorted, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def get_graph_version():
+    return _current_version
+
+
+def subscribe(listener):
+    """Call `listener(version)` on every publish. Bound methods are held weakly."""
+    ref = weakref.WeakMethod(listener) if hasattr(listener, "__self__") else (lambda: listener)
+    with _lock:
+        _listeners.append(ref)
+
+
+def publish_graph_version(version):
+    global _current_version
+    with _lock:
+        _current_version = version
+        _listeners[:] = [ref for ref in _listeners if ref() is not None]
+        listeners = [ref() for ref in _listeners]
+    for listener in listeners:
+        if listener is not None:
+            listener(version)
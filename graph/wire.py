@@ -0,0 +1,187 @@
+# graph/wire.py
+"""
+Wire formats for graph payloads.
+
+The default "json" format is the plain {"nodes": [...], "links": [...]} shape.
+The opt-in "compact" format is columnar: low-cardinality string attributes
+(group, color, link label) are interned into value tables, and links refer to
+nodes by their integer position instead of repeating the id strings:
+
+    {
+      "format": "columnar-v1",
+      "nodes": {"count": 3, "columns": {
+          "id": ["Basic", ...],                       # plain column
+          "group": {"values": ["Tier", ...], "index": [0, 0, 1]}  # interned column
+      }},
+      "links": {"count": 2, "source": [0, 0], "target": [1, 2], "columns": {
+          "label": {"values": ["HAS_FEATURE"], "index": [0, 0]}
+      }},
+      "external_ids": []    # link endpoints that aren't nodes; referenced as -1, -2, ...
+    }
+
+"msgpack" is the compact structure encoded with msgpack instead of JSON.
+Any format can additionally be compressed with gzip or brotli.
+"""
+
+import gzip
+import importlib.util
+import json
+
+from werkzeug.http import parse_accept_header
+
+HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+if HAS_BROTLI:
+    import brotli
+if HAS_MSGPACK:
+    import msgpack
+
+COMPACT_FORMAT = "columnar-v1"
+
+MIMETYPES = {
+    "json": "application/json",
+    "compact": "application/vnd.simulia.graph+json",
+    "msgpack": "application/msgpack",
+}
+
+# Accept header media types that select a format
+ACCEPT_FORMATS = {
+    "application/vnd.simulia.graph+json": "compact",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/json": "json",
+}
+
+# Payloads smaller than this aren't worth compressing
+COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+# Full snapshots are compressed once and cached, so they get the slow, small setting
+BROTLI_QUALITY_CACHED = 11
+BROTLI_QUALITY = 5
+
+
+class UnsupportedFormat(ValueError):
+    """The requested format is unknown or its optional dependency isn't installed."""
+
+
+def _column(values):
+    """Intern a column when it repeats enough for the value table to pay off."""
+    table = {}
+    index = [table.setdefault(v, len(table)) for v in values]
+    if len(table) * 2 > len(values) or not all(isinstance(v, str) for v in table):
+        return list(values)
+    return {"values": list(table), "index": index}
+
+
+def to_compact(graph):
+    """Columnar representation of a {"nodes": [...], "links": [...]} graph."""
+    nodes, links = graph["nodes"], graph["links"]
+    positions = {node["id"]: i for i, node in enumerate(nodes)}
+    external = {}
+
+    def position(node_id):
+        i = positions.get(node_id)
+        if i is None:
+            i = -1 - external.setdefault(node_id, len(external))
+        return i
+
+    node_keys = list(dict.fromkeys(k for node in nodes for k in node))
+    link_keys = list(dict.fromkeys(k for link in links for k in link if k not in ("source", "target")))
+    return {
+        "format": COMPACT_FORMAT,
+        "nodes": {
+            "count": len(nodes),
+            "columns": {k: _column([node.get(k) for node in nodes]) for k in node_keys},
+        },
+        "links": {
+            "count": len(links),
+            "source": [position(link["source"]) for link in links],
+            "target": [position(link["target"]) for link in links],
+            "columns": {k: _column([link.get(k) for link in links]) for k in link_keys},
+        },
+        "external_ids": list(external),
+    }
+
+
+def from_compact(data):
+    """Inverse of to_compact(); attributes that were missing come back as None."""
+    def expand(column, count):
+        if isinstance(column, dict):
+            return [column["values"][i] for i in column["index"]]
+        return column if column else [None] * count
+
+    n = data["nodes"]["count"]
+    node_columns = {k: expand(c, n) for k, c in data["nodes"]["columns"].items()}
+    nodes = [{k: col[i] for k, col in node_columns.items()} for i in range(n)]
+    ids = node_columns.get("id", [None] * n)
+    external = data.get("external_ids", [])
+
+    def node_id(i):
+        return ids[i] if i >= 0 else external[-1 - i]
+
+    m = data["links"]["count"]
+    link_columns = {k: expand(c, m) for k, c in data["links"]["columns"].items()}
+    links = []
+    for i in range(m):
+        link = {"source": node_id(data["links"]["source"][i]), "target": node_id(data["links"]["target"][i])}
+        link.update({k: col[i] for k, col in link_columns.items()})
+        links.append(link)
+    return {"nodes": nodes, "links": links}
+
+
+def encode(graph, fmt):
+    """Serialize a graph dict in one of MIMETYPES' formats."""
+    if fmt == "json":
+        return json.dumps(graph, separators=(",", ":")).encode("utf-8")
+    if fmt == "compact":
+        return json.dumps(to_compact(graph), separators=(",", ":")).encode("utf-8")
+    if fmt == "msgpack":
+        if not HAS_MSGPACK:
+            raise UnsupportedFormat("msgpack is not installed on the server")
+        return msgpack.packb(to_compact(graph), use_bin_type=True)
+    raise UnsupportedFormat(f"Unknown graph format: {fmt}")
+
+
+def compress(payload, encoding, cached=False):
+    if encoding == "br":
+        return brotli.compress(payload, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 keeps the output, and therefore the ETag, deterministic
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+    return payload
+
+
+def negotiate_format(format_param, accept_header):
+    """Pick the graph format from ?format= or, failing that, the Accept header."""
+    if format_param:
+        if format_param not in MIMETYPES:
+            raise UnsupportedFormat(f"format must be one of: {', '.join(MIMETYPES)}")
+        if format_param == "msgpack" and not HAS_MSGPACK:
+            raise UnsupportedFormat("msgpack is not installed on the server")
+        return format_param
+    best, best_quality = "json", 0
+    for mimetype, quality in parse_accept_header(accept_header or ""):
+        fmt = ACCEPT_FORMATS.get(mimetype)
+        if fmt == "msgpack" and not HAS_MSGPACK:
+            continue
+        if fmt is not None and quality > best_quality:
+            best, best_quality = fmt, quality
+    return best
+
+
+def negotiate_encoding(accept_encoding_header, size):
+    """Pick br, gzip or identity for a payload of `size` bytes."""
+    if size < COMPRESSION_MIN_BYTES:
+        return "identity"
+    accepted = {value.lower(): q for value, q in parse_accept_header(accept_encoding_header or "") if q > 0}
+    for encoding in (("br", "gzip") if HAS_BROTLI else ("gzip",)):
+        if encoding in accepted:
+            return encoding
+    return "identity"
+
+
+def encode_graph(graph, fmt, accept_encoding_header):
+    """Serialize and compress a graph for one response; returns (body, encoding)."""
+    payload = encode(graph, fmt)
+    encoding = negotiate_encoding(accept_encoding_header, len(payload))
+    return compress(payload, encoding), encoding
@@ -0,0 +1,274 @@
+# llm/answer_cache.py
+"""
+Semantic cache of generated answers, so paraphrases of a question that was
+already answered skip the LLM.
+
+Queries are normalized (case, punctuation, filler words, simple suffixes) and
+embedded as sparse character-trigram + word vectors; a hit needs cosine
+similarity above a threshold *and* the same known entities (tier, feature,
+limitation and support names) in the same order plus the same negations and
+numbers, so "upgrade Basic to Premium" never matches "Premium to Basic" and
+"Multi-Physics Simulation" never matches "Single-Physics Simulation".
+
+Stored answers are written to disk by a background timer, at most once per
+save interval, rather than on the request that produced them.
+"""
+
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from config import (
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_SIZE,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_SAVE_INTERVAL,
+)
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "do", "does", "did", "can", "could",
+    "i", "me", "my", "we", "our", "you", "your", "it", "its", "of", "in", "on",
+    "for", "with", "to", "from", "and", "or", "what", "whats", "which", "please",
+    "tell", "about", "there", "this", "that", "get", "have", "has", "any",
+    # Domain filler that doesn't change the meaning of a question
+    "tier", "tiers", "plan", "plans", "subscription", "subscriptions", "simulia",
+}
+
+# Words that flip a question's meaning while barely changing its trigrams
+NEGATIONS = {"not", "no", "without", "cant", "cannot", "dont", "doesnt", "isnt", "arent", "never"}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_query(text):
+    """Lowercase, drop punctuation and filler words, and strip simple suffixes."""
+    words = _WORD_RE.findall(text.lower().replace("'", ""))
+    return " ".join(_stem(w) for w in words if w not in STOPWORDS)
+
+
+def embed(normalized):
+    """Sparse, L2-normalized bag of character trigrams plus whole words."""
+    features = Counter()
+    for word in normalized.split():
+        features["w:" + word] += 2
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[padded[i:i + 3]] += 1
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower().replace("'", ""))
+
+
+class SemanticAnswerCache:
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD,
+                 max_size=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL, entity_terms=(),
+                 save_interval=ANSWER_CACHE_SAVE_INTERVAL):
+        self.path = path
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.save_interval = save_interval
+        self.version = None
+        self._entity_terms = {}  # first word -> entity word tuples, longest first
+        self._entries = OrderedDict()  # normalized query -> entry dict
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saves = 0
+        self.set_entity_terms(entity_terms)
+        self.load()
+        if self.path:
+            # Don't lose answers stored since the last background save
+            atexit.register(self.flush)
+
+    def set_entity_terms(self, terms):
+        """Names whose presence and order must match for a semantic hit."""
+        index = {}
+        for term in {tuple(_words(t)) for t in terms}:
+            if term:
+                index.setdefault(term[0], []).append(term)
+        for candidates in index.values():
+            candidates.sort(key=len, reverse=True)
+        self._entity_terms = index
+
+    def _entities(self, text):
+        """Known entities, negations and numbers, in order; must be identical for a semantic hit.
+
+        Entities are matched on whole words, longest name first, so the cost
+        depends on the query's length rather than the size of the catalog.
+        """
+        words = _words(text)
+        index = self._entity_terms
+        found = []
+        i = 0
+        while i < len(words):
+            word = words[i]
+            for term in index.get(word, ()):
+                if tuple(words[i:i + len(term)]) == term:
+                    found.append(" ".join(term))
+                    i += len(term)
+                    break
+            else:
+                # "500k" vs "2 million" barely changes the trigrams either
+                if word in NEGATIONS or any(c.isdigit() for c in word):
+                    found.append(word)
+                i += 1
+        return found
+
+    def _check_version(self, version):
+        # Called with the lock held: answers from an older graph are dropped
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def lookup(self, query, version=None):
+        """Return a cached answer for this query or a close paraphrase, else None."""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+
+            vector = embed(key)
+            entities = self._entities(query)
+            best, best_score = None, self.threshold
+            for candidate_key, candidate in self._entries.items():
+                if candidate["expires_at"] <= now or candidate["entities"] != entities:
+                    continue
+                score = cosine(vector, candidate["vector"])
+                if score >= best_score:
+                    best, best_score = candidate_key, score
+            if best is not None:
+                self._entries.move_to_end(best)
+                self.similar_hits += 1
+                return self._entries[best]["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, query, answer, version=None):
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = self._make_entry(query, answer, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        self._schedule_save()
+
+    def _make_entry(self, query, answer, expires_at):
+        return {
+            "query": query,
+            "answer": answer,
+            "expires_at": expires_at,
+            "vector": embed(normalize_query(query)),
+            "entities": self._entities(query),
+        }
+
+    def invalidate(self, version=None):
+        with self._lock:
+            self._entries.clear()
+            self.version = version
+        self._schedule_save()
+
+    def _schedule_save(self):
+        """Save in the background within save_interval; changes until then share one write."""
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            timer = self._save_timer = threading.Timer(self.save_interval, self.flush)
+        timer.daemon = True
+        timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            self._save_timer = None
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self.save()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable answer cache {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            self.version = data.get("version")
+            for item in data.get("entries", []):
+                if item["expires_at"] > now:
+                    entry = self._make_entry(item["query"], item["answer"], item["expires_at"])
+                    self._entries[normalize_query(item["query"])] = entry
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "version": self.version,
+                "entries": [
+                    {"query": e["query"], "answer": e["answer"], "expires_at": e["expires_at"]}
+                    for e in self._entries.values()
+                ],
+            }
+        # Write-then-rename so a crash never leaves a truncated cache file
+        with self._save_lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self.saves += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "version": self.version,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saves": self.saves,
+            }
@@ -1,5 +1,264 @@
 # llm/answer_generator.py
-def generate_answer(llm, question, retrieved_info, entity, info_type):
+
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+from config import PROMPT_FACT_TOKEN_BUDGET
+from graph.comparison import TierComparison
+from llm.answer_cache import normalize_query
+from llm.intent_matcher import INHERITED_FACETS, INTENT_PATTERNS
+from metrics import GENERATE_ANSWER_SECONDS, LLM_STAGE_SECONDS
+
+# Fixed instructions; the catalog facts are retrieved per question
+SYSTEM_PROMPT = """You are an assistant for SIMULIA subscription services.
+            You help users understand the differences between the subscription tiers.
+            Answer using only the facts provided with the question.
+            Higher tiers include all features of the tiers that can upgrade to them.
+            If the facts don't cover the question, say so.
+            Always provide clear, concise, and accurate information."""
+
+LLM_MAX_TOKENS = 512
+LLM_STOP = ["</s>", "[INST]"]
+
+FACET_LABELS = {
+    "features": "features",
+    "limitations": "limitations",
+    "support": "support",
+    "upgrades": "can upgrade to",
+}
+
+# Score added for facts about a tier or facet the question names
+TIER_BOOST = 2.0
+FACET_BOOST = 1.0
+
+def build_prompt_prefix():
+    """The part of every API prompt that doesn't depend on the question.
+
+    It ends on a line break so it tokenizes identically on its own and as the
+    start of the full prompt, which lets llama_cpp reuse its evaluated state.
+    """
+    return f"<s>[INST] {SYSTEM_PROMPT}\n\n"
+
+def build_query_prompt(query, facts="", history=""):
+    """Format the Mistral instruction prompt for a user query and its retrieved facts.
+
+    `history` (ConversationMemory.render()) goes before the facts: it only
+    grows at its end from one turn to the next, so the evaluated prefix
+    carries over and the per-question facts don't break it.
+    """
+    context = f"Facts:\n{facts}\n\n" if facts else ""
+    return f"{build_prompt_prefix()}{history}{context}User: {query} [/INST]"
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English text under the Mistral tokenizer
+    return len(text) // 4 + 1
+
+@dataclass
+class Fact:
+    tier: str
+    facet: str
+    item: str
+    inherited: bool = False
+
+class PromptBuilder:
+    """Ranks catalog facts against a question and packs them into a token budget.
+
+    Facts are one (tier, facet, item) triple each, indexed by term (BM25) and
+    by tier and facet, so scoring only reads the postings a question touches.
+    Features and support are the cumulative sets the templated answers use
+    (TierComparison.items); a question no fact matches gets an overview of
+    every tier instead of an empty Facts block.
+    """
+
+    def __init__(self, features, limitations, support, upgrades, token_budget=PROMPT_FACT_TOKEN_BUDGET,
+                 count_tokens=None, version=None, comparison=None):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        self.version = version
+        if comparison is None:
+            comparison = TierComparison.from_subscription_data({
+                "Features": features, "Limitations": limitations, "SupportLevels": support,
+                "Relationships": {"Upgrades": upgrades},
+            }, version)
+        self.facts = []
+        for facet, by_tier in (("features", features), ("limitations", limitations),
+                               ("support", support), ("upgrades", upgrades)):
+            for tier, items in by_tier.items():
+                self.facts.extend(Fact(tier, facet, item) for item in items)
+                if facet in INHERITED_FACETS and tier in comparison.bits:
+                    own = set(items)
+                    self.facts.extend(Fact(tier, facet, item, inherited=True)
+                                      for item in comparison.items(tier, facet) if item not in own)
+        self._overview = None
+
+        self.tiers = list(features)
+        self._tier_re = re.compile(
+            r"\b(" + "|".join(re.escape(t) for t in sorted(self.tiers, key=len, reverse=True)) + r")\b",
+            re.IGNORECASE,
+        ) if self.tiers else None
+        self._tier_names = {t.lower(): t for t in self.tiers}
+        self._tier_terms = {term for t in self.tiers for term in normalize_query(t).split()}
+        self._facet_res = {
+            facet: re.compile(INTENT_PATTERNS[facet], re.IGNORECASE) for facet in FACET_LABELS
+        }
+
+        # Inverted index: term -> {fact id: term frequency}
+        self._postings = defaultdict(dict)
+        self._by_tier_facet = defaultdict(list)
+        self._upgrades_into = defaultdict(list)
+        lengths = []
+        for i, fact in enumerate(self.facts):
+            terms = normalize_query(fact.item).split()
+            lengths.append(len(terms))
+            for term in terms:
+                self._postings[term][i] = self._postings[term].get(i, 0) + 1
+            self._by_tier_facet[(fact.tier, fact.facet)].append(i)
+            if fact.facet == "upgrades":
+                self._upgrades_into[fact.item].append(i)
+        self._lengths = lengths
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 1.0
+
+    @classmethod
+    def from_subscription_data(cls, data, **kwargs):
+        return cls(
+            data["Features"],
+            data["Limitations"],
+            data["SupportLevels"],
+            data["Relationships"]["Upgrades"],
+            **kwargs
+        )
+
+    @classmethod
+    def from_tier_profiles(cls, profiles, **kwargs):
+        """Build from QueryEngine.get_tier_profiles() results."""
+        return cls(
+            {name: p.features for name, p in profiles.items()},
+            {name: p.limitations for name, p in profiles.items()},
+            {name: p.support for name, p in profiles.items()},
+            {name: p.upgrades for name, p in profiles.items()},
+            **kwargs
+        )
+
+    def retrieve(self, question, default_tier=None, default_facet=None):
+        """Return facts ranked by relevance to the question, best first."""
+        tiers = []
+        if self._tier_re:
+            for m in self._tier_re.findall(question):
+                tier = self._tier_names[m.lower()]
+                if tier not in tiers:
+                    tiers.append(tier)
+        facets = [f for f, r in self._facet_res.items() if r.search(question)]
+        if not tiers and default_tier in self._tier_names.values():
+            tiers = [default_tier]
+        if not facets and default_facet in FACET_LABELS:
+            facets = [default_facet]
+
+        scores = defaultdict(float)
+        n = len(self.facts)
+        k1, b = 1.2, 0.75
+        # Tier names are scored structurally below, not as words
+        for term in set(normalize_query(question).split()) - self._tier_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings.items():
+                norm = k1 * (1 - b + b * self._lengths[i] / self._avg_length)
+                scores[i] += idf * tf * (k1 + 1) / (tf + norm)
+
+        # Every fact about a named tier is a candidate; facets the question
+        # asks about come first, the rest only fill leftover budget
+        for tier in tiers:
+            for facet in FACET_LABELS:
+                if not facets:
+                    boost = TIER_BOOST
+                elif facet in facets:
+                    boost = TIER_BOOST + FACET_BOOST
+                else:
+                    boost = FACET_BOOST / 4
+                for i in self._by_tier_facet.get((tier, facet), ()):
+                    scores[i] += boost
+                if facet == "upgrades":
+                    # Upgrade paths into the tier matter as much as those out of it
+                    for i in self._upgrades_into.get(tier, ()):
+                        scores[i] += boost
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+        return [self.facts[i] for i in ranked]
+
+    def overview(self):
+        """Every tier's own items, round-robin so each tier and facet gets a share of the budget.
+
+        Used when a question names no tier or item; inherited items are left
+        out since the system prompt says higher tiers include lower ones.
+        """
+        if self._overview is None:
+            position = defaultdict(int)
+            order = []
+            for i, fact in enumerate(self.facts):
+                if not fact.inherited:
+                    key = (fact.tier, fact.facet)
+                    order.append((position[key], i))
+                    position[key] += 1
+            self._overview = self._pack((self.facts[i] for _, i in sorted(order)), by_tier=True)
+        return self._overview
+
+    def build_facts(self, question, default_tier=None, default_facet=None):
+        """Render the best-ranked facts, grouped by tier and facet, within the token budget."""
+        facts = self.retrieve(question, default_tier, default_facet)
+        return self._pack(facts) if facts else self.overview()
+
+    def _pack(self, facts, by_tier=False):
+        groups = {}
+        used = 0
+        for fact in facts:
+            key = (fact.tier, fact.facet)
+            cost = estimate_tokens(fact.item) + 1
+            if key not in groups:
+                cost += estimate_tokens(f"- {fact.tier} {FACET_LABELS[fact.facet]}: ")
+            if used + cost > self.token_budget:
+                continue
+            groups.setdefault(key, []).append(fact.item)
+            used += cost
+
+        keys = list(groups)
+        if by_tier:
+            facet_order = list(FACET_LABELS)
+            tier_order = {tier: i for i, tier in enumerate(self.tiers)}
+            keys.sort(key=lambda k: (tier_order.get(k[0], len(tier_order)), facet_order.index(k[1])))
+        lines = [f"- {tier} {FACET_LABELS[facet]}: {', '.join(groups[(tier, facet)])}" for tier, facet in keys]
+        # The estimate is approximate; trim with the real tokenizer if we have one
+        if self.count_tokens is not None:
+            while lines and self.count_tokens("\n".join(lines)) > self.token_budget:
+                lines.pop()
+        return "\n".join(lines)
+
+    def build_prompt(self, question, default_tier=None, default_facet=None, history=""):
+        return build_query_prompt(question, self.build_facts(question, default_tier, default_facet), history)
+
+@GENERATE_ANSWER_SECONDS.timed()
+def generate_answer(llm, question, retrieved_info=None, entity=None, info_type=None, prompt_builder=None,
+                    memory=None):
+    """Answer a question with the LLM.
+
+    With a prompt_builder the prompt is grounded in facts retrieved for the
+    question (entity and info_type only break ties); otherwise it uses the
+    single retrieved facet for `entity`. A ConversationMemory adds the
+    session's earlier turns to the prompt and records this one.
+    """
+    if prompt_builder is not None:
+        with LLM_STAGE_SECONDS.time(stage="prompt_build"):
+            history = memory.render() if memory is not None else ""
+            prompt = prompt_builder.build_prompt(question, default_tier=entity, default_facet=info_type,
+                                                 history=history)
+        response = llm(prompt, max_tokens=LLM_MAX_TOKENS, stop=LLM_STOP)
+        answer = response["choices"][0]["text"].strip()
+        if memory is not None:
+            memory.add_turn(question, answer)
+        return answer
+
     info_labels = {
         "features": "features",
         "limitations": "limitations",
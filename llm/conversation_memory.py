@@ -0,0 +1,122 @@
+# llm/conversation_memory.py
+"""
+Bounded conversation history for one chat session.
+
+Recent turns are kept verbatim; when they outgrow the token budget the
+oldest are folded into one-line summaries, which are themselves capped.
+The rendered history sits between the fixed system prompt and the
+retrieved facts, and only grows at its end between compactions, so
+llama_cpp's longest-common-prefix reuse keeps it evaluated: each turn only
+pays for the newest exchange, the facts and the question. Compaction folds
+several turns at once so the prefix is invalidated only every few turns.
+"""
+
+import re
+from dataclasses import dataclass
+
+from config import CONVERSATION_TOKEN_BUDGET, CONVERSATION_SUMMARY_TOKEN_BUDGET, CONVERSATION_TURN_SUMMARY_TOKENS
+from llm.answer_generator import estimate_tokens
+
+HEADER = "Conversation so far:\n"
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def _clip(text, max_tokens):
+    text = " ".join(text.split())
+    # Same 4 characters per token as estimate_tokens
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars - 3].rstrip() + "..."
+
+
+def summarize_turn(question, answer, max_tokens=CONVERSATION_TURN_SUMMARY_TOKENS):
+    """One-line extractive summary: the question and the answer's first sentence."""
+    first_sentence = SENTENCE_END_RE.split(" ".join(answer.split()), maxsplit=1)[0]
+    half = max(1, max_tokens // 2)
+    return f"- Asked: {_clip(question, half)} Answer: {_clip(first_sentence, half)}\n"
+
+
+def render_turn(question, answer):
+    return f"User: {question}\nAssistant: {answer}\n"
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+    tokens: int
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus summaries of older ones, within `token_budget` tokens."""
+
+    def __init__(self, token_budget=CONVERSATION_TOKEN_BUDGET,
+                 summary_budget=CONVERSATION_SUMMARY_TOKEN_BUDGET, count_tokens=None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.count_tokens = count_tokens or estimate_tokens
+        self.turns = []
+        self.summaries = []  # (line, tokens), oldest first
+        self.summarized_turns = 0
+        self.dropped_summaries = 0
+        self.compactions = 0
+        # Running totals, so adding a turn costs the same however long the chat is
+        self._turn_tokens = 0
+        self._summary_tokens = 0
+
+    def __len__(self):
+        return self.summarized_turns + len(self.turns)
+
+    @property
+    def tokens(self):
+        return self._turn_tokens + self._summary_tokens
+
+    def add_turn(self, question, answer):
+        tokens = self.count_tokens(render_turn(question, answer))
+        self.turns.append(Turn(question, answer, tokens))
+        self._turn_tokens += tokens
+        if self.tokens > self.token_budget:
+            self._compact()
+
+    def _compact(self):
+        # Fold down to half of what verbatim turns may use, so the next few
+        # turns append to an unchanged prefix instead of compacting again
+        target = (self.token_budget - self.summary_budget) // 2
+        while self.turns and (self._turn_tokens > target or self.tokens > self.token_budget):
+            turn = self.turns.pop(0)
+            self._turn_tokens -= turn.tokens
+            line = summarize_turn(turn.question, turn.answer)
+            line_tokens = self.count_tokens(line)
+            self.summaries.append((line, line_tokens))
+            self._summary_tokens += line_tokens
+            self.summarized_turns += 1
+        while self.summaries and self._summary_tokens > self.summary_budget:
+            _, line_tokens = self.summaries.pop(0)
+            self._summary_tokens -= line_tokens
+            self.dropped_summaries += 1
+        self.compactions += 1
+
+    def render(self):
+        """History block for the prompt, or "" before the first turn."""
+        if not self.turns and not self.summaries:
+            return ""
+        parts = [HEADER]
+        if self.summaries:
+            parts.append("Earlier:\n")
+            parts.extend(line for line, _ in self.summaries)
+        parts.extend(render_turn(t.question, t.answer) for t in self.turns)
+        parts.append("\n")
+        return "".join(parts)
+
+    def clear(self):
+        self.__init__(self.token_budget, self.summary_budget, self.count_tokens)
+
+    def stats(self):
+        return {
+            "turns": len(self),
+            "verbatim_turns": len(self.turns),
+            "summarized_turns": self.summarized_turns,
+            "dropped_summaries": self.dropped_summaries,
+            "compactions": self.compactions,
+            "tokens": self.tokens,
+            "token_budget": self.token_budget,
+        }
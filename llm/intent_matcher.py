@@ -0,0 +1,280 @@
+# llm/intent_matcher.py
+"""
+Answer structured questions ("what are the limitations of Basic", "can I
+upgrade Standard to Premium") straight from the graph data with templates,
+so only open-ended questions need the LLM.
+"""
+
+import re
+import threading
+
+from graph.closure import reachable
+from graph.comparison import TierComparison
+
+# Phrases that ask for reasoning or advice rather than a lookup
+OPEN_ENDED_RE = re.compile(
+    r"\b(why|how (do|does|can|should|would)|explain|recommend|should i|which is best|"
+    r"best for|worth|cost|price|pricing|prorat\w*|example)\b",
+    re.IGNORECASE,
+)
+
+INTENT_PATTERNS = {
+    "features": r"\b(features?|includ\w*|capabilit\w*|offer\w*|comes? with|get with|what do i get)\b",
+    "limitations": r"\b(limitations?|limits?|limited|restrict\w*|constraints?|caps?)\b",
+    "support": r"\b(support\w*|help ?desk|contact|phone|chat|email|engineer)\b",
+    "upgrades": r"\b(upgrad\w*|move up|switch to)\b",
+    "compare": r"\b(compare|comparison|comparing|difference|differences|differ|vs\.?|versus)\b",
+    "gains": r"\b(gain\w*|what (would|will|do|does|can) (i|we|you) get|additional|extra|on top)\b",
+}
+
+# Negated lookups ("what is not included in Basic") invert a template's answer
+NEGATION_RE = re.compile(
+    r"\b(not|no|without|lacks?|lacking|missing|except|excluded?|(do|does|is|are|ca)n'?t)\b",
+    re.IGNORECASE,
+)
+
+FACET_TITLES = {
+    "features": "features",
+    "limitations": "limitations",
+    "support": "support options",
+}
+
+# Higher tiers include these from the tiers below them; limitations are per tier
+INHERITED_FACETS = ("features", "support")
+
+
+def _alternation(names):
+    # Longest first so "Live Chat (24/7)" wins over a shorter overlapping name
+    escaped = [re.escape(n) for n in sorted(set(names), key=len, reverse=True)]
+    return re.compile(r"(?<!\w)(" + "|".join(escaped) + r")(?!\w)", re.IGNORECASE) if escaped else None
+
+
+def _bullets(items):
+    return "\n".join(f"• {item}" for item in items)
+
+
+class IntentMatcher:
+    """Compiled intent/entity matcher over one version of the subscription data."""
+
+    def __init__(self, features, limitations, support, upgrades, version=None, comparison=None):
+        self.version = version
+        if comparison is None:
+            comparison = TierComparison.from_subscription_data({
+                "Features": features,
+                "Limitations": limitations,
+                "SupportLevels": support,
+                "Relationships": {"Upgrades": upgrades},
+            }, version)
+        # What each tier has, cumulative for inherited facets; every template answers from it
+        self.comparison = comparison
+        # Each tier's own items, to tell them apart from inherited ones
+        self.facets = {"features": features, "limitations": limitations, "support": support}
+        self.upgrades = upgrades
+        self.tiers = list(features)
+        self._tier_names = {t.lower(): t for t in self.tiers}
+        self._tier_re = _alternation(self.tiers)
+        # "from X" / "to X" fix the direction of an upgrade question whatever the word order
+        self._from_re = self._to_re = None
+        if self._tier_re is not None:
+            self._from_re = re.compile(r"\bfrom\s+(?:the\s+|my\s+)?" + self._tier_re.pattern, re.IGNORECASE)
+            self._to_re = re.compile(r"\b(?:to|into)\s+(?:the\s+)?" + self._tier_re.pattern, re.IGNORECASE)
+        self._intent_res = {k: re.compile(p, re.IGNORECASE) for k, p in INTENT_PATTERNS.items()}
+
+        # Facet item name -> (facet, name, tiers that list it themselves)
+        self._items = {}
+        for facet, by_tier in self.facets.items():
+            for tier, items in by_tier.items():
+                for item in items:
+                    self._items.setdefault(item.lower(), (facet, item, []))[2].append(tier)
+        self._item_re = _alternation(item for _, item, _ in self._items.values())
+
+        self._lock = threading.Lock()
+        self.matched = {}
+        self.total = 0
+
+    @classmethod
+    def from_subscription_data(cls, data, version=None, previous=None, comparison=None):
+        """Build from SUBSCRIPTION_DATA; `previous` carries its bypass counters over.
+
+        Pass the served TierComparison for the same version so templates and
+        /api/compare answer from one set of bitsets.
+        """
+        matcher = cls(
+            data["Features"],
+            data["Limitations"],
+            data["SupportLevels"],
+            data["Relationships"]["Upgrades"],
+            version,
+            comparison=comparison,
+        )
+        if previous is not None:
+            with previous._lock:
+                matcher.matched = dict(previous.matched)
+                matcher.total = previous.total
+        return matcher
+
+    def answer(self, question):
+        """Return a templated answer, or None if the question needs the LLM."""
+        intent, text = self._match(question)
+        with self._lock:
+            self.total += 1
+            if text is not None:
+                self.matched[intent] = self.matched.get(intent, 0) + 1
+        return text
+
+    def _match(self, question):
+        if OPEN_ENDED_RE.search(question):
+            return None, None
+
+        # Item names may contain tier words ("Basic Geometry Handling"), so find them first
+        items = [self._items[m.lower()] for m in self._item_re.findall(question)] if self._item_re else []
+        remainder = self._item_re.sub(" ", question) if self._item_re else question
+        if NEGATION_RE.search(remainder):
+            return None, None
+        tiers = []
+        for m in self._tier_re.findall(remainder) if self._tier_re else []:
+            tier = self._tier_names[m.lower()]
+            if tier not in tiers:
+                tiers.append(tier)
+        intents = {k for k, r in self._intent_res.items() if r.search(remainder)}
+
+        if items and not tiers:
+            return "which_tiers", self._answer_item(items[0])
+        if len(items) == 1 and len(tiers) == 1:
+            return "membership", self._answer_item_in_tier(items[0], tiers[0])
+        if not tiers:
+            return None, None
+
+        if "gains" in intents:
+            if len(tiers) != 2:
+                return None, None
+            # "what do I get" is a gains phrase here, not a request for the feature list
+            asked = self._intent_res["gains"].sub(" ", remainder)
+            facets = [f for f in FACET_TITLES if self._intent_res[f].search(asked)]
+            src, dst = self._direction(remainder, tiers[0], tiers[1])
+            return "gains", self._answer_gains(src, dst, facets or list(FACET_TITLES))
+
+        if "upgrades" in intents and "compare" not in intents:
+            if len(tiers) == 2:
+                return "upgrades", self._answer_upgrade_path(*self._direction(remainder, tiers[0], tiers[1]))
+            if len(tiers) == 1:
+                return "upgrades", self._answer_upgrades(tiers[0])
+            return None, None
+
+        facets = [f for f in FACET_TITLES if f in intents]
+        if len(tiers) >= 2 and ("compare" in intents or facets):
+            return "compare", self._answer_compare(tiers, facets or list(FACET_TITLES))
+        if len(tiers) == 1 and len(facets) == 1:
+            return facets[0], self._answer_facet(tiers[0], facets[0])
+        return None, None
+
+    def _answer_facet(self, tier, facet):
+        title = FACET_TITLES[facet]
+        own = self.facets[facet].get(tier, [])
+        inherited = []
+        if facet in INHERITED_FACETS:
+            own_set = set(own)
+            inherited = [i for i in self.comparison.items(tier, facet) if i not in own_set]
+        if not own and not inherited:
+            return f"The {tier} tier has no {title} listed."
+        if not own:
+            return f"The {tier} tier has these {title}, all from the tiers below it:\n\n{_bullets(inherited)}"
+        text = f"The {tier} tier has these {title}:\n\n{_bullets(own)}"
+        if inherited:
+            text += f"\n\nPlus everything from the tiers below it:\n\n{_bullets(inherited)}"
+        return text
+
+    def _direction(self, text, a, b):
+        """(source, target) of an upgrade between two mentioned tiers."""
+        m = self._from_re.search(text)
+        if m and self._tier_names[m.group(1).lower()] == b:
+            return b, a
+        m = self._to_re.search(text)
+        if m and self._tier_names[m.group(1).lower()] == a:
+            return b, a
+        return a, b
+
+    def _answer_upgrades(self, tier):
+        targets = self.upgrades.get(tier, [])
+        if not targets:
+            return f"The {tier} tier is already the highest tier; there is nothing to upgrade to."
+        return f"You can upgrade from the {tier} tier to: {', '.join(targets)}."
+
+    def _answer_upgrade_path(self, src, dst):
+        if dst in self.upgrades.get(src, []):
+            return f"Yes, you can upgrade directly from the {src} tier to the {dst} tier."
+        if src in self.upgrades.get(dst, []):
+            return f"No. {dst} is below {src}; upgrades go from {dst} to {src}, not the other way round."
+        return f"There is no direct upgrade path from the {src} tier to the {dst} tier."
+
+    def _answer_gains(self, src, dst, facets):
+        if dst not in reachable(self.upgrades, src):
+            return self._answer_upgrade_path(src, dst)
+        diff = self.comparison.diff(src, dst, include_shared=False)
+        sections = []
+        for facet in facets:
+            if facet == "limitations":
+                for title, items in (("Limitations lifted", diff["losses"][facet]),
+                                     ("Limitations that apply instead", diff["gains"][facet])):
+                    if items:
+                        sections.append(f"{title}:\n\n{_bullets(items)}")
+            elif diff["gains"][facet]:
+                sections.append(f"New {FACET_TITLES[facet]}:\n\n{_bullets(diff['gains'][facet])}")
+        if not sections:
+            names = " or ".join(FACET_TITLES[f] for f in facets)
+            return f"Upgrading from the {src} tier to the {dst} tier doesn't change your {names}."
+        return f"Upgrading from the {src} tier to the {dst} tier gives you:\n\n" + "\n\n".join(sections)
+
+    def _answer_compare(self, tiers, facets):
+        if len(tiers) == 2:
+            return self._answer_difference(tiers[0], tiers[1], facets)
+        sections = []
+        for facet in facets:
+            lines = [f"{FACET_TITLES[facet].capitalize()}:"]
+            for tier in tiers:
+                items = self.comparison.items(tier, facet)
+                lines.append(f"{tier}: {', '.join(items) if items else 'none'}")
+            sections.append("\n".join(lines))
+        names = ", ".join(tiers[:-1]) + f" and {tiers[-1]}"
+        return f"Comparison of {names}:\n\n" + "\n\n".join(sections)
+
+    def _answer_difference(self, a, b, facets):
+        diff = self.comparison.diff(a, b)
+        sections = []
+        for facet in facets:
+            title = FACET_TITLES[facet]
+            lines = [f"{title.capitalize()}:"]
+            for label, items in ((f"Only in {b}", diff["gains"][facet]),
+                                 (f"Only in {a}", diff["losses"][facet]),
+                                 ("Both", diff["shared"][facet])):
+                if items:
+                    lines.append(f"{label}: {', '.join(items)}")
+            if len(lines) == 1:
+                lines.append(f"Neither tier has {title} listed.")
+            sections.append("\n".join(lines))
+        return f"Comparison of {a} and {b}:\n\n" + "\n\n".join(sections)
+
+    def _answer_item(self, item):
+        facet, name, _ = item
+        verb = {"features": "include", "limitations": "have the limitation", "support": "offer"}[facet]
+        return f"These tiers {verb} {name}: {', '.join(self.comparison.holders(facet, name))}."
+
+    def _answer_item_in_tier(self, item, tier):
+        facet, name, own_tiers = item
+        noun = {"features": "feature", "limitations": "limitation", "support": "support option"}[facet]
+        if self.comparison.has(tier, facet, name):
+            if tier in own_tiers:
+                return f"Yes, the {tier} tier has the {noun} {name}."
+            return f"Yes, the {tier} tier has the {noun} {name}, included from {', '.join(own_tiers)}."
+        holders = self.comparison.holders(facet, name)
+        return f"No, the {tier} tier doesn't have the {noun} {name}; it is part of: {', '.join(holders)}."
+
+    def stats(self):
+        with self._lock:
+            matched = sum(self.matched.values())
+            return {
+                "questions": self.total,
+                "answered_without_llm": matched,
+                "bypass_rate": matched / self.total if self.total else 0.0,
+                "by_intent": dict(self.matched),
+            }
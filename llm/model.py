@@ -25,13 +25,15 @@
 # llm/model.py
 from llama_cpp import Llama
 
-def load_llm():
-    model_path = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+DEFAULT_MODEL_PATH = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+
+def load_llm(model_path=DEFAULT_MODEL_PATH, n_ctx=2048, n_threads=4, **kwargs):
     llm = Llama(
         model_path=model_path,
-        n_ctx=2048,
-        n_threads=4,
+        n_ctx=n_ctx,
+        n_threads=n_threads,
         verbose=False,
-        log_level="error"
+        log_level="error",
+        **kwargs
     )
     return llm
@@ -0,0 +1,292 @@
+# llm/prefix_cache.py
+"""
+Reuse the evaluated KV state of the fixed system-prompt prefix.
+
+The prefix is evaluated once per distinct prefix text and saved with
+Llama.save_state(); a new graph snapshot with the same prefix reuses it. Before each request the state is restored if the model
+no longer holds it, and llama_cpp's longest-common-prefix check then only
+evaluates the question and generates the answer.
+
+Measure the saving on a real model with:
+
+    python -m llm.prefix_cache
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED, CONVERSATION_KV_STATE_BUDGET_BYTES
+from metrics import LLM_STAGE_SECONDS, record_completion
+
+
+class PrefixCachedModel:
+    """Callable drop-in for a Llama instance that keeps one prompt prefix warm.
+
+    `prefix_source()` returns the prefix text; it is re-evaluated only when
+    that text changes. Each instance wraps exactly one model and, like
+    the model itself, must only be used by one thread at a time.
+    """
+
+    def __init__(self, model, prefix_source):
+        self.model = model
+        self.prefix_source = prefix_source
+        self.key = None
+        self.prefix = None
+        self.tokens = []
+        self.state = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "builds": 0,
+            "build_seconds": 0.0,
+            "restores": 0,
+            "prefix_tokens": 0,
+            "warm": {"requests": 0, "ttft_seconds_total": 0.0, "streams": 0},
+            "cold": {"requests": 0, "ttft_seconds_total": 0.0, "streams": 0},
+        }
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __call__(self, prompt, stream=False, **kwargs):
+        mode = "warm" if self.prepare(prompt) else "cold"
+        start = time.perf_counter()
+        prompt_tokens = self._eval_prompt(prompt) if METRICS_ENABLED else 0
+        generation_start = time.perf_counter()
+        result = self.model(prompt, stream=stream, **kwargs)
+        with self._lock:
+            self._stats[mode]["requests"] += 1
+        if stream:
+            return self._timed_stream(result, mode, start, prompt_tokens, generation_start)
+        usage = result.get("usage") or {}
+        record_completion(prompt_tokens, usage.get("completion_tokens", 0), time.perf_counter() - generation_start)
+        return result
+
+    def prepare(self, prompt):
+        """Make sure the model holds the evaluated prefix; False if the prompt doesn't use it."""
+        prefix = self.prefix_source()
+        if not prompt.startswith(prefix):
+            return False
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        if key != self.key:
+            self._build(key, prefix)
+        elif not self._holds_prefix():
+            self.model.load_state(self.state)
+            with self._lock:
+                self._stats["restores"] += 1
+        return True
+
+    def _eval_prompt(self, prompt):
+        """Evaluate the prompt before the completion call so its cost is measured on its own.
+
+        The completion then finds every prompt token already in the KV cache and
+        only re-evaluates the last one, so this adds no real work. Returns the
+        number of prompt tokens.
+        """
+        tokens = self.model.tokenize(prompt.encode("utf-8"), special=True)
+        input_ids = self.model.input_ids
+        limit = min(self.model.n_tokens, len(tokens) - 1)
+        shared = 0
+        while shared < limit and input_ids[shared] == tokens[shared]:
+            shared += 1
+        with LLM_STAGE_SECONDS.time(stage="prompt_eval"):
+            self.model.n_tokens = shared
+            self.model.eval(tokens[shared:])
+        return len(tokens)
+
+    def _holds_prefix(self):
+        # The previous request usually started with the same prefix, in which
+        # case its KV entries are still valid and nothing needs restoring
+        n = len(self.tokens)
+        return self.model.n_tokens >= n and list(self.model.input_ids[:n]) == self.tokens
+
+    def _build(self, key, prefix):
+        start = time.perf_counter()
+        # Tokenize exactly the way create_completion tokenizes the full prompt
+        self.tokens = self.model.tokenize(prefix.encode("utf-8"), special=True)
+        self.model.reset()
+        self.model.eval(self.tokens)
+        self.state = self.model.save_state()
+        self.key = key
+        self.prefix = prefix
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["build_seconds"] += time.perf_counter() - start
+            self._stats["prefix_tokens"] = len(self.tokens)
+
+    def _timed_stream(self, chunks, mode, start, prompt_tokens, generation_start):
+        completion_tokens = 0
+        try:
+            for chunk in chunks:
+                if completion_tokens == 0:
+                    # Time to first token is dominated by prompt evaluation
+                    with self._lock:
+                        self._stats[mode]["streams"] += 1
+                        self._stats[mode]["ttft_seconds_total"] += time.perf_counter() - start
+                # llama_cpp streams one token per chunk
+                completion_tokens += 1
+                yield chunk
+        finally:
+            chunks.close()
+            record_completion(prompt_tokens, completion_tokens, time.perf_counter() - generation_start)
+
+    def stats(self):
+        with self._lock:
+            stats = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._stats.items()}
+        for mode in ("warm", "cold"):
+            streams = stats[mode]["streams"]
+            stats[mode]["ttft_seconds_avg"] = stats[mode]["ttft_seconds_total"] / streams if streams else None
+        return stats
+
+
+def merge_stats(models):
+    """Combine stats() from several PrefixCachedModel workers."""
+    merged = None
+    for model in models:
+        stats = model.stats()
+        if merged is None:
+            merged = stats
+            continue
+        for key in ("builds", "build_seconds", "restores"):
+            merged[key] += stats[key]
+        merged["prefix_tokens"] = stats["prefix_tokens"]
+        for mode in ("warm", "cold"):
+            for key in ("requests", "ttft_seconds_total", "streams"):
+                merged[mode][key] += stats[mode][key]
+    if merged is not None:
+        for mode in ("warm", "cold"):
+            streams = merged[mode]["streams"]
+            merged[mode]["ttft_seconds_avg"] = merged[mode]["ttft_seconds_total"] / streams if streams else None
+    return merged
+
+
+class SharedModel:
+    """One model lent to many chat sessions, one at a time.
+
+    The KV cache holds whichever conversation ran last. When another session
+    takes the model, the outgoing session's state is saved into an LRU
+    bounded by `budget` bytes in total, and restored when that session
+    comes back, so prefix reuse still covers its history. A session that
+    keeps the model pays no copy at all.
+    """
+
+    def __init__(self, llm, budget=CONVERSATION_KV_STATE_BUDGET_BYTES):
+        self.llm = llm
+        self.budget = budget
+        self.owner = None
+        self.states = OrderedDict()  # session id -> llama_cpp LlamaState, least recently used first
+        self.state_bytes = 0
+        # Learned from the first saved state, so oversized ones are skipped before copying
+        self.bytes_per_token = None
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.restores = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    @contextmanager
+    def lend(self, session_id):
+        """Hold the model for `session_id`, with that session's KV state loaded if it was kept."""
+        with self._lock:
+            if self.owner != session_id:
+                # Taken out first, so saving the outgoing session can't evict it
+                state = self.states.pop(session_id, None)
+                if state is not None:
+                    self.state_bytes -= state.llama_state_size
+                self._save_owner()
+                if state is not None:
+                    self.llm.model.load_state(state)
+                    self.restores += 1
+                self.owner = session_id
+            yield self.llm
+
+    def forget(self, session_id):
+        """Drop a session's saved state, e.g. when its conversation is cleared."""
+        with self._lock:
+            state = self.states.pop(session_id, None)
+            if state is not None:
+                self.state_bytes -= state.llama_state_size
+
+    def _save_owner(self):
+        model = self.llm.model
+        if self.owner is None or not model.n_tokens:
+            return
+        if self.bytes_per_token is not None and self.bytes_per_token * model.n_tokens > self.budget:
+            self.skipped += 1
+            return
+        state = model.save_state()
+        size = state.llama_state_size
+        self.bytes_per_token = size / max(1, state.n_tokens)
+        if size > self.budget:
+            self.skipped += 1
+            return
+        while self.states and self.state_bytes + size > self.budget:
+            _, old = self.states.popitem(last=False)
+            self.state_bytes -= old.llama_state_size
+            self.evictions += 1
+        self.states[self.owner] = state
+        self.state_bytes += size
+        self.saves += 1
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self.states), "bytes": self.state_bytes, "budget": self.budget,
+                    "saves": self.saves, "restores": self.restores, "skipped": self.skipped,
+                    "evictions": self.evictions}
+
+
+def measure_prompt_eval(model, prefix, questions):
+    """Time prompt evaluation of prefix + question with and without the cached prefix.
+
+    Returns average milliseconds for a cold evaluation of the whole prompt and
+    for restoring the prefix state and evaluating only the question.
+    """
+    prefix_tokens = model.tokenize(prefix.encode("utf-8"), special=True)
+    model.reset()
+    model.eval(prefix_tokens)
+    state = model.save_state()
+
+    cold, warm = [], []
+    for question in questions:
+        tokens = model.tokenize((prefix + question).encode("utf-8"), special=True)
+        # Only the tail past the shared prefix needs evaluating when warm
+        shared = 0
+        while shared < min(len(tokens), len(prefix_tokens)) and tokens[shared] == prefix_tokens[shared]:
+            shared += 1
+
+        model.reset()
+        start = time.perf_counter()
+        model.eval(tokens)
+        cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        model.load_state(state)
+        model.n_tokens = shared
+        model.eval(tokens[shared:])
+        warm.append(time.perf_counter() - start)
+
+    return {
+        "prefix_tokens": len(prefix_tokens),
+        "questions": len(questions),
+        "cold_ms_avg": 1000 * sum(cold) / len(cold),
+        "warm_ms_avg": 1000 * sum(warm) / len(warm),
+    }
+
+
+if __name__ == "__main__":
+    from llm.model import load_llm
+    from llm.answer_generator import build_prompt_prefix, build_query_prompt
+
+    questions = [
+        "What does the Premium tier include?",
+        "Can I upgrade from Basic to Premium?",
+        "What are the limitations of the Standard tier?",
+    ]
+    prefix = build_prompt_prefix()
+    suffixes = [build_query_prompt(q)[len(prefix):] for q in questions]
+    report = measure_prompt_eval(load_llm(), prefix, suffixes)
+    print(f"Prefix tokens: {report['prefix_tokens']}")
+    print(f"Prompt eval without prefix cache: {report['cold_ms_avg']:.0f} ms")
+    print(f"Prompt eval with prefix cache:    {report['warm_ms_avg']:.0f} ms")
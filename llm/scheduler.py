@@ -0,0 +1,324 @@
+# llm/scheduler.py
+"""
+Bounded-queue inference scheduler in front of one or more llama_cpp models.
+
+Each worker thread owns its own model instance, so a model is never used by
+two requests at once. llama_cpp releases the GIL while evaluating, so N
+workers with cpu_count // N threads each run truly in parallel, and mmap'd
+weights are shared between instances instead of being loaded N times.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from config import INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, INFERENCE_TIMEOUT, INFERENCE_SHUTDOWN_TIMEOUT
+from metrics import LLM_STAGE_SECONDS
+
+
+class SchedulerBusy(Exception):
+    """The request queue is full; callers should retry later (HTTP 429)."""
+
+
+class SchedulerTimeout(Exception):
+    """The request was not picked up before its deadline (HTTP 503)."""
+
+
+class SchedulerNotReady(Exception):
+    """No model has finished loading yet (HTTP 503)."""
+
+
+class InferenceJob:
+    def __init__(self, prompt, kwargs, deadline, stream):
+        self.prompt = prompt
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.stream = stream
+        self.enqueued_at = time.monotonic()
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.tokens = queue.Queue() if stream else None
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.expired = False
+        self._lock = threading.Lock()
+
+    def try_start(self):
+        """Claim the job for a worker unless the caller already gave up on it."""
+        with self._lock:
+            if self.cancelled or self.expired:
+                return False
+            self.started.set()
+            return True
+
+    def cancel(self):
+        """Stop the job even if a worker is already running it (the caller went away).
+
+        Returns True if no worker had claimed it yet; such a job ends at once,
+        so a reader blocked waiting for it wakes up instead of sitting out
+        the deadline. The worker that dequeues it later just skips it.
+        """
+        with self._lock:
+            self.cancelled = True
+            if self.started.is_set():
+                return False
+            self.started.set()
+        self.finish()
+        return True
+
+    def expire(self):
+        """Give up on the job only if it is still queued; False if a worker claimed it."""
+        with self._lock:
+            if self.started.is_set():
+                return False
+            self.expired = True
+            return True
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        if self.stream:
+            self.tokens.put(None)
+        self.done.set()
+
+
+class TokenStream:
+    """Iterator over a streaming job's text chunks; close() cancels generation."""
+
+    def __init__(self, scheduler, job):
+        self._scheduler = scheduler
+        self._job = job
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._scheduler._wait_started(self._job)
+        text = self._job.tokens.get()
+        if text is None:
+            if self._job.error is not None:
+                raise self._job.error
+            raise StopIteration
+        return text
+
+    @property
+    def cancelled(self):
+        return self._job.cancelled
+
+    def close(self):
+        self._job.cancel()
+
+
+class InferenceScheduler:
+    def __init__(self, model_factory, workers=INFERENCE_WORKERS,
+                 max_queue=INFERENCE_QUEUE_SIZE, timeout=INFERENCE_TIMEOUT):
+        """`model_factory(n_threads)` builds one model instance per worker."""
+        self.model_factory = model_factory
+        self.workers = workers
+        self.timeout = timeout
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._ready = []
+        self._running = set()  # jobs a worker is executing, so shutdown can cancel them
+        self._loaded = 0
+        self._started_at = None
+        self.load_seconds = None  # until the first model was usable
+        self.load_errors = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "expired": 0,
+            "cancelled": 0,
+            "in_flight": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def start(self, wait=True):
+        """Start the worker threads; each loads its model in the background.
+
+        With wait=True, block until every worker has finished loading.
+        """
+        self._started_at = time.monotonic()
+        for i in range(self.workers):
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._worker, args=(ready,), name=f"inference-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+            self._ready.append(ready)
+        if wait:
+            for ready in self._ready:
+                ready.wait()
+        return self
+
+    @property
+    def state(self):
+        """'loading' until every worker has tried to load, then 'ready' or 'failed'."""
+        if not all(ready.is_set() for ready in self._ready):
+            return "loading"
+        return "ready" if self.available else "failed"
+
+    def submit(self, prompt, timeout=None, stream=False, **kwargs):
+        """Queue a completion request; raises SchedulerBusy if the queue is full."""
+        if not self.available:
+            raise SchedulerNotReady("No inference worker has loaded its model yet")
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        job = InferenceJob(prompt, kwargs, deadline, stream)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._count("rejected")
+            raise SchedulerBusy("Inference queue is full")
+        self._count("submitted")
+        return job
+
+    def generate(self, prompt, timeout=None, **kwargs):
+        """Run a completion and return the llama_cpp response dict."""
+        return self.result(self.submit(prompt, timeout=timeout, **kwargs))
+
+    def result(self, job):
+        """Block until a submitted job finishes and return its response dict."""
+        self._wait_started(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stream(self, prompt, timeout=None, **kwargs):
+        """Queue a streaming completion and return a TokenStream of text chunks."""
+        return TokenStream(self, self.submit(prompt, timeout=timeout, stream=True, **kwargs))
+
+    def _wait_started(self, job):
+        if job.started.is_set():
+            return
+        if not job.started.wait(max(0.0, job.deadline - time.monotonic())):
+            # A worker may claim it right at the deadline; that job just runs
+            if job.expire():
+                self._count("expired")
+                raise SchedulerTimeout("Timed out waiting for an inference worker")
+
+    @property
+    def available(self):
+        """True once at least one worker has a loaded model."""
+        with self._lock:
+            return self._loaded > 0
+
+    def _worker(self, ready):
+        try:
+            model = self.model_factory(self.threads_per_worker)
+        except Exception as e:
+            print(f"Error loading model in {threading.current_thread().name}: {e}")
+            self.load_errors.append(e)
+            ready.set()
+            return
+        with self._lock:
+            self._loaded += 1
+            if self.load_seconds is None:
+                self.load_seconds = time.monotonic() - self._started_at
+        ready.set()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.try_start():
+                # Expired jobs were counted when their caller gave up on them
+                if not job.expired:
+                    self._count("cancelled")
+                continue
+
+            wait = time.monotonic() - job.enqueued_at
+            LLM_STAGE_SECONDS.observe(wait, stage="queue_wait")
+            with self._lock:
+                self._running.add(job)
+                self._stats["in_flight"] += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            try:
+                if job.stream and not self._run_stream(model, job):
+                    self._count("cancelled")
+                else:
+                    if not job.stream:
+                        job.finish(result=model(job.prompt, **job.kwargs))
+                    self._count("completed")
+            except Exception as e:
+                self._count("failed")
+                job.finish(error=e)
+            finally:
+                with self._lock:
+                    self._running.discard(job)
+                    self._stats["in_flight"] -= 1
+
+    def _run_stream(self, model, job):
+        """Forward chunks to the job's token queue; returns False if it was cancelled."""
+        chunks = model(job.prompt, stream=True, **job.kwargs)
+        completed = True
+        try:
+            for chunk in chunks:
+                if job.cancelled:
+                    # Client went away: stop generating and free the worker
+                    completed = False
+                    break
+                job.tokens.put(chunk["choices"][0]["text"])
+        finally:
+            chunks.close()
+        job.finish()
+        return completed
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        started = stats["completed"] + stats["failed"] + stats["in_flight"]
+        stats.update({
+            "workers": self.workers,
+            "workers_loaded": self._loaded,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "threads_per_worker": self.threads_per_worker,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "wait_seconds_avg": stats["wait_seconds_total"] / started if started else 0.0,
+        })
+        return stats
+
+    def shutdown(self, timeout=INFERENCE_SHUTDOWN_TIMEOUT):
+        """Stop the workers, waiting at most `timeout` seconds; True if they all exited.
+
+        Queued jobs are cancelled and in-flight streams stop at their next
+        token. A plain completion can't be interrupted, so its (daemon) worker
+        is left to finish on its own rather than holding up shutdown.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and job.cancel():
+                self._count("cancelled")
+        with self._lock:
+            running = list(self._running)
+        for job in running:
+            job.cancel()
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        alive = [thread.name for thread in self._threads if thread.is_alive()]
+        if alive:
+            print(f"Inference workers still busy after {timeout}s shutdown: {', '.join(alive)}")
+        return not alive
@@ -0,0 +1,225 @@
+# metrics.py
+"""
+Minimal in-process metrics exported in the Prometheus text format.
+
+Recording is a lock and a bisect per observation, and stats collectors
+(cache and queue stats) are only evaluated when /api/metrics is scraped.
+With METRICS_ENABLED = False every timer and observation is a no-op.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from config import METRICS_ENABLED
+
+# Seconds; spans sub-millisecond graph lookups up to minute-long generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds."""
+        if not METRICS_ENABLED:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, label=None):
+        """Decorator timing every call; `label` names the label set to the function name."""
+        def decorator(f):
+            labels = {label: f.__name__} if label else {}
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not METRICS_ENABLED:
+                    return f(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+            return wrapper
+        return decorator
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = _label_text(self.labelnames + ("le",), key + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class StatsCollector:
+    """Exports the numeric values of a stats() dict as gauges, read at scrape time.
+
+    Nested dicts are flattened one level (`prefix_warm_requests`).
+    """
+
+    def __init__(self, prefix, help, fn):
+        self.prefix = prefix
+        self.help = help
+        self.fn = fn
+        _register(self)
+
+    def render(self):
+        try:
+            stats = self.fn()
+        except Exception as e:
+            print(f"Metrics collector {self.prefix} failed: {e}")
+            return []
+        lines = []
+        for name, value in _flatten(self.prefix, stats or {}):
+            lines.append(f"# HELP {name} {self.help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+        return lines
+
+
+def _flatten(prefix, stats, depth=0):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict) and depth == 0:
+            yield from _flatten(name, value, depth + 1)
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Metrics shared across modules
+NEO4J_QUERY_SECONDS = Histogram(
+    "simulia_neo4j_query_seconds", "Neo4jConnector.run_query latency"
+)
+QUERY_ENGINE_SECONDS = Histogram(
+    "simulia_query_engine_seconds", "QueryEngine lookup latency by method", ["method"]
+)
+LLM_STAGE_SECONDS = Histogram(
+    "simulia_llm_stage_seconds",
+    "Time per answer stage (prompt_build, queue_wait, prompt_eval, generation)",
+    ["stage"],
+)
+LLM_PROMPT_TOKENS = Counter(
+    "simulia_llm_prompt_tokens_total", "Prompt tokens sent to the LLM"
+)
+LLM_COMPLETION_TOKENS = Counter(
+    "simulia_llm_completion_tokens_total", "Tokens generated by the LLM"
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "simulia_llm_tokens_per_second", "Generation speed per request",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200),
+)
+GENERATE_ANSWER_SECONDS = Histogram(
+    "simulia_generate_answer_seconds", "llm.answer_generator.generate_answer latency"
+)
+ANSWER_SECONDS = Histogram(
+    "simulia_answer_seconds", "get_answer_for_query latency by where the answer came from", ["source"]
+)
+
+
+def record_completion(prompt_tokens, completion_tokens, generation_seconds):
+    """Record token counts and speed of one LLM completion."""
+    LLM_PROMPT_TOKENS.inc(prompt_tokens)
+    LLM_COMPLETION_TOKENS.inc(completion_tokens)
+    LLM_STAGE_SECONDS.observe(generation_seconds, stage="generation")
+    if generation_seconds > 0 and completion_tokens:
+        LLM_TOKENS_PER_SECOND.observe(completion_tokens / generation_seconds)
@@ -1,10 +1,30 @@
 // src/components/GraphVisualizer.js
-import React, { useRef, useEffect } from 'react';
+import React, { useRef, useEffect, useMemo } from 'react';
 import ForceGraph3D from 'react-force-graph-3d';
 
+// Server layouts are in ideal-edge-length units; this many pixels per unit
+const LAYOUT_SCALE = 30;
+
 export const GraphVisualizer = ({ graphData, activeTier }) => {
   const fgRef = useRef();
 
+  // Nodes laid out by the server (/api/graph?layout=3d) are pinned, so no physics runs
+  const hasLayout = graphData.nodes.length > 0 && graphData.nodes.every(node => node.x !== undefined);
+  const displayData = useMemo(() => {
+    if (!hasLayout) {
+      return graphData;
+    }
+    return {
+      nodes: graphData.nodes.map(node => ({
+        ...node,
+        fx: node.x * LAYOUT_SCALE,
+        fy: node.y * LAYOUT_SCALE,
+        fz: (node.z || 0) * LAYOUT_SCALE,
+      })),
+      links: graphData.links,
+    };
+  }, [graphData, hasLayout]);
+
   useEffect(() => {
     // Highlight nodes related to activeTier
     if (fgRef.current && activeTier) {
@@ -88,7 +108,8 @@ export const GraphVisualizer = ({ graphData, activeTier }) => {
       ) : (
         <ForceGraph3D
           ref={fgRef}
-          graphData={graphData}
+          graphData={displayData}
+          cooldownTicks={hasLayout ? 0 : Infinity}
           nodeLabel="label"
           nodeColor={node => node.color}
           nodeRelSize={6}
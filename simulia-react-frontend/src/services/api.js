@@ -193,8 +193,10 @@ const filterGraphByTier = (tier) => {
 // Function to fetch graph data from backend with fallback to mock data
 export const fetchGraphData = async (tier = null) => {
   try {
-    // Use the full URL
-    const endpoint = tier ? `${API_BASE_URL}/graph?tier=${tier}` : `${API_BASE_URL}/graph`;
+    // Use the full URL; layout=3d returns precomputed node positions
+    const endpoint = tier
+      ? `${API_BASE_URL}/graph?tier=${encodeURIComponent(tier)}&layout=3d`
+      : `${API_BASE_URL}/graph?layout=3d`;
     
     const response = await fetch(endpoint);
     
@@ -0,0 +1,48 @@
+# test_asgi.py
+
+import asyncio
+
+import pytest
+
+quart = pytest.importorskip("quart")
+
+from app import api
+from app.asgi import app
+from test_streaming import QUESTION, with_stub_llm
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def request(method, path, **kwargs):
+    # test_app runs the before/after_serving hooks like a real server
+    async with app.test_app() as test_app:
+        response = await getattr(test_app.test_client(), method)(path, **kwargs)
+        return response, await response.get_data()
+
+def test_graph_matches_the_flask_app():
+    flask_response = api.app.test_client().get('/api/graph')
+    response, body = run(request("get", "/api/graph"))
+    assert response.status_code == 200
+    assert body == flask_response.data
+    assert response.headers["ETag"] == flask_response.headers["ETag"]
+    assert response.headers["Access-Control-Allow-Origin"] == "*"
+
+    response, body = run(request("get", "/api/graph", headers={"If-None-Match": flask_response.headers["ETag"]}))
+    assert response.status_code == 304 and body == b""
+
+    response, _ = run(request("get", "/api/graph?depth=x"))
+    assert response.status_code == 400
+
+def test_query_answers_through_the_scheduler():
+    def test(scheduler):
+        response, _ = run(request("post", "/api/query", json={"query": QUESTION}))
+        assert response.status_code == 200
+        answer = run(response.get_json())["answer"]
+        assert answer and scheduler.stats()["completed"] == 1
+
+        response, _ = run(request("post", "/api/query", json={}))
+        assert response.status_code == 400
+    with_stub_llm(test, token_latency=0.0)
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q", "-rs"]))
@@ -0,0 +1,203 @@
+# test_backends.py
+
+import json
+import re
+import time
+
+import pytest
+
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, GRAPH_ENTITIES_PATH, GRAPH_RELATIONSHIPS_PATH
+from graph.neo4j_connector import Neo4jConnector, close_shared_drivers, get_shared_driver
+from graph.query_engine import QueryEngine, Neo4jBackend, FEATURES_AFTER_UPGRADE_QUERY, UPGRADE_GAINS_QUERY
+from graph.memory_backend import InMemoryBackend
+from graph.closure import CLOSURE_QUERY, UpgradeGains, catalog_tiers, closure_rows
+from graph.build_graph import BULK_QUERIES, build_bulk_rows
+from graph.synthetic_catalog import generate_catalog
+
+BASIC_FEATURES = ["Single-Physics Simulation", "Basic Geometry Handling"]
+STANDARD_FEATURES = ["Multi-Physics Simulation", "Parametric Sweeps", "Advanced Meshing Toolkit"]
+PREMIUM_FEATURES = ["High-Performance Computing Integration", "Co-Simulation with External Tools",
+                    "Full Geometry Optimization Suite"]
+BASIC_SUPPORT = ["Email Support (Next-Business-Day Response)"]
+STANDARD_SUPPORT = ["Email Support (Business Hours)", "Live Chat (Business Hours)"]
+PREMIUM_SUPPORT = ["Phone Support (24/7)", "Live Chat (24/7)", "Dedicated Engineer"]
+
+# Worked out by hand from data/*.json, independently of graph.closure
+EXPECTED_CLOSURE = {
+    "Basic": {"upgrade_closure": ["Standard", "Premium"], "included_tiers": ["Basic"]},
+    "Standard": {"upgrade_closure": ["Premium"], "included_tiers": ["Standard", "Basic"]},
+    "Premium": {"upgrade_closure": [], "included_tiers": ["Premium", "Standard", "Basic"]},
+}
+EXPECTED_FEATURES = {
+    "Basic": BASIC_FEATURES,
+    "Standard": STANDARD_FEATURES + BASIC_FEATURES,
+    "Premium": PREMIUM_FEATURES + STANDARD_FEATURES + BASIC_FEATURES,
+}
+EXPECTED_GAINS = {
+    ("Basic", "Premium"): UpgradeGains(
+        features=STANDARD_FEATURES + PREMIUM_FEATURES,
+        support=STANDARD_SUPPORT + PREMIUM_SUPPORT,
+        lifted_limitations=["Max 500k Degrees of Freedom", "No HPC Cluster Access"],
+    ),
+    ("Basic", "Standard"): UpgradeGains(
+        features=STANDARD_FEATURES,
+        support=STANDARD_SUPPORT,
+        lifted_limitations=["Max 500k Degrees of Freedom", "No HPC Cluster Access"],
+    ),
+    ("Standard", "Premium"): UpgradeGains(
+        features=PREMIUM_FEATURES,
+        support=PREMIUM_SUPPORT,
+        lifted_limitations=["Max 2 Million Degrees of Freedom", "Limited HPC Nodes (Up to 2)"],
+    ),
+    # Not upgrades
+    ("Premium", "Basic"): UpgradeGains(),
+    ("Standard", "Standard"): UpgradeGains(),
+}
+
+def neo4j_connector():
+    """The live Neo4j graph (built from the JSON below), or None if it isn't reachable.
+
+    There is deliberately no fallback: the fakes share graph.closure with
+    InMemoryBackend, so comparing against them would prove nothing about the
+    Cypher queries.
+    """
+    try:
+        connector = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+        if connector.health_check():
+            print("Comparing against Neo4j at", NEO4J_URI)
+            return connector
+    except Exception as e:
+        print("Neo4j unavailable:", e)
+    return None
+
+def normalize(result):
+    """Order-insensitive form of a lookup result (list or UpgradeGains)."""
+    if isinstance(result, UpgradeGains):
+        return {k: sorted(v) for k, v in vars(result).items()}
+    return sorted(result or [])
+
+def load_catalog():
+    with open(GRAPH_ENTITIES_PATH) as f:
+        entities = json.load(f)
+    with open(GRAPH_RELATIONSHIPS_PATH) as f:
+        relationships = json.load(f)
+    return entities, relationships
+
+def test_backends_equivalent():
+    connector = neo4j_connector()
+    if connector is None:
+        pytest.skip("Neo4j is not reachable; there is no Cypher to compare the in-memory backend against")
+    entities, relationships = load_catalog()
+
+    memory = QueryEngine(backend=InMemoryBackend(entities, relationships))
+    neo4j = QueryEngine(backend=Neo4jBackend(connector))
+
+    tiers = neo4j.get_tier_names()
+    assert memory.get_tier_names() == tiers, (memory.get_tier_names(), tiers)
+    probe = tiers + ["NonExistent"]
+
+    lookups = [(name, (tier,)) for tier in probe for name in (
+        "get_tier_features", "get_tier_limitations", "get_tier_support", "get_upgradable_tiers")]
+    lookups += [(name, (a, b)) for a in probe for b in probe
+                for name in ("get_features_after_upgrade", "get_upgrade_gains")]
+
+    mismatches = 0
+    for name, args in lookups:
+        expected = getattr(neo4j, name)(*args)
+        actual = getattr(memory, name)(*args)
+        if normalize(expected) != normalize(actual):
+            mismatches += 1
+            print(f"MISMATCH {name}{args}: neo4j={expected} memory={actual}")
+
+    for tier, profile in neo4j.get_tier_profiles(probe).items():
+        other = memory.get_tier_profile(tier)
+        for facet in ("features", "limitations", "support", "upgrades"):
+            if sorted(getattr(profile, facet)) != sorted(getattr(other, facet)):
+                mismatches += 1
+                print(f"MISMATCH profile {tier}.{facet}: neo4j={getattr(profile, facet)} memory={getattr(other, facet)}")
+
+    print(f"{len(lookups)} lookups compared, {mismatches} mismatches")
+    assert mismatches == 0
+
+    for label, engine in (("neo4j", neo4j), ("memory", memory)):
+        start = time.perf_counter()
+        for name, args in lookups:
+            getattr(engine, name)(*args)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>6}: {elapsed / len(lookups) * 1e6:9.1f} µs per lookup")
+
+    neo4j.close()
+    memory.close()
+
+def test_closure_rows_for_sample_catalog():
+    entities, relationships = load_catalog()
+    bulk_rows = build_bulk_rows(entities, relationships)["closure"]
+    # sync_graph and the row-by-row loader write closure_rows() directly
+    assert bulk_rows == closure_rows(catalog_tiers(entities, relationships))
+    written = {row["name"]: row for row in bulk_rows}
+    assert sorted(written) == sorted(EXPECTED_CLOSURE)
+    for tier, expected in EXPECTED_CLOSURE.items():
+        assert written[tier]["upgrade_closure"] == expected["upgrade_closure"], tier
+        # The tier itself first; Basic and Standard are both one upgrade below Premium
+        included = written[tier]["included_tiers"]
+        assert included[0] == tier and sorted(included) == sorted(expected["included_tiers"]), tier
+
+def test_closure_size_grows_with_tiers_not_items():
+    entities, relationships = generate_catalog(100_000)
+    tiers = len(entities["SubscriptionTiers"])
+    items = sum(map(len, entities["Features"].values())) + sum(map(len, entities["SupportLevels"].values()))
+    rows = closure_rows(catalog_tiers(entities, relationships))
+    entries = sum(len(v) for row in rows for v in row.values() if isinstance(v, list))
+    # A chain of tiers: each is in its own included list and in every lower tier's lists
+    assert entries <= tiers * tiers, (entries, tiers)
+    assert entries < items, (entries, items)
+
+    engine = QueryEngine(backend=InMemoryBackend(entities, relationships))
+    first, last = entities["SubscriptionTiers"][0], entities["SubscriptionTiers"][-1]
+    # Every tier is included by the last one, so it gains everything the first lacks
+    gains = engine.get_upgrade_gains(first, last)
+    features = sum(map(len, entities["Features"].values()))
+    assert len(gains.features) == features - len(entities["Features"][first])
+    assert len(engine.get_features_after_upgrade(first, last)) == features
+
+def test_upgrade_queries_read_written_properties():
+    # CLOSURE_QUERY: SET t.<property> = row.<key>
+    assignments = dict(re.findall(r"\bt\.(\w+)\s*=\s*row\.(\w+)", CLOSURE_QUERY))
+    assert assignments, CLOSURE_QUERY
+    entities, relationships = load_catalog()
+    for row in build_bulk_rows(entities, relationships)["closure"]:
+        assert set(assignments.values()) <= set(row), row
+    # Tier limitations come from the tiers stage
+    assert "limitations" in BULK_QUERIES["tiers"]
+    written = set(assignments) | {"name", "limitations"}
+    for query in (FEATURES_AFTER_UPGRADE_QUERY, UPGRADE_GAINS_QUERY):
+        read = set(re.findall(r"\b[ab]\.(\w+)", query))
+        assert read <= written, (read - written, query)
+
+def test_upgrade_lookups_on_sample_catalog():
+    """Expected gains through every backend available: the in-memory one, and Neo4j if reachable."""
+    entities, relationships = load_catalog()
+    engines = {"memory": QueryEngine(backend=InMemoryBackend(entities, relationships))}
+    connector = neo4j_connector()
+    if connector is not None:
+        engines["neo4j"] = QueryEngine(backend=Neo4jBackend(connector))
+    for label, engine in engines.items():
+        for (a, b), expected in EXPECTED_GAINS.items():
+            assert normalize(engine.get_upgrade_gains(a, b)) == normalize(expected), (label, a, b)
+            after = EXPECTED_FEATURES[b] if b in EXPECTED_CLOSURE[a]["upgrade_closure"] else []
+            assert normalize(engine.get_features_after_upgrade(a, b)) == normalize(after), (label, a, b)
+        engine.close()
+
+def test_shared_driver_pool_is_keyed_on_credentials():
+    # Drivers connect lazily, so no server is needed
+    driver = get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        assert get_shared_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD) is driver
+        # A wrong password must not borrow the pool the right one authenticated
+        assert get_shared_driver(NEO4J_URI, NEO4J_USER, "not-" + NEO4J_PASSWORD) is not driver
+    finally:
+        close_shared_drivers()
+
+if __name__ == "__main__":
+    # Through pytest, so a missing Neo4j shows up as a skip rather than a traceback
+    raise SystemExit(pytest.main([__file__, "-q", "-rs", "-s"]))
@@ -0,0 +1,108 @@
+# test_conversation_memory.py
+
+from types import SimpleNamespace
+
+from llm.conversation_memory import ConversationMemory, summarize_turn
+from llm.prefix_cache import SharedModel
+
+def words(text):
+    return len(text.split())
+
+def add_turns(memory, count, start=0):
+    for i in range(start, start + count):
+        memory.add_turn(f"question number {i}", f"Answer {i} is here. More detail follows.")
+
+def test_old_turns_are_summarized_within_budget():
+    memory = ConversationMemory(token_budget=100, summary_budget=30, count_tokens=words)
+    add_turns(memory, 8)
+    assert memory.compactions == 0 and len(memory.turns) == 8
+    add_turns(memory, 1, start=8)
+
+    assert memory.compactions == 1
+    assert len(memory) == 9
+    assert memory.tokens <= memory.token_budget
+    # Folded down to half of what verbatim turns may use, newest turns kept
+    assert memory._turn_tokens <= (100 - 30) // 2
+    assert [t.question for t in memory.turns] == [f"question number {i}" for i in range(9 - len(memory.turns), 9)]
+    # Summaries are capped too; the oldest ones go first
+    assert memory._summary_tokens <= 30
+    assert memory.dropped_summaries == memory.summarized_turns - len(memory.summaries) > 0
+    rendered = memory.render()
+    assert "Earlier:\n- Asked: question number" in rendered
+    assert "question number 0 " not in rendered
+    assert rendered.endswith("User: question number 8\nAssistant: Answer 8 is here. More detail follows.\n\n")
+
+def test_history_only_grows_at_its_end_between_compactions():
+    memory = ConversationMemory(token_budget=100, summary_budget=30, count_tokens=words)
+    assert memory.render() == ""
+    add_turns(memory, 2)
+    before = memory.render()
+    add_turns(memory, 1, start=2)
+    # The trailing blank line is the only part that moves
+    assert memory.render().startswith(before[:-1])
+
+    memory.clear()
+    assert memory.render() == "" and len(memory) == 0 and memory.count_tokens is words
+
+def test_summary_keeps_the_question_and_first_sentence():
+    line = summarize_turn("What does Premium add?", "It adds HPC integration. It also adds phone support.")
+    assert line == "- Asked: What does Premium add? Answer: It adds HPC integration.\n"
+
+    line = summarize_turn("word " * 100, "answer " * 100, max_tokens=10)
+    assert line.count("...") == 2 and len(line) < 60
+
+class FakeModel:
+    """Only what SharedModel touches: a token count and save/load of the KV state."""
+    def __init__(self):
+        self.n_tokens = 0
+        self.saved = 0
+
+    def save_state(self):
+        self.saved += 1
+        return SimpleNamespace(n_tokens=self.n_tokens, llama_state_size=100 * self.n_tokens)
+
+    def load_state(self, state):
+        self.n_tokens = state.n_tokens
+
+def test_shared_model_keeps_session_states_within_a_budget():
+    model = FakeModel()
+    shared = SharedModel(SimpleNamespace(model=model), budget=1000)
+
+    with shared.lend("a"):
+        model.n_tokens = 5
+    with shared.lend("a"):
+        model.n_tokens = 6
+    # The same session again: nothing copied
+    assert model.saved == 0
+
+    with shared.lend("b"):
+        model.n_tokens = 3
+    with shared.lend("a"):
+        assert model.n_tokens == 6
+    assert shared.stats()["saves"] == 2 and shared.stats()["restores"] == 1
+
+    with shared.lend("c"):
+        model.n_tokens = 4
+    # b (300) and a (600) are kept; saving c (400) doesn't evict b, which is coming back
+    with shared.lend("b"):
+        assert model.n_tokens == 3
+    assert list(shared.states) == ["a", "c"] and shared.state_bytes == 1000
+
+    with shared.lend("d"):
+        model.n_tokens = 20
+    # Saving b (300) evicts a, the least recently used
+    assert list(shared.states) == ["c", "b"] and shared.stats()["evictions"] == 1
+
+    saved = model.saved
+    with shared.lend("c"):
+        assert model.n_tokens == 4
+    # 20 tokens at 100 bytes each can never fit, so d's state isn't even copied
+    assert model.saved == saved and shared.stats()["skipped"] == 1
+    assert list(shared.states) == ["b"] and shared.state_bytes == 300
+
+if __name__ == "__main__":
+    test_old_turns_are_summarized_within_budget()
+    test_history_only_grows_at_its_end_between_compactions()
+    test_summary_keeps_the_question_and_first_sentence()
+    test_shared_model_keeps_session_states_within_a_budget()
+    print("conversation memory tests passed")
@@ -0,0 +1,25 @@
+# test_graph_api.py
+
+from app import api
+
+def get(path, **kwargs):
+    return api.app.test_client().get(path, **kwargs)
+
+def test_tier_filter_accepts_only_tiers():
+    response = get('/api/graph?tier=Premium&tier=Basic')
+    assert response.status_code == 200
+    ids = {node["id"] for node in response.get_json()["nodes"]}
+    assert {"Basic", "Premium"} <= ids
+
+    # A feature id is a node, but not a tier; every bad name is reported at once
+    response = get('/api/graph?tier=Basic&tier=Feature_Parametric_Sweeps&tier=Gold')
+    assert response.status_code == 400
+    error = response.get_json()["error"]
+    assert "Feature_Parametric_Sweeps" in error and "Gold" in error and "Basic" not in error
+
+    response = api.app.test_client().post('/api/graph', json={"tiers": ["Support_Email_Support_(Business_Hours)"]})
+    assert response.status_code == 400
+
+if __name__ == "__main__":
+    test_tier_filter_accepts_only_tiers()
+    print("graph api tests passed")
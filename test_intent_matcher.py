@@ -0,0 +1,50 @@
+# test_intent_matcher.py
+
+from app.api import SUBSCRIPTION_DATA
+from llm.intent_matcher import IntentMatcher
+
+def make_matcher():
+    return IntentMatcher.from_subscription_data(SUBSCRIPTION_DATA, "test")
+
+def test_higher_tiers_include_lower_tier_items():
+    matcher = make_matcher()
+    assert matcher.answer("Does Premium have Parametric Sweeps?").startswith("Yes")
+    assert matcher.answer("Does Basic have Parametric Sweeps?").startswith("No")
+
+    answer = matcher.answer("What does Premium include?")
+    for feature in ("Single-Physics Simulation", "Parametric Sweeps", "Full Geometry Optimization Suite"):
+        assert feature in answer, answer
+
+    assert matcher.answer("Which tiers include Parametric Sweeps?").endswith("Standard, Premium.")
+
+def test_negated_questions_need_the_llm():
+    matcher = make_matcher()
+    for question in (
+        "What is not included in Basic?",
+        "What limitations does Basic not have?",
+        "Which features doesn't Standard have?",
+    ):
+        assert matcher.answer(question) is None, question
+
+def test_gain_questions_list_what_the_upgrade_adds():
+    matcher = make_matcher()
+    answer = matcher.answer("What features would I gain upgrading from Basic to Premium?")
+    assert answer.startswith("Upgrading from the Basic tier to the Premium tier"), answer
+    assert "Co-Simulation with External Tools" in answer
+    assert "Single-Physics Simulation" not in answer
+    # Only features were asked for
+    assert "Limitations lifted" not in answer
+
+    # Direction comes from "from"/"to", not word order
+    answer = matcher.answer("What would I get if I upgrade to Standard from Basic?")
+    assert answer.startswith("Upgrading from the Basic tier to the Standard tier"), answer
+    assert "Max 500k Degrees of Freedom" in answer
+
+    assert matcher.answer("What would I gain upgrading from Premium to Basic?").startswith("No.")
+    assert matcher.answer("Can I upgrade to Premium from Basic?").startswith("Yes")
+
+if __name__ == "__main__":
+    test_higher_tiers_include_lower_tier_items()
+    test_negated_questions_need_the_llm()
+    test_gain_questions_list_what_the_upgrade_adds()
+    print("intent matcher tests passed")
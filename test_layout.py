@@ -0,0 +1,61 @@
+# test_layout.py
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import graph.layout as layout
+from graph.layout import LayoutCache
+
+GRAPH = {
+    "nodes": [{"id": "Basic"}, {"id": "Standard"}, {"id": "Premium"}],
+    "links": [{"source": "Basic", "target": "Standard"}, {"source": "Standard", "target": "Premium"}],
+}
+
+def in_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_misses_compute_one_layout(monkeypatch):
+    calls = []
+    real = layout.layout_graph
+    def slow_layout(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.1)
+        return real(*args, **kwargs)
+    monkeypatch.setattr(layout, "layout_graph", slow_layout)
+
+    cache = LayoutCache()
+    results = []
+    in_threads(8, lambda: results.append(cache.layout("v1", None, GRAPH, 2)))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert cache.stats()["misses"] == 1 and cache.stats()["waits"] == 7
+
+def test_waiters_see_the_failure_and_the_next_request_retries(monkeypatch):
+    def failing_layout(*args, **kwargs):
+        time.sleep(0.1)
+        raise layout.LayoutUnavailable("no numpy")
+    monkeypatch.setattr(layout, "layout_graph", failing_layout)
+
+    cache = LayoutCache()
+    errors = []
+    def request():
+        try:
+            cache.layout("v1", None, GRAPH, 2)
+        except layout.LayoutUnavailable as e:
+            errors.append(e)
+    in_threads(4, request)
+    assert len(errors) == 4
+
+    monkeypatch.undo()
+    assert set(cache.layout("v1", None, GRAPH, 2).positions) == {"Basic", "Standard", "Premium"}
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
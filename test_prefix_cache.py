@@ -0,0 +1,48 @@
+# test_prefix_cache.py
+
+from llm.prefix_cache import PrefixCachedModel
+
+class FakeModel:
+    """Only what PrefixCachedModel.prepare touches: one token per byte."""
+    def __init__(self):
+        self.input_ids = []
+        self.n_tokens = 0
+
+    def tokenize(self, text, special=False):
+        return list(text)
+
+    def reset(self):
+        self.input_ids, self.n_tokens = [], 0
+
+    def eval(self, tokens):
+        self.input_ids = self.input_ids[:self.n_tokens] + list(tokens)
+        self.n_tokens = len(self.input_ids)
+
+    def save_state(self):
+        return list(self.input_ids)
+
+    def load_state(self, state):
+        self.input_ids, self.n_tokens = list(state), len(state)
+
+def test_prefix_is_evaluated_once_per_distinct_text():
+    prefix = ["<s>[INST] system\n\n"]
+    model = FakeModel()
+    cached = PrefixCachedModel(model, lambda: prefix[0])
+
+    assert cached.prepare(prefix[0] + "question")
+    # Graph snapshots come and go, but the prefix text is the same
+    assert cached.prepare(prefix[0] + "another question")
+    assert cached.stats()["builds"] == 1 and cached.stats()["restores"] == 0
+
+    model.reset()
+    assert cached.prepare(prefix[0] + "question")
+    assert cached.stats()["builds"] == 1 and cached.stats()["restores"] == 1
+
+    prefix[0] = "<s>[INST] new system\n\n"
+    assert not cached.prepare("unrelated prompt")
+    assert cached.prepare(prefix[0] + "question")
+    assert cached.stats()["builds"] == 2
+
+if __name__ == "__main__":
+    test_prefix_is_evaluated_once_per_distinct_text()
+    print("prefix cache tests passed")
@@ -0,0 +1,32 @@
+# test_prompt_builder.py
+
+from app.api import SUBSCRIPTION_DATA
+from llm.answer_generator import PromptBuilder, estimate_tokens
+
+def test_open_questions_get_a_catalog_overview():
+    builder = PromptBuilder.from_subscription_data(SUBSCRIPTION_DATA)
+    facts = builder.build_facts("Which plan is best for a small team?")
+    for tier in ("Basic", "Standard", "Premium"):
+        assert f"- {tier} features:" in facts, facts
+
+    small = PromptBuilder.from_subscription_data(SUBSCRIPTION_DATA, token_budget=60)
+    facts = small.build_facts("Which plan is best for a small team?")
+    assert estimate_tokens(facts) <= 60 + len(facts.splitlines())
+    # Round-robin: every tier gets a line before any tier gets a second item
+    for tier in ("Basic", "Standard", "Premium"):
+        assert f"- {tier} features:" in facts, facts
+
+def test_facts_list_cumulative_features_and_support():
+    builder = PromptBuilder.from_subscription_data(SUBSCRIPTION_DATA)
+    facts = builder.build_facts("What features does Premium have?")
+    premium = next(line for line in facts.splitlines() if line.startswith("- Premium features:"))
+    # Inherited from Basic and Standard, as the templated answers say
+    assert "Single-Physics Simulation" in premium and "Parametric Sweeps" in premium, premium
+
+    facts = builder.build_facts("Does Premium include Parametric Sweeps?")
+    assert facts.splitlines()[0].startswith("- Premium features:"), facts
+
+if __name__ == "__main__":
+    test_open_questions_get_a_catalog_overview()
+    test_facts_list_cumulative_features_and_support()
+    print("prompt builder tests passed")
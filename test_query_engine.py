@@ -7,18 +7,16 @@ from llm.answer_generator import generate_answer
 llm = load_llm()
 engine = QueryEngine()
 
-for tier in ["Basic", "Standard", "Premium", "NonExistent"]:
-    features = engine.get_tier_features(tier)
-    limitations = engine.get_tier_limitations(tier)
-    support = engine.get_tier_support(tier)
-    upgrades = engine.get_upgradable_tiers(tier)
+# One round trip for every facet of every tier
+profiles = engine.get_tier_profiles(["Basic", "Standard", "Premium", "NonExistent"])
 
+for tier, profile in profiles.items():
     print(f"\n=== Tier: {tier} ===")
     for info_type, data in [
-        ("features", features),
-        ("limitations", limitations),
-        ("support", support),
-        ("upgrades", upgrades),
+        ("features", profile.features),
+        ("limitations", profile.limitations),
+        ("support", profile.support),
+        ("upgrades", profile.upgrades),
     ]:
         answer = generate_answer(
             llm=llm,
@@ -0,0 +1,31 @@
+# test_search.py
+
+from graph.search import MAX_CANDIDATES, SearchIndex
+
+def make_index():
+    # Hundreds of features mention "meshing"; the one label that *is* "Meshing"
+    # is a limitation with a longer label, so it ranks last statically
+    nodes = [{"id": f"f{i}", "label": f"Advanced Meshing {i}", "group": "Feature"}
+             for i in range(3 * MAX_CANDIDATES)]
+    nodes.append({"id": "limit", "label": "Meshing Limited To Two Cores", "group": "Limitation"})
+    return SearchIndex(nodes)
+
+def test_best_match_outside_the_static_top_is_found():
+    index = make_index()
+    for query in ("meshing", "meshing ", "mesh", "me", "m"):
+        results = index.search(query, limit=3)
+        assert results[0]["id"] == "limit", (query, results)
+        assert results[0]["score"] > results[1]["score"], (query, results)
+    for query in ("meshing limited", "limited meshing"):
+        assert [r["id"] for r in index.search(query)] == ["limit"], query
+
+def test_common_terms_keep_static_rank_on_ties():
+    index = make_index()
+    results = index.search("advanced meshing", limit=5)
+    assert [r["id"] for r in results] == ["f0", "f1", "f2", "f3", "f4"]
+    assert index.search("advanced meshing 42 ")[0]["id"] == "f42"
+
+if __name__ == "__main__":
+    test_best_match_outside_the_static_top_is_found()
+    test_common_terms_keep_static_rank_on_ties()
+    print("search tests passed")
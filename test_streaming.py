@@ -0,0 +1,111 @@
+# test_streaming.py
+
+import threading
+import time
+
+from app import api
+from bench.fakes import StubLLM
+from llm.answer_cache import SemanticAnswerCache
+from llm.scheduler import InferenceScheduler, SchedulerTimeout
+
+# Open-ended, so neither the templates nor the mock path answer it
+QUESTION = "Why would a team pick one tier over another?"
+
+def with_stub_llm(test, token_latency):
+    """Run `test(scheduler)` with a one-worker scheduler over a slow StubLLM."""
+    scheduler = InferenceScheduler(
+        lambda n_threads: StubLLM(token_latency=token_latency, tokens=200), workers=1, max_queue=4
+    ).start()
+    saved = api.scheduler, api.answer_cache
+    api.scheduler, api.answer_cache = scheduler, SemanticAnswerCache(path=None)
+    try:
+        test(scheduler)
+    finally:
+        api.scheduler, api.answer_cache = saved
+        scheduler.shutdown()
+
+def read_in_thread(stream):
+    """Drain `stream` in another thread, like the ASGI frontend's executor."""
+    errors = []
+    def reader():
+        try:
+            for _ in stream:
+                pass
+        except Exception as e:
+            errors.append(e)
+    thread = threading.Thread(target=reader)
+    thread.start()
+    return thread, errors
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_disconnect_mid_stream_cancels_generation():
+    def run(scheduler):
+        stream = api.stream_answer_for_query(QUESTION)
+        assert next(stream)
+        thread, errors = read_in_thread(stream)
+        # The reader is now blocked in next() waiting for the next token
+        time.sleep(0.05)
+        stream.close()
+        thread.join(2)
+        assert not thread.is_alive() and not errors, errors
+        wait_for(lambda: scheduler.stats()["in_flight"] == 0)
+        stats = scheduler.stats()
+        assert stats["cancelled"] == 1 and stats["completed"] == 0, stats
+        # A cut-short answer is never cached
+        assert api.answer_cache.stats()["size"] == 0
+    with_stub_llm(run, token_latency=0.2)
+
+def test_disconnect_while_queued_wakes_the_reader():
+    def run(scheduler):
+        running = api.stream_answer_for_query(QUESTION)
+        assert next(running)
+        queued = api.stream_answer_for_query(QUESTION + " Really?")
+        thread, errors = read_in_thread(queued)
+        # Blocked until a worker picks the job up, which won't happen for seconds
+        time.sleep(0.05)
+        queued.close()
+        thread.join(1)
+        assert not thread.is_alive() and not errors, errors
+        running.close()
+        wait_for(lambda: scheduler.stats()["cancelled"] == 2)
+    with_stub_llm(run, token_latency=0.05)
+
+def test_expired_jobs_are_not_counted_as_cancelled():
+    def run(scheduler):
+        running = scheduler.submit(QUESTION)
+        queued = scheduler.submit(QUESTION, timeout=0.05)
+        try:
+            scheduler.result(queued)
+            assert False, "expected a timeout"
+        except SchedulerTimeout:
+            pass
+        scheduler.result(running)
+        # The worker has skipped the expired job once the queue is empty
+        wait_for(lambda: scheduler.stats()["queue_depth"] == 0)
+        stats = scheduler.stats()
+        assert stats["expired"] == 1 and stats["cancelled"] == 0 and stats["completed"] == 1, stats
+    with_stub_llm(run, token_latency=0.005)
+
+def test_shutdown_stops_running_and_queued_streams():
+    scheduler = InferenceScheduler(
+        lambda n_threads: StubLLM(token_latency=0.2, tokens=200), workers=1, max_queue=4
+    ).start()
+    running = scheduler.stream(QUESTION)
+    assert next(running)
+    queued = scheduler.submit(QUESTION)
+    started = time.monotonic()
+    assert scheduler.shutdown(timeout=2)
+    assert time.monotonic() - started < 1
+    assert queued.done.is_set() and scheduler.stats()["cancelled"] == 2
+
+if __name__ == "__main__":
+    test_disconnect_mid_stream_cancels_generation()
+    test_disconnect_while_queued_wakes_the_reader()
+    test_expired_jobs_are_not_counted_as_cancelled()
+    test_shutdown_stops_running_and_queued_streams()
+    print("streaming tests passed")
@@ -1,22 +1,38 @@
 # visualize_graph.py
 
 from pyvis.network import Network
-from neo4j import GraphDatabase
 from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from graph.neo4j_connector import Neo4jConnector
+from graph.export import stream_nodes, stream_links
+from graph.layout import HAS_NUMPY, force_layout
 
-def fetch_graph_data(tx):
-    # Return node names, their labels (type), and relationships
-    query = """
-    MATCH (n)-[r]->(m)
-    RETURN 
-      id(n) AS from_id, n.name AS from_name, labels(n)[0] AS from_type,
-      type(r) AS relation,
-      id(m) AS to_id, m.name AS to_name, labels(m)[0] AS to_type
-    """
-    return [record.data() for record in tx.run(query)]
+# Pixels per ideal edge length when drawing a precomputed layout
+LAYOUT_SCALE = 100
+
+def fetch_graph_data(connector):
+    """Yield ("node", record) then ("link", record) pairs, streamed with a bounded fetch size."""
+    for record in stream_nodes(connector):
+        yield "node", record
+    for record in stream_links(connector):
+        yield "link", record
+
+# Style tiers vs features
+def style(node_type):
+    if node_type == "SubscriptionTier":
+        return {"color": "#4caf50", "shape": "box"}
+    elif node_type == "Feature":
+        return {"color": "#2196f3", "shape": "ellipse"}
+    else:
+        return {"color": "#9e9e9e", "shape": "dot"}
 
-def visualize_neo4j_graph():
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+def visualize_neo4j_graph(precompute_layout=HAS_NUMPY):
+    """Write graph_visualization.html.
+
+    Records go straight into the pyvis network as they stream. With
+    `precompute_layout` only node ids and link index pairs are kept on the
+    side for the layout; without it the browser runs the physics instead.
+    """
+    connector = Neo4jConnector(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
     net = Network(
         height="750px", width="100%",
         directed=True,
@@ -24,48 +40,30 @@ def visualize_neo4j_graph():
         bgcolor="#ffffff",
         font_color="black"
     )
-    net.barnes_hut()  # better physics layout
-
-    with driver.session() as session:
-        records = session.execute_read(fetch_graph_data)
-
-    # Keep track of added nodes to avoid duplicates
-    added = set()
-
-    for rec in records:
-        # Extract data
-        fid, fname, ftype = rec["from_id"], rec["from_name"], rec["from_type"]
-        tid, tname, ttype = rec["to_id"], rec["to_name"], rec["to_type"]
-        rel = rec["relation"]
-
-        # Style tiers vs features
-        def style(node_type):
-            if node_type == "SubscriptionTier":
-                return {"color": "#4caf50", "shape": "box"}
-            elif node_type == "Feature":
-                return {"color": "#2196f3", "shape": "ellipse"}
-            else:
-                return {"color": "#9e9e9e", "shape": "dot"}
-
-        # Add 'from' node
-        if fid not in added:
-            st = style(ftype)
-            net.add_node(fid, label=fname, title=ftype, **st)
-            added.add(fid)
-
-        # Add 'to' node
-        if tid not in added:
-            st = style(ttype)
-            net.add_node(tid, label=tname, title=ttype, **st)
-            added.add(tid)
+    index, edges = {}, []
+    for kind, rec in fetch_graph_data(connector):
+        if kind == "node":
+            net.add_node(rec["id"], label=rec["name"] or rec["type"], title=rec["type"], **style(rec["type"]))
+            if precompute_layout:
+                index[rec["id"]] = len(index)
+        else:
+            net.add_edge(rec["source"], rec["target"], label=rec["relation"], arrows="to")
+            if precompute_layout and rec["source"] in index and rec["target"] in index:
+                edges.append((index[rec["source"]], index[rec["target"]]))
 
-        # Add edge
-        net.add_edge(fid, tid, label=rel, arrows="to")
+    if precompute_layout:
+        # Positions computed here, so the browser doesn't run physics on load
+        positions = force_layout(len(index), edges, dim=2)
+        for node_id, (x, y) in zip(index, positions):
+            net.get_node(node_id).update(x=round(float(x) * LAYOUT_SCALE, 1), y=round(float(y) * LAYOUT_SCALE, 1))
+        net.toggle_physics(False)
+    else:
+        net.barnes_hut()  # better physics layout
 
     # Save the interactive HTML
     net.show("graph_visualization.html")
     print("✅ Enhanced graph saved to graph_visualization.html")
-    driver.close()
+    connector.close()
 
 if __name__ == "__main__":
     visualize_neo4j_graph()